@@ -0,0 +1,100 @@
+import argparse
+import os
+import pathlib
+import pickle
+import random
+import tempfile
+import time
+
+from cflpy.parser import CFGParser, _init_chunk_parser, _parse_file_chunk, gc_paused, split_file_at_lines
+
+
+def write_grammar(filepath: pathlib.Path, num_rules: int, seed: int = 0) -> None:
+    """
+    1つの左辺につき1行で、右辺に1〜4個の規則を持つ文法定義ファイルを作る
+
+    Args:
+        filepath: 出力先
+        num_rules: 行の数 (左辺の変数の数)
+        seed: 乱数の種
+    """
+    rng = random.Random(seed)
+    with filepath.open("w") as f:
+        for i in range(num_rules):
+            alternatives = []
+            for _ in range(rng.randint(1, 4)):
+                symbols = [
+                    f"<V{rng.randrange(num_rules)}>" if rng.random() < 0.6 else f'"t{rng.randrange(200)}"'
+                    for _ in range(rng.randint(1, 5))
+                ]
+                alternatives.append(" ".join(symbols))
+            f.write(f"<V{i}> := {' | '.join(alternatives)}\n")
+
+
+def best_of(repeat: int, func) -> float:
+    seconds = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        seconds.append(time.perf_counter() - start)
+    return min(seconds)
+
+
+def measure_stages(filepath: pathlib.Path, chunk_size: int) -> tuple[int, float, float]:
+    """
+    並列解析の各段階を1つのプロセスで順に実行して計測する
+
+    Returns:
+        tuple: (範囲の数, ワーカーの処理時間の合計 (解析と pickle), 親プロセスの処理時間 (unpickle と併合))
+    """
+    parser = CFGParser()
+    _init_chunk_parser(parser.cfg)
+    ranges = split_file_at_lines(filepath, chunk_size)
+    start = time.perf_counter()
+    payloads = [pickle.dumps(_parse_file_chunk(filepath, begin, end)) for begin, end in ranges]
+    worker_seconds = time.perf_counter() - start
+    start = time.perf_counter()
+    with gc_paused():
+        CFGParser._decode_chunks(pickle.loads(payload) for payload in payloads)
+    parent_seconds = time.perf_counter() - start
+    return len(ranges), worker_seconds, parent_seconds
+
+
+def main(num_rules: int, workers_list: list[int], repeat: int) -> None:
+    with tempfile.TemporaryDirectory() as tmp:
+        filepath = pathlib.Path(tmp) / "grammar.cfl"
+        write_grammar(filepath, num_rules)
+        size = filepath.stat().st_size
+        print(f"{num_rules} rules, {size / 1e6:.1f} MB, {os.cpu_count()} CPUs")
+
+        expected = CFGParser().from_file(filepath)
+        sequential = best_of(repeat, lambda: CFGParser().from_file(filepath))
+        print(f"sequential: {sequential:.3f}s")
+        print("workers  chunks  worker total  parent  projected  measured")
+        for workers in workers_list:
+            # from_file の既定の分割 (workers の4倍程度の範囲) と同じ大きさにする
+            chunk_size = max(-(-size // (workers * 4)), 1 << 16)
+            num_chunks, worker_seconds, parent_seconds = measure_stages(filepath, chunk_size)
+            # 親プロセスは先に終わった範囲から併合するため、workers 個の CPU がある場合の経過時間は
+            # 最初の範囲の解析時間と、ワーカー全体と親プロセスのうち遅い方の和で見積もる
+            projected = worker_seconds / num_chunks + max(worker_seconds / workers, parent_seconds)
+            grammar = CFGParser().from_file(filepath, workers=workers)
+            assert grammar.production_rules == expected.production_rules
+            measured = best_of(repeat, lambda: CFGParser().from_file(filepath, workers=workers))
+            print(
+                f"{workers:7d}  {num_chunks:6d}  {worker_seconds:11.3f}s  {parent_seconds:5.3f}s  "
+                f"{sequential / projected:8.2f}x  {sequential / measured:7.2f}x"
+            )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Benchmark CFGParser.from_file(workers=N) against the sequential parser. "
+        "'projected' is the speedup expected with at least N free CPUs, estimated from the per-stage times; "
+        "'measured' is the wall-clock speedup on this machine."
+    )
+    parser.add_argument("--rules", type=int, default=80000, help="Number of rules (lines) in the generated grammar")
+    parser.add_argument("--workers", type=int, nargs="+", default=[2, 4, 8], help="Numbers of workers to compare")
+    parser.add_argument("--repeat", type=int, default=3, help="Number of runs; the fastest is reported")
+    args = parser.parse_args()
+    main(args.rules, args.workers, args.repeat)
@@ -1,4 +1,31 @@
-from cflpy.grammar import CFGrammar
-from cflpy.parser import CFGParser, CFGParserConfig
+import importlib
+from typing import TYPE_CHECKING
 
-__all__ = ["CFGrammar", "CFGParser", "CFGParserConfig"]
+if TYPE_CHECKING:
+    from cflpy.grammar import CFGrammar
+    from cflpy.parser import CFGParser, CFGParserConfig
+    from cflpy.serialize import CFGWriter
+
+__all__ = ["CFGrammar", "CFGParser", "CFGParserConfig", "CFGWriter"]
+
+# 公開する名前 -> 定義しているモジュール。import cflpy を軽くするため、最初に参照されたときに読み込む
+_LAZY_ATTRIBUTES = {
+    "CFGrammar": "cflpy.grammar",
+    "CFGParser": "cflpy.parser",
+    "CFGParserConfig": "cflpy.parser",
+    "CFGWriter": "cflpy.serialize",
+}
+
+
+def __getattr__(name: str):
+    module_name = _LAZY_ATTRIBUTES.get(name)
+    if module_name is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(importlib.import_module(module_name), name)
+    # 2回目以降はモジュールの属性として直接参照させる
+    globals()[name] = value
+    return value
+
+
+def __dir__() -> list[str]:
+    return sorted([*globals(), *__all__])
@@ -1,43 +1,350 @@
 import argparse
+import dataclasses
+import json
+import mmap
 import pathlib
+import sys
+import time
+from typing import IO
 
-from cflpy.parser import CFGParser, CFGParserConfig
+from cflpy.batch import CheckResult, CheckStats, check_lines, check_one
+from cflpy.compiled import COMPILED_SUFFIX, CompiledGrammar, is_compiled_file
+from cflpy.parser import CFGParser, CFGParserConfig, iter_mmap_lines
 
 
-def parse_args() -> argparse.Namespace:
+def parse_args(argv: list[str] | None = None) -> argparse.Namespace:
     parser = argparse.ArgumentParser(description="Context-Free Language Processor")
     subparsers = parser.add_subparsers(dest="command", required=True)
 
+    # Compile grammar command
+    compile_parser = subparsers.add_parser(
+        "compile",
+        help="Precompile a grammar into a binary artifact",
+        description="Parse, simplify and convert to Chomsky normal form, then write the rule tables as a versioned "
+        f"binary artifact ({COMPILED_SUFFIX}) that every other command accepts in place of the .cfl file.",
+    )
+    compile_parser.add_argument("file", help="Path to .cfl file", type=pathlib.Path)
+    compile_parser.add_argument(
+        "--output", "-o", type=pathlib.Path, help=f"Output path (default: FILE with the {COMPILED_SUFFIX} suffix)"
+    )
+    compile_parser.add_argument(
+        "--config", type=pathlib.Path, help="JSON file of CFGParserConfig fields used to parse .cfl files"
+    )
+    compile_parser.add_argument("--minimize", action="store_true", help="Merge equivalent variables after conversion")
+    compile_parser.add_argument("--quiet", "-q", action="store_true", help="Do not print the summary to stderr")
+
     # Check membership command
-    check_parser = subparsers.add_parser("check", help="Check if string is in language")
-    check_parser.add_argument("file", help="Path to .cfl file", type=pathlib.Path)
-    check_parser.add_argument("string", help="String to check")
+    check_parser = subparsers.add_parser(
+        "check",
+        help="Check if strings are in language",
+        description="Check a single string, or newline-delimited strings from stdin or --input when no string is given.",
+    )
+    check_parser.add_argument("file", help="Path to .cfl or .cflc file", type=pathlib.Path)
+    check_parser.add_argument("string", nargs="?", help="String to check (omit to read newline-delimited inputs)")
+    check_parser.add_argument(
+        "--config", type=pathlib.Path, help="JSON file of CFGParserConfig fields used to parse .cfl files"
+    )
+    check_parser.add_argument("--input", "-i", type=pathlib.Path, help="Read inputs from this file instead of stdin")
+    check_parser.add_argument("--mmap", action="store_true", help="Memory-map the --input file")
+    check_parser.add_argument("--workers", "-j", type=int, default=1, help="Number of worker processes")
+    check_parser.add_argument("--batch-size", type=int, default=256, help="Number of inputs sent to a worker at once")
+    check_parser.add_argument("--format", choices=["tsv", "jsonl"], default="tsv", help="Output format")
+    check_parser.add_argument("--quiet", "-q", action="store_true", help="Do not print the summary to stderr")
 
     # Generate strings command
-    gen_parser = subparsers.add_parser("generate", help="Generate strings from grammar")
-    gen_parser.add_argument("file", help="Path to .cfl file", type=pathlib.Path)
-    gen_parser.add_argument("--max-depth", type=int, default=5, help="Maximum recursion depth for generation")
+    gen_parser = subparsers.add_parser(
+        "generate",
+        help="Generate strings from grammar",
+        description="Generate random strings, one per line. The same --seed and --batch-size give the same output "
+        "for any number of workers.",
+    )
+    gen_parser.add_argument(
+        "file", help="Path to .cfl file (.cflc is rejected because it holds the CNF grammar)", type=pathlib.Path
+    )
+    gen_parser.add_argument(
+        "--config", type=pathlib.Path, help="JSON file of CFGParserConfig fields used to parse .cfl files"
+    )
+    gen_parser.add_argument("--count", "-n", type=int, default=10, help="Number of strings to generate")
+    gen_parser.add_argument("--seed", type=int, help="Random seed (random if omitted)")
+    gen_parser.add_argument("--workers", "-j", type=int, default=1, help="Number of worker processes")
+    gen_parser.add_argument("--batch-size", type=int, default=1024, help="Number of strings generated per batch")
+    gen_parser.add_argument("--min-len", type=int, default=0, help="Minimum number of terminals per string")
+    gen_parser.add_argument("--max-len", type=int, help="Maximum number of terminals per string")
+    gen_parser.add_argument(
+        "--max-depth",
+        type=int,
+        default=1000,
+        help="Number of free rule choices per string before finishing with the shortest derivations",
+    )
+    gen_parser.add_argument("--unique", action="store_true", help="Skip strings that were already generated")
+    gen_parser.add_argument("--output", "-o", type=pathlib.Path, help="Write to this file instead of stdout")
+    gen_parser.add_argument(
+        "--shards", type=int, default=1, help="Split --output into this many files (NAME-00000-of-0000N.EXT)"
+    )
+    gen_parser.add_argument("--quiet", "-q", action="store_true", help="Do not print the summary to stderr")
+
+    # Serve queries command
+    serve_parser = subparsers.add_parser(
+        "serve",
+        help="Serve membership, parse and next-token queries over HTTP",
+        description='Answer POST /member, /parse and /next with JSON bodies {"input": ...} or {"inputs": [...]}. '
+        "GET /stats reports latency percentiles.",
+    )
+    serve_parser.add_argument("file", help="Path to .cfl or .cflc file", type=pathlib.Path)
+    serve_parser.add_argument(
+        "--config", type=pathlib.Path, help="JSON file of CFGParserConfig fields used to parse .cfl files"
+    )
+    serve_parser.add_argument("--host", default="127.0.0.1", help="Address to listen on")
+    serve_parser.add_argument("--port", type=int, default=8000, help="TCP port to listen on")
+    serve_parser.add_argument("--unix", type=pathlib.Path, help="Listen on this Unix socket instead of a TCP port")
+    serve_parser.add_argument("--workers", "-j", type=int, default=1, help="Number of worker processes")
+    serve_parser.add_argument("--max-batch", type=int, default=256, help="Maximum number of queries per batch")
+    serve_parser.add_argument(
+        "--max-delay-ms", type=float, default=2.0, help="Maximum time to wait for more queries to fill a batch"
+    )
 
-    args = parser.parse_args()
+    args = parser.parse_args(argv)
 
     return args
 
 
-def main():
-    args = parse_args()
+def load_config(filepath: pathlib.Path | None) -> CFGParserConfig:
+    """
+    --config で指定した JSON ファイルから文法定義ファイルの構文の設定を読み込む
+    JSON はフィールド名から値へのオブジェクト (例: {"transition_symbol": "->"}) で、指定しないフィールドは既定値とする。
+
+    Args:
+        filepath: JSON ファイルのパス。None の場合は既定の設定を返す
+
+    Returns:
+        CFGParserConfig: 読み込んだ設定
+    """
+    if filepath is None:
+        return CFGParserConfig()
+    with filepath.open("r", encoding="utf-8") as f:
+        fields = json.load(f)
+    if not isinstance(fields, dict):
+        raise ValueError(f"Config must be a JSON object of CFGParserConfig fields: {filepath}")
+    unknown = fields.keys() - {field.name for field in dataclasses.fields(CFGParserConfig)}
+    if unknown:
+        raise ValueError(f"Unknown config fields in {filepath}: {', '.join(sorted(unknown))}")
+    return CFGParserConfig(**fields)
+
+
+def compile_grammar(
+    filepath: pathlib.Path, minimize: bool = False, cfg: CFGParserConfig | None = None
+) -> CompiledGrammar:
+    """
+    文法定義ファイルを読み込み、チョムスキー標準形に変換してバイナリ形式にする
+    バイナリ形式のファイル (compile コマンドで作成したもの) の場合は、解析・変換せずに mmap で読み込む。
+
+    Args:
+        filepath: 文法定義ファイルまたはバイナリ形式のファイルのパス
+        minimize: 変換後に等価な変数を併合するかどうか
+        cfg: 文法定義ファイルの構文の設定。None の場合は既定の設定
+
+    Returns:
+        CompiledGrammar: 変換した文法
+    """
+    if is_compiled_file(filepath):
+        return CompiledGrammar.load(filepath)
+    grammar = CFGParser(cfg=cfg if cfg is not None else CFGParserConfig()).from_file(filepath)
+    return CompiledGrammar.from_grammar(grammar.to_chomsky_normal_form(minimize=minimize))
+
+
+def run_compile(args: argparse.Namespace, stderr: IO[str]) -> int:
+    output = args.output if args.output is not None else args.file.with_suffix(COMPILED_SUFFIX)
+    if output.resolve() == args.file.resolve():
+        raise ValueError(f"Output path must differ from the input file: {output}")
+    start = time.perf_counter()
+    grammar = compile_grammar(args.file, minimize=args.minimize, cfg=load_config(args.config))
+    grammar.save(output)
+    seconds = time.perf_counter() - start
+    if not args.quiet:
+        print(
+            f"compiled {args.file} to {output} ({grammar.num_variables} variables, {grammar.num_terminals} terminals, "
+            f"{grammar.num_unary + grammar.num_binary} rules, {grammar.nbytes} bytes) in {seconds:.3f}s",
+            file=stderr,
+        )
+    return 0
+
+
+def format_result(result: CheckResult, output_format: str) -> str:
+    """
+    判定結果を出力する1行にする
+    tsv: "true" / "false" / "error" と入力をタブで区切った行
+    jsonl: {"input": 入力, "member": true / false / null, "error": 理由 (エラーの場合のみ)}
+
+    Args:
+        result: 判定結果
+        output_format: "tsv" または "jsonl"
+
+    Returns:
+        str: 末尾に改行を含む行
+    """
+    if output_format == "jsonl":
+        record = {"input": result.input, "member": result.member}
+        if result.error is not None:
+            record["error"] = result.error
+        return json.dumps(record, ensure_ascii=False) + "\n"
+    status = "error" if result.error is not None else ("true" if result.member else "false")
+    return f"{status}\t{result.input}\n"
+
+
+def run_check(args: argparse.Namespace, stdin: IO[str], stdout: IO[str], stderr: IO[str]) -> int:
+    grammar = compile_grammar(args.file, cfg=load_config(args.config))
+    if args.string is not None:
+        result = check_one(grammar, args.string)
+        if result.error is not None:
+            print(f"error: {result.error}", file=stderr)
+            return 1
+        print(f"String '{args.string}' is {'in' if result.member else 'not in'} the language", file=stdout)
+        return 0
+
+    stats = CheckStats()
+
+    def write_results(lines) -> None:
+        for result in check_lines(grammar, lines, workers=args.workers, batch_size=args.batch_size, stats=stats):
+            stdout.write(format_result(result, args.format))
+
+    if args.input is None:
+        write_results(stdin)
+    elif args.mmap and args.input.stat().st_size > 0:
+        with args.input.open("rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            write_results(iter_mmap_lines(mm))
+    else:
+        with args.input.open("r", encoding="utf-8") as f:
+            write_results(f)
+    stdout.flush()
+
+    if not args.quiet:
+        print(
+            f"checked {stats.inputs} inputs ({stats.members} in language, {stats.errors} errors) "
+            f"in {stats.seconds:.3f}s ({stats.throughput:.1f} inputs/s, {args.workers} workers)",
+            file=stderr,
+        )
+    return 0
+
+
+def shard_paths(output: pathlib.Path, shards: int) -> list[pathlib.Path]:
+    """
+    出力ファイルを分割する場合の各ファイルのパスを返す
+    例: out.txt, 3 -> out-00000-of-00003.txt, out-00001-of-00003.txt, out-00002-of-00003.txt
+
+    Args:
+        output: 出力ファイルのパス
+        shards: ファイルの数
+
+    Returns:
+        list[pathlib.Path]: 各ファイルのパス (shards が1の場合は output のみ)
+    """
+    if shards <= 1:
+        return [output]
+    return [output.with_name(f"{output.stem}-{i:05d}-of-{shards:05d}{output.suffix}") for i in range(shards)]
+
+
+def run_generate(args: argparse.Namespace, stdout: IO[str], stderr: IO[str]) -> int:
+    from cflpy.generation import generate_strings
+
+    if args.shards <= 0:
+        print(f"error: --shards must be positive, got {args.shards}", file=stderr)
+        return 1
+    # .cflc はチョムスキー標準形に変換済みで、規則の選び方が元の文法と異なり生成される記号列の分布が変わるため受け付けない
+    if is_compiled_file(args.file):
+        print(
+            f"error: {args.file} is a compiled grammar in Chomsky normal form, which changes the distribution "
+            "of generated strings; pass the source .cfl file instead",
+            file=stderr,
+        )
+        return 1
+    grammar = CFGParser(cfg=load_config(args.config)).from_file(args.file)
+    start = time.perf_counter()
+    strings = generate_strings(
+        grammar,
+        args.count,
+        seed=args.seed,
+        workers=args.workers,
+        batch_size=args.batch_size,
+        unique=args.unique,
+        min_len=args.min_len,
+        max_len=args.max_len,
+        max_depth=args.max_depth,
+    )
+
+    generated = 0
+    # 生成は遅延して行われるため、長さの範囲から生成できない場合などのエラーは最初の記号列を取り出すときに送出される
+    try:
+        if args.output is None:
+            for string in strings:
+                stdout.write(string + "\n")
+                generated += 1
+            stdout.flush()
+        else:
+            # シャード i には [count * i / shards, count * (i + 1) / shards) 番目の記号列を書き出す
+            paths = shard_paths(args.output, args.shards)
+            for i, path in enumerate(paths):
+                with path.open("w", encoding="utf-8") as f:
+                    end = args.count * (i + 1) // len(paths)
+                    while generated < end:
+                        string = next(strings, None)
+                        if string is None:
+                            break
+                        f.write(string + "\n")
+                        generated += 1
+    except ValueError as e:
+        print(f"error: {e}", file=stderr)
+        return 1
+    finally:
+        strings.close()
+    seconds = time.perf_counter() - start
+
+    if not args.quiet:
+        if generated < args.count:
+            print(f"warning: only {generated} of {args.count} strings could be generated", file=stderr)
+        print(
+            f"generated {generated} strings in {seconds:.3f}s "
+            f"({generated / seconds if seconds > 0 else 0.0:.1f} strings/s, {args.workers} workers)",
+            file=stderr,
+        )
+    return 0
+
+
+def run_serve(args: argparse.Namespace) -> int:
+    # asyncio の読み込みは他のコマンドの起動時間に影響するため、serve コマンドでのみ読み込む
+    import asyncio
+    import logging
+
+    from cflpy.server import GrammarServer
+
+    grammar = compile_grammar(args.file, cfg=load_config(args.config))
+    server = GrammarServer(
+        grammar, workers=args.workers, max_batch_size=args.max_batch, max_delay=args.max_delay_ms / 1000
+    )
+    logging.basicConfig(level=logging.INFO, format="%(message)s")
+    if args.unix is not None:
+        serve = server.serve_forever(host=None, port=None, unix_path=str(args.unix))
+    else:
+        serve = server.serve_forever(host=args.host, port=args.port)
+    try:
+        asyncio.run(serve)
+    except KeyboardInterrupt:
+        pass
+    return 0
+
 
-    # TODO: implement config options
-    grammar = CFGParser(cfg=CFGParserConfig()).from_file(args.file)
+def main(argv: list[str] | None = None) -> int:
+    args = parse_args(argv)
 
-    if args.command == "check":
-        result = grammar.is_member(args.string)
-        print(f"String '{args.string}' is {'in' if result else 'not in'} the language")
+    if args.command == "compile":
+        return run_compile(args, sys.stderr)
+    elif args.command == "check":
+        return run_check(args, sys.stdin, sys.stdout, sys.stderr)
     elif args.command == "generate":
-        strings = grammar.generate_strings(args.max_depth)
-        print("Generated strings:")
-        for s in strings:
-            print(f"- {s}")
+        return run_generate(args, sys.stdout, sys.stderr)
+    elif args.command == "serve":
+        return run_serve(args)
+    return 0
 
 
 if __name__ == "__main__":
-    main()
+    sys.exit(main())
@@ -0,0 +1,269 @@
+import heapq
+import math
+
+from cflpy.core import ProductionRules, Terminal, Variable
+from cflpy.to_chomsly_normal_form.step3_remove_unit import find_strongly_connected_components
+
+
+def find_min_yield_lengths(production_rules: ProductionRules) -> dict[Variable, int | float]:
+    """各変数が生成できる終端記号列の長さの最小値を求める
+    Knuth の一般化 Dijkstra 法: 長さが確定した変数から順に、その変数が出現する規則の長さを確定させていく。
+
+    Args:
+        production_rules: 生成規則
+
+    Returns:
+        dict[Variable, int | float]: 変数 -> 長さの最小値。終端記号列を生成できない変数は math.inf
+    """
+    rule_lhs: list[Variable] = []
+    pending_variables: list[int] = []
+    lengths: list[int] = []
+    occurrences: dict[Variable, list[int]] = {}
+    heap: list[tuple[int, int, Variable]] = []
+    for lhs, rhs in production_rules.items():
+        for seq in rhs:
+            rule_id = len(rule_lhs)
+            rule_lhs.append(lhs)
+            pending_variables.append(0)
+            lengths.append(0)
+            for sym in seq:
+                if isinstance(sym, Variable):
+                    occurrences.setdefault(sym, []).append(rule_id)
+                    pending_variables[rule_id] += 1
+                else:
+                    lengths[rule_id] += 1
+            if pending_variables[rule_id] == 0:
+                heapq.heappush(heap, (lengths[rule_id], rule_id, lhs))
+
+    min_lengths: dict[Variable, int | float] = {var: math.inf for var in production_rules.keys()}
+    done: set[Variable] = set()
+    while heap:
+        length, _, var = heapq.heappop(heap)
+        if var in done:
+            continue
+        done.add(var)
+        min_lengths[var] = length
+        for rule_id in occurrences.get(var, []):
+            pending_variables[rule_id] -= 1
+            lengths[rule_id] += length
+            if pending_variables[rule_id] == 0 and rule_lhs[rule_id] not in done:
+                heapq.heappush(heap, (lengths[rule_id], rule_id, rule_lhs[rule_id]))
+    return min_lengths
+
+
+def find_max_yield_lengths(production_rules: ProductionRules) -> dict[Variable, int | float]:
+    """各変数が生成できる終端記号列の長さの最大値を求める
+    終端記号列を生成できる規則のみを考え、変数の依存グラフの強連結成分のうち、
+    空でない記号列を生成できる記号を伴って自身を導出できるもの (A =>* α A β, αβ =>* 空でない列) を含む成分から
+    到達できる変数は長さの最大値が無限大になる。それ以外の変数は逆トポロジカル順に最大値を計算する。
+
+    Args:
+        production_rules: 生成規則
+
+    Returns:
+        dict[Variable, int | float]: 変数 -> 長さの最大値 (無限大の場合は math.inf)。
+            終端記号列を生成できない変数は -math.inf
+    """
+    generating = production_rules.find_generating()
+    usable = {
+        lhs: [seq for seq in rhs if all(isinstance(sym, Terminal) or sym in generating for sym in seq)]
+        for lhs, rhs in production_rules.items()
+        if lhs in generating
+    }
+
+    # 空でない記号列を生成できる変数
+    nonempty: set[Variable] = set()
+    changed = True
+    while changed:
+        changed = False
+        for lhs, rules in usable.items():
+            if lhs not in nonempty and any(
+                isinstance(sym, Terminal) or sym in nonempty for seq in rules for sym in seq
+            ):
+                nonempty.add(lhs)
+                changed = True
+
+    nodes = list(usable.keys())
+    node_ids = {var: i for i, var in enumerate(nodes)}
+    graph: list[list[int]] = [[] for _ in nodes]
+    growing_edges: list[tuple[int, int]] = []
+    for lhs, rules in usable.items():
+        for seq in rules:
+            for position, sym in enumerate(seq):
+                if isinstance(sym, Terminal):
+                    continue
+                graph[node_ids[lhs]].append(node_ids[sym])
+                if any(
+                    isinstance(other, Terminal) or other in nonempty
+                    for other_position, other in enumerate(seq)
+                    if other_position != position
+                ):
+                    growing_edges.append((node_ids[lhs], node_ids[sym]))
+
+    components = find_strongly_connected_components(graph)
+    component_of = [0] * len(nodes)
+    for c, component in enumerate(components):
+        for node in component:
+            component_of[node] = c
+    pumpable = [False] * len(components)
+    for source, target in growing_edges:
+        if component_of[source] == component_of[target]:
+            pumpable[component_of[source]] = True
+
+    max_lengths: dict[Variable, int | float] = {var: -math.inf for var in production_rules.keys()}
+    # 逆トポロジカル順なので、後続の成分は既に計算済み
+    for c, component in enumerate(components):
+        if pumpable[c] or any(
+            component_of[succ] != c and max_lengths[nodes[succ]] == math.inf
+            for node in component
+            for succ in graph[node]
+        ):
+            for node in component:
+                max_lengths[nodes[node]] = math.inf
+            continue
+        # 成分内の辺は長さを増やさないため、成分の大きさの回数だけ緩和すれば収束する
+        for node in component:
+            max_lengths[nodes[node]] = 0
+        for _ in range(len(component)):
+            for node in component:
+                var = nodes[node]
+                for seq in usable[var]:
+                    length = sum(1 if isinstance(sym, Terminal) else max_lengths[sym] for sym in seq)
+                    max_lengths[var] = max(max_lengths[var], length)
+    return max_lengths
+
+
+def find_yield_lengths(production_rules: ProductionRules, limit: int) -> dict[Variable, int]:
+    """各変数が生成できる終端記号列の長さのうち、limit 以下のものの集合を求める
+    長さの集合はビット列 (n ビット目が長さ n) で表し、規則の右辺の長さの集合は各記号の集合の和集合 (sumset) とする。
+    変数の依存グラフの強連結成分ごとに、逆トポロジカル順に不動点まで繰り返す。
+    find_min_yield_lengths / find_max_yield_lengths と異なり、長さの偶奇などの制約も反映される。
+
+    Args:
+        production_rules: 生成規則
+        limit: 求める長さの上限
+
+    Returns:
+        dict[Variable, int]: 変数 -> 長さの集合のビット列。終端記号列を生成できない変数は 0
+    """
+    mask = (1 << (limit + 1)) - 1
+
+    def sumset(a: int, b: int) -> int:
+        # 集合の少ない方のビットごとに、もう一方をずらして足し合わせる
+        if a.bit_count() > b.bit_count():
+            a, b = b, a
+        result = 0
+        while a:
+            low = a & -a
+            result |= b << (low.bit_length() - 1)
+            a ^= low
+        return result & mask
+
+    nodes: list[Variable] = list(production_rules.keys())
+    node_ids = {var: i for i, var in enumerate(nodes)}
+    graph: list[list[int]] = [[] for _ in nodes]
+    for lhs, rhs in production_rules.items():
+        for seq in rhs:
+            for sym in seq:
+                if isinstance(sym, Variable) and sym in node_ids:
+                    graph[node_ids[lhs]].append(node_ids[sym])
+
+    lengths: dict[Variable, int] = {var: 0 for var in nodes}
+    # 逆トポロジカル順なので、後続の成分は既に計算済み
+    for component in find_strongly_connected_components(graph):
+        members = [nodes[node] for node in component]
+        changed = True
+        while changed:
+            changed = False
+            for var in members:
+                found = lengths[var]
+                for seq in production_rules[var]:
+                    seq_lengths = 1
+                    for sym in seq:
+                        seq_lengths = sumset(seq_lengths, 2 if isinstance(sym, Terminal) else lengths.get(sym, 0))
+                        if not seq_lengths:
+                            break
+                    found |= seq_lengths
+                if found != lengths[var]:
+                    lengths[var] = found
+                    changed = True
+    return lengths
+
+
+def find_yield_terminals(production_rules: ProductionRules) -> dict[Variable, frozenset[Terminal]]:
+    """各変数が生成する終端記号列に現れうる終端記号の集合を求める
+
+    Args:
+        production_rules: 生成規則
+
+    Returns:
+        dict[Variable, frozenset[Terminal]]: 変数 -> 終端記号の集合。終端記号列を生成できない変数は空集合
+    """
+    generating = production_rules.find_generating()
+    usable = {
+        lhs: [seq for seq in rhs if all(isinstance(sym, Terminal) or sym in generating for sym in seq)]
+        for lhs, rhs in production_rules.items()
+        if lhs in generating
+    }
+
+    nodes = list(usable.keys())
+    node_ids = {var: i for i, var in enumerate(nodes)}
+    graph: list[list[int]] = [[] for _ in nodes]
+    for lhs, rules in usable.items():
+        for seq in rules:
+            for sym in seq:
+                if isinstance(sym, Variable):
+                    graph[node_ids[lhs]].append(node_ids[sym])
+
+    terminals: dict[Variable, frozenset[Terminal]] = {var: frozenset() for var in production_rules.keys()}
+    # 逆トポロジカル順なので、後続の成分は既に計算済み
+    for component in find_strongly_connected_components(graph):
+        members = {nodes[node] for node in component}
+        found: set[Terminal] = set()
+        for var in members:
+            for seq in usable[var]:
+                for sym in seq:
+                    if isinstance(sym, Terminal):
+                        found.add(sym)
+                    elif sym not in members:
+                        found |= terminals[sym]
+        for var in members:
+            terminals[var] = frozenset(found)
+    return terminals
+
+
+def find_left_corners(production_rules: ProductionRules) -> dict[Variable, frozenset[Variable]]:
+    """各変数の左隅 (left corner) の反射推移閉包を求める
+    A := B ... の形の規則があるとき B を A の左隅とし、A から左隅を0回以上たどって到達できる変数の集合を返す。
+    右辺の先頭の記号のみを見るため、先頭の変数が空列を生成しうる文法では左隅を過小に評価する (ε規則を除去した文法を想定)。
+
+    Args:
+        production_rules: 生成規則
+
+    Returns:
+        dict[Variable, frozenset[Variable]]: 変数 -> 左隅の閉包 (自身を含む)
+    """
+    nodes: list[Variable] = list(production_rules.keys())
+    node_ids = {var: i for i, var in enumerate(nodes)}
+    graph: list[list[int]] = [[] for _ in nodes]
+    for lhs, rhs in production_rules.items():
+        for seq in rhs:
+            if len(seq) > 0 and isinstance(seq[0], Variable):
+                if seq[0] not in node_ids:
+                    node_ids[seq[0]] = len(nodes)
+                    nodes.append(seq[0])
+                    graph.append([])
+                graph[node_ids[lhs]].append(node_ids[seq[0]])
+
+    left_corners: dict[Variable, frozenset[Variable]] = {}
+    # 逆トポロジカル順なので、後続の成分は既に計算済み
+    for component in find_strongly_connected_components(graph):
+        members = {nodes[node] for node in component}
+        found = set(members)
+        for node in component:
+            for succ in graph[node]:
+                if nodes[succ] not in members:
+                    found |= left_corners[nodes[succ]]
+        for var in members:
+            left_corners[var] = frozenset(found)
+    return left_corners
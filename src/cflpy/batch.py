@@ -0,0 +1,143 @@
+import collections
+import concurrent.futures
+import dataclasses
+import itertools
+import time
+from collections.abc import Iterable, Iterator
+
+from cflpy.compiled import CompiledGrammar, release_shared_memory
+
+
+@dataclasses.dataclass
+class CheckResult:
+    """1つの入力に対するメンバーシップ判定の結果
+
+    Attributes:
+        input: 入力の文字列 (末尾の改行を除いたもの)
+        member: 言語に含まれるかどうか。判定できなかった場合は None
+        error: 判定できなかった理由 (文法に含まれない終端記号など)。判定できた場合は None
+    """
+
+    input: str
+    member: bool | None
+    error: str | None = None
+
+
+@dataclasses.dataclass
+class CheckStats:
+    """メンバーシップ判定の集計
+
+    Attributes:
+        inputs: 入力の数
+        members: 言語に含まれた入力の数
+        errors: 判定できなかった入力の数
+        seconds: 経過時間 (秒)
+    """
+
+    inputs: int = 0
+    members: int = 0
+    errors: int = 0
+    seconds: float = 0.0
+
+    @property
+    def throughput(self) -> float:
+        return self.inputs / self.seconds if self.seconds > 0 else 0.0
+
+    def add(self, result: CheckResult) -> None:
+        self.inputs += 1
+        if result.member:
+            self.members += 1
+        elif result.error is not None:
+            self.errors += 1
+
+
+def check_one(grammar: CompiledGrammar, string: str) -> CheckResult:
+    """
+    1つの文字列を判定する。文法に含まれない終端記号などのエラーは結果に含めて返す
+
+    Args:
+        grammar: 判定に使う文法
+        string: 空白区切りの文字列
+
+    Returns:
+        CheckResult: 判定結果
+    """
+    try:
+        return CheckResult(string, grammar.is_member(string))
+    except ValueError as e:
+        return CheckResult(string, None, str(e).splitlines()[0])
+
+
+# ワーカープロセスで共有メモリから参照する文法 (_attach_grammar で設定する)
+_worker_grammar: CompiledGrammar | None = None
+
+
+def _attach_grammar(name: str) -> None:
+    global _worker_grammar
+    _worker_grammar = CompiledGrammar.attach(name)
+
+
+def _check_batch(strings: list[str]) -> list[CheckResult]:
+    return [check_one(_worker_grammar, string) for string in strings]
+
+
+def check_lines(
+    grammar: CompiledGrammar,
+    lines: Iterable[str],
+    workers: int = 1,
+    batch_size: int = 256,
+    stats: CheckStats | None = None,
+) -> Iterator[CheckResult]:
+    """
+    改行区切りの入力を順に判定し、入力と同じ順に結果を返す
+
+    workers が2以上の場合、文法を共有メモリに置いてプロセスプールで判定する。入力は batch_size 行ずつワーカーに渡し、
+    処理中のバッチの数を workers の数倍に制限するため、入力全体をメモリに読み込むことはない。
+
+    Args:
+        grammar: 判定に使う文法
+        lines: 入力の行 (末尾の改行は除かれる)
+        workers: 判定に使うプロセス数
+        batch_size: 1回にワーカーに渡す行数
+        stats: 指定した場合、判定した結果を集計する (経過時間は全ての結果を返し終えた時点の値)
+
+    Returns:
+        Iterator[CheckResult]: 入力の順の判定結果
+    """
+    if batch_size <= 0:
+        raise ValueError(f"batch_size must be positive, got {batch_size}")
+    start = time.perf_counter()
+    strings = (line.rstrip("\r\n") for line in lines)
+    if workers <= 1:
+        results = (check_one(grammar, string) for string in strings)
+    else:
+        results = _check_lines_parallel(grammar, strings, workers, batch_size)
+    for result in results:
+        if stats is not None:
+            stats.add(result)
+        yield result
+    if stats is not None:
+        stats.seconds = time.perf_counter() - start
+
+
+def _check_lines_parallel(
+    grammar: CompiledGrammar, strings: Iterator[str], workers: int, batch_size: int
+) -> Iterator[CheckResult]:
+    shm = grammar.to_shared_memory()
+    try:
+        with concurrent.futures.ProcessPoolExecutor(
+            max_workers=workers, initializer=_attach_grammar, initargs=(shm.name,)
+        ) as executor:
+            pending: collections.deque[concurrent.futures.Future] = collections.deque()
+            while True:
+                # 処理中のバッチが一定数になるまで投入し、先頭のバッチから順に結果を返す
+                while len(pending) < workers * 4:
+                    batch = list(itertools.islice(strings, batch_size))
+                    if not batch:
+                        break
+                    pending.append(executor.submit(_check_batch, batch))
+                if not pending:
+                    break
+                yield from pending.popleft().result()
+    finally:
+        release_shared_memory(shm)
@@ -0,0 +1,196 @@
+import contextlib
+import hashlib
+import json
+import os
+import pathlib
+import tempfile
+import warnings
+from typing import TYPE_CHECKING
+
+from cflpy.core import ProductionRules, Terminal, Variable
+
+if TYPE_CHECKING:
+    from cflpy.compiled import CompiledGrammar
+
+# キャッシュファイルの形式を変更した場合はこの値を上げる (古いキャッシュは読み込まれなくなる)
+# 2: pickle をやめ、CompiledGrammar のバイナリ形式 (規則表と索引を含む) で保存する
+CACHE_FORMAT_VERSION = 2
+
+# この環境変数が設定されている場合、CFGrammar.to_chomsky_normal_form は既定でそのディレクトリをキャッシュに使う
+CACHE_DIR_ENV = "CFLPY_CACHE_DIR"
+
+
+def get_package_version() -> str:
+    """
+    インストールされている cflpy のバージョンを取得する
+
+    Returns:
+        str: バージョン文字列。取得できない場合は "unknown"
+    """
+    # importlib.metadata は読み込みに時間がかかるため、キャッシュを使う場合のみ読み込む
+    import importlib.metadata
+
+    try:
+        return importlib.metadata.version("cflpy")
+    except importlib.metadata.PackageNotFoundError:
+        return "unknown"
+
+
+class GrammarCache:
+    def __init__(self, directory: pathlib.Path):
+        """
+        変換済みの文法をディスクに保存するキャッシュ
+
+        キャッシュのキーは元の文法の fingerprint、変換オプション、cflpy のバージョン、キャッシュ形式のバージョンから計算する。
+        そのため、文法または cflpy が更新された場合は自動的に別のキーになる。
+        キャッシュファイルは CompiledGrammar のバイナリ形式 (記号表、規則表、規則の索引) で保存する。
+        整数と文字列のみからなる形式で、読み込み時にコードを実行することはない。
+
+        Args:
+            directory(pathlib.Path): キャッシュを保存するディレクトリ (存在しない場合は作成される)
+        """
+        if not isinstance(directory, pathlib.Path):
+            raise TypeError(f"Expected pathlib.Path, got {type(directory)}")
+        self._directory = directory
+
+    @classmethod
+    def from_environment(cls) -> "GrammarCache | None":
+        """
+        環境変数 CFLPY_CACHE_DIR からキャッシュを作成する
+
+        Returns:
+            GrammarCache | None: 環境変数が設定されていない場合は None
+        """
+        directory = os.environ.get(CACHE_DIR_ENV)
+        if not directory:
+            return None
+        return cls(pathlib.Path(directory))
+
+    @property
+    def directory(self) -> pathlib.Path:
+        """
+        キャッシュを保存するディレクトリ
+
+        Returns:
+            pathlib.Path: キャッシュを保存するディレクトリ
+        """
+        return self._directory
+
+    def key(self, fingerprint: str, **options) -> str:
+        """
+        キャッシュのキーを計算する
+
+        Args:
+            fingerprint: 元の文法の fingerprint
+            options: 変換オプション (JSON に変換できる値)
+
+        Returns:
+            str: キャッシュのキー (SHA-256 の16進文字列)
+        """
+        payload = json.dumps(
+            {
+                "fingerprint": fingerprint,
+                "options": options,
+                "version": get_package_version(),
+                "format": CACHE_FORMAT_VERSION,
+            },
+            sort_keys=True,
+        )
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def path(self, key: str) -> pathlib.Path:
+        """
+        キーに対応するキャッシュファイルのパスを返す
+
+        Args:
+            key: キャッシュのキー
+
+        Returns:
+            pathlib.Path: キャッシュファイルのパス
+        """
+        return self._directory / key[:2] / f"{key}.cflc"
+
+    def load_compiled(self, key: str) -> "CompiledGrammar | None":
+        """
+        キャッシュから規則表と索引を mmap で読み込む
+
+        Args:
+            key: キャッシュのキー
+
+        Returns:
+            CompiledGrammar | None: 読み込んだ文法。キャッシュが存在しない、壊れている、
+                またはバイナリ形式のバージョンが異なる場合は None
+        """
+        # cflpy.compiled は cflpy.grammar を、cflpy.grammar はこのモジュールを読み込むため、使うときに読み込む
+        from cflpy.compiled import CompiledGrammar
+
+        try:
+            return CompiledGrammar.load(self.path(key))
+        except (OSError, ValueError):
+            return None
+
+    def load(self, key: str) -> tuple[set[Variable], set[Terminal], Variable, ProductionRules] | None:
+        """
+        キャッシュから文法を読み込む
+
+        Args:
+            key: キャッシュのキー
+
+        Returns:
+            tuple | None: (非終端記号の集合, 終端記号の集合, 開始記号, 生成規則)。
+                キャッシュが存在しない、壊れている、またはバージョンが異なる場合は None
+        """
+        compiled = self.load_compiled(key)
+        if compiled is None:
+            return None
+        try:
+            grammar = compiled.to_grammar()
+        except (IndexError, UnicodeDecodeError, ValueError):
+            return None
+        finally:
+            compiled.close()
+        return grammar.variables, grammar.terminals, grammar.start_symbol, grammar.production_rules
+
+    def store(
+        self,
+        key: str,
+        variables: set[Variable],
+        terminals: set[Terminal],
+        start_symbol: Variable,
+        production_rules: ProductionRules,
+    ) -> pathlib.Path | None:
+        """
+        チョムスキー標準形の文法をキャッシュに保存する
+        一時ファイルに書き込んでから置き換えるため、並行して読み込むプロセスが書きかけのファイルを読むことはない。
+
+        Args:
+            key: キャッシュのキー
+            variables: 非終端記号の集合
+            terminals: 終端記号の集合
+            start_symbol: 開始記号
+            production_rules: 生成規則 (チョムスキー標準形であること)
+
+        Returns:
+            pathlib.Path | None: 保存したファイルのパス。書き込めなかった場合は None
+        """
+        from cflpy.compiled import CompiledGrammar
+        from cflpy.grammar import ChomskyNormalFormGrammar
+
+        data = CompiledGrammar.encode(ChomskyNormalFormGrammar(variables, terminals, start_symbol, production_rules))
+        path = self.path(key)
+        try:
+            path.parent.mkdir(parents=True, exist_ok=True)
+            f = tempfile.NamedTemporaryFile("wb", dir=path.parent, suffix=".tmp", delete=False)
+            try:
+                with f:
+                    f.write(data)
+                os.replace(f.name, path)
+            except BaseException:
+                # 書き込みや置き換えに失敗した一時ファイルを残さない
+                with contextlib.suppress(OSError):
+                    os.unlink(f.name)
+                raise
+        except OSError as e:
+            warnings.warn(f"Failed to write grammar cache to {path}: {e}")
+            return None
+        return path
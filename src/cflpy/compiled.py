@@ -0,0 +1,649 @@
+import array
+import mmap
+import pathlib
+import struct
+import sys
+from multiprocessing import resource_tracker, shared_memory
+
+from cflpy.core import ProductionRuleRHS, ProductionRules, Sequence, Terminal, Variable
+from cflpy.grammar import ChomskyNormalFormGrammar
+
+# バイナリ形式の先頭に置く識別子とバージョン。形式を変更した場合はバージョンを上げる
+MAGIC = b"CFLC"
+FORMAT_VERSION = 1
+
+# ヘッダ: 識別子, バージョン, 変数の数, 終端記号の数, 開始記号, フラグ, 単項規則の数, 2項規則の数, 文字列表のバイト数
+HEADER = struct.Struct("<4sIIIIIIII")
+
+# フラグ: 開始記号が空文字列を生成する (S := ε)
+FLAG_START_NULLABLE = 1
+
+# バイナリ形式のファイルの拡張子
+COMPILED_SUFFIX = ".cflc"
+
+
+def _align(size: int) -> int:
+    return (size + 3) & ~3
+
+
+def is_compiled_file(path: pathlib.Path) -> bool:
+    """
+    ファイルがバイナリ形式の文法 (CompiledGrammar.save で保存したもの) かどうかを先頭のバイト列で判別する
+
+    Args:
+        path: ファイルのパス
+
+    Returns:
+        bool: 先頭が MAGIC の場合は True (バージョンは CompiledGrammar の読み込み時に検証する)
+    """
+    with path.open("rb") as f:
+        return f.read(len(MAGIC)) == MAGIC
+
+
+def release_shared_memory(shm: shared_memory.SharedMemory) -> None:
+    """
+    CompiledGrammar.to_shared_memory で作成した共有メモリを閉じて削除する
+    Python 3.12 以前は attach したプロセスが resource_tracker への登録を取り消しており、所有者と resource_tracker を
+    共有するプロセス (プロセスプールのワーカーなど) が取り消すと所有者の登録も消える。unlink() は登録の取り消しを
+    伴うため、登録し直してから削除する (登録は名前ごとに1件にまとめられる)。
+
+    Args:
+        shm: to_shared_memory が返した共有メモリ
+    """
+    shm.close()
+    if sys.version_info < (3, 13):
+        resource_tracker.register(shm._name, "shared_memory")
+    shm.unlink()
+
+
+class CompiledGrammar:
+    def __init__(self, buffer):
+        """
+        整数で符号化したチョムスキー標準形の文法
+
+        バイナリ形式は以下のセクションをこの順に並べたものである (整数は全てリトルエンディアンの32bit)。
+        - ヘッダ (HEADER)
+        - 文字列表のオフセット: 変数名、終端記号名の順に (変数の数 + 終端記号の数 + 1) 個
+        - 文字列表: UTF-8 でエンコードした名前を連結したもの (4バイト境界まで0で埋める)
+        - 単項規則 A := t の左辺: 終端記号の番号順に並べたもの
+        - 単項規則の索引: 終端記号 t の規則は 左辺[索引[t]:索引[t + 1]]
+        - 2項規則 A := B C の左辺、右辺の右側: (B, C) の順に並べたもの
+        - 2項規則の索引: 右辺の左側が B である規則は [索引[B]:索引[B + 1]]
+
+        規則表は buffer 上の memoryview として参照するため、mmap したファイルや共有メモリの上で
+        コピーせずに認識を行える。
+
+        Args:
+            buffer: バイナリ形式のデータ (bytes, mmap, memoryview など buffer protocol をサポートするもの)
+        """
+        if sys.byteorder != "little":
+            raise NotImplementedError("CompiledGrammar requires a little-endian platform.")
+        self._buffer = buffer
+        view = memoryview(buffer)
+        if len(view) < HEADER.size:
+            raise ValueError("Buffer is too small to contain a compiled grammar.")
+        (
+            magic,
+            version,
+            self.num_variables,
+            self.num_terminals,
+            self.start_symbol_id,
+            self.flags,
+            self.num_unary,
+            self.num_binary,
+            string_bytes,
+        ) = HEADER.unpack_from(view, 0)
+        if magic != MAGIC:
+            raise ValueError(f"Invalid compiled grammar: unexpected magic {magic!r}")
+        if version != FORMAT_VERSION:
+            raise ValueError(f"Unsupported compiled grammar version {version} (expected {FORMAT_VERSION})")
+
+        offset = HEADER.size
+        sections = {}
+        for name, size in [
+            ("string_offsets", 4 * (self.num_variables + self.num_terminals + 1)),
+            ("strings", _align(string_bytes)),
+            ("unary_lhs", 4 * self.num_unary),
+            ("unary_index", 4 * (self.num_terminals + 1)),
+            ("binary_lhs", 4 * self.num_binary),
+            ("binary_right", 4 * self.num_binary),
+            ("binary_index", 4 * (self.num_variables + 1)),
+        ]:
+            if offset + size > len(view):
+                raise ValueError("Invalid compiled grammar: buffer is truncated.")
+            sections[name] = view[offset : offset + size]
+            offset += size
+        # 共有メモリはページ単位で確保されるため、末尾の余分な領域は含めない
+        self._view = view[:offset]
+        self._shared_memory: shared_memory.SharedMemory | None = None
+        self._strings = sections["strings"]
+        self.string_offsets = sections["string_offsets"].cast("I")
+        self.unary_lhs = sections["unary_lhs"].cast("i")
+        self.unary_index = sections["unary_index"].cast("i")
+        self.binary_lhs = sections["binary_lhs"].cast("i")
+        self.binary_right = sections["binary_right"].cast("i")
+        self.binary_index = sections["binary_index"].cast("i")
+        self._terminal_ids: dict[str, int] | None = None
+        self._terminal_masks: dict[int, int] = {}
+        self._first_masks: list[int] | None = None
+
+    @classmethod
+    def from_grammar(cls, grammar: ChomskyNormalFormGrammar) -> "CompiledGrammar":
+        """
+        チョムスキー標準形の文法をバイナリ形式に変換する
+
+        Args:
+            grammar: チョムスキー標準形の文法
+
+        Returns:
+            CompiledGrammar: 変換した文法
+        """
+        return cls(cls.encode(grammar))
+
+    @staticmethod
+    def encode(grammar: ChomskyNormalFormGrammar) -> bytes:
+        """
+        チョムスキー標準形の文法をバイナリ形式のバイト列に変換する
+        記号の番号は名前順に割り当てるため、同じ文法からは常に同じバイト列が得られる。
+
+        Args:
+            grammar: チョムスキー標準形の文法
+
+        Returns:
+            bytes: バイナリ形式のデータ (整数はリトルエンディアン)
+        """
+        # 読み込み (__init__) と同じく、規則表はネイティブのバイト順のまま書き出す
+        if sys.byteorder != "little":
+            raise NotImplementedError("CompiledGrammar requires a little-endian platform.")
+        variable_names = sorted(
+            {var.name for var in grammar.variables} | {var.name for var in grammar.production_rules.keys()}
+        )
+        terminal_names = sorted({term.name for term in grammar.terminals})
+        variable_ids = {name: i for i, name in enumerate(variable_names)}
+        terminal_ids = {name: i for i, name in enumerate(terminal_names)}
+
+        flags = 0
+        unary: list[tuple[int, int]] = []
+        binary: list[tuple[int, int, int]] = []
+        for lhs, rhs in grammar.production_rules.items():
+            for seq in rhs:
+                if len(seq) == 0:
+                    if lhs == grammar.start_symbol:
+                        flags |= FLAG_START_NULLABLE
+                elif len(seq) == 1:
+                    unary.append((terminal_ids[seq[0].name], variable_ids[lhs.name]))
+                else:
+                    binary.append((variable_ids[seq[0].name], variable_ids[seq[1].name], variable_ids[lhs.name]))
+        unary.sort()
+        binary.sort()
+
+        encoded_names = [name.encode("utf-8") for name in variable_names + terminal_names]
+        string_offsets = [0]
+        for encoded in encoded_names:
+            string_offsets.append(string_offsets[-1] + len(encoded))
+        strings = b"".join(encoded_names)
+
+        unary_index = [0] * (len(terminal_names) + 1)
+        for terminal, _ in unary:
+            unary_index[terminal + 1] += 1
+        binary_index = [0] * (len(variable_names) + 1)
+        for left, _, _ in binary:
+            binary_index[left + 1] += 1
+        for index in (unary_index, binary_index):
+            for i in range(1, len(index)):
+                index[i] += index[i - 1]
+
+        def int_array(values: list[int], typecode: str = "i") -> bytes:
+            return array.array(typecode, values).tobytes()
+
+        return b"".join(
+            [
+                HEADER.pack(
+                    MAGIC,
+                    FORMAT_VERSION,
+                    len(variable_names),
+                    len(terminal_names),
+                    variable_ids[grammar.start_symbol.name],
+                    flags,
+                    len(unary),
+                    len(binary),
+                    len(strings),
+                ),
+                int_array(string_offsets, "I"),
+                strings.ljust(_align(len(strings)), b"\0"),
+                int_array([lhs for _, lhs in unary]),
+                int_array(unary_index),
+                int_array([lhs for _, _, lhs in binary]),
+                int_array([right for _, right, _ in binary]),
+                int_array(binary_index),
+            ]
+        )
+
+    @classmethod
+    def load(cls, path: pathlib.Path, use_mmap: bool = True) -> "CompiledGrammar":
+        """
+        ファイルからバイナリ形式の文法を読み込む
+
+        Args:
+            path: ファイルのパス
+            use_mmap: True の場合、ファイルを読み取り専用で mmap する。
+                同じファイルを読み込んだ複数のプロセスはページキャッシュ上の1つのコピーを共有する
+
+        Returns:
+            CompiledGrammar: 読み込んだ文法
+        """
+        if not isinstance(path, pathlib.Path):
+            raise TypeError(f"Expected pathlib.Path, got {type(path)}")
+        with path.open("rb") as f:
+            if use_mmap:
+                return cls(mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ))
+            return cls(f.read())
+
+    def to_shared_memory(self, name: str | None = None) -> shared_memory.SharedMemory:
+        """
+        バイナリ形式のデータを新しい共有メモリにコピーする
+        ワーカープロセスは attach(shm.name) で同じ規則表を参照できるため、文法はメモリ上に1つだけ置かれる。
+        返された共有メモリは呼び出し側が所有し、不要になったら release_shared_memory で削除すること。
+
+        Args:
+            name: 共有メモリの名前。None の場合は自動で決められる
+
+        Returns:
+            shared_memory.SharedMemory: 作成した共有メモリ
+        """
+        shm = shared_memory.SharedMemory(name=name, create=True, size=self.nbytes)
+        shm.buf[: self.nbytes] = self._view
+        return shm
+
+    @classmethod
+    def attach(cls, name: str) -> "CompiledGrammar":
+        """
+        to_shared_memory で作成した共有メモリ上の文法を、コピーせずに参照する
+        プロセスプールのワーカーなど、共有メモリを作成したプロセス (所有者) 以外から参照するためのもの。
+        共有メモリは所有者が unlink する。参照するプロセスは close() で割り当てを解除するだけで、
+        終了しても共有メモリは削除されない (所有者と関係のない単独のプロセスから attach した場合も同様)。
+
+        Args:
+            name: 共有メモリの名前
+
+        Returns:
+            CompiledGrammar: 共有メモリ上の文法。close() で共有メモリへの割り当てを解除する
+        """
+        if sys.version_info >= (3, 13):
+            # 参照するだけのプロセスの終了時に共有メモリが削除されないようにする
+            shm = shared_memory.SharedMemory(name=name, track=False)
+        else:
+            # Python 3.12 以前は参照するだけでも resource_tracker に登録され、終了時に所有者に無断で共有メモリが
+            # 削除される (または警告される) ため、登録を取り消す
+            shm = shared_memory.SharedMemory(name=name)
+            resource_tracker.unregister(shm._name, "shared_memory")
+        grammar = cls(shm.buf)
+        grammar._shared_memory = shm
+        return grammar
+
+    def save(self, path: pathlib.Path) -> None:
+        """
+        バイナリ形式の文法をファイルに保存する
+
+        Args:
+            path: ファイルのパス
+        """
+        if not isinstance(path, pathlib.Path):
+            raise TypeError(f"Expected pathlib.Path, got {type(path)}")
+        with path.open("wb") as f:
+            f.write(self._view)
+
+    def to_bytes(self) -> bytes:
+        """
+        バイナリ形式のデータを bytes として返す
+
+        Returns:
+            bytes: バイナリ形式のデータ
+        """
+        return self._view.tobytes()
+
+    def close(self) -> None:
+        """
+        buffer への参照を解放する。mmap で読み込んだ場合はファイルの、attach した場合は共有メモリの割り当ても解除する
+        """
+        for view in (
+            self.string_offsets,
+            self.unary_lhs,
+            self.unary_index,
+            self.binary_lhs,
+            self.binary_right,
+            self.binary_index,
+            self._strings,
+            self._view,
+        ):
+            view.release()
+        if isinstance(self._buffer, mmap.mmap):
+            self._buffer.close()
+        if self._shared_memory is not None:
+            self._buffer.release()
+            self._shared_memory.close()
+            self._shared_memory = None
+
+    @property
+    def nbytes(self) -> int:
+        """
+        バイナリ形式のデータのバイト数
+        """
+        return len(self._view)
+
+    def symbol_name(self, symbol_id: int) -> str:
+        """
+        文字列表から記号の名前を取得する
+
+        Args:
+            symbol_id: 変数の番号、もしくは (変数の数 + 終端記号の番号)
+
+        Returns:
+            str: 記号の名前
+        """
+        start, end = self.string_offsets[symbol_id], self.string_offsets[symbol_id + 1]
+        return self._strings[start:end].tobytes().decode("utf-8")
+
+    def variable_name(self, variable_id: int) -> str:
+        """
+        変数の番号から名前を取得する
+        """
+        return self.symbol_name(variable_id)
+
+    def terminal_name(self, terminal_id: int) -> str:
+        """
+        終端記号の番号から名前を取得する
+        """
+        return self.symbol_name(self.num_variables + terminal_id)
+
+    def terminal_id(self, name: str) -> int | None:
+        """
+        終端記号の名前から番号を取得する
+
+        Args:
+            name: 終端記号の名前
+
+        Returns:
+            int | None: 終端記号の番号。文法に含まれない場合は None
+        """
+        if self._terminal_ids is None:
+            self._terminal_ids = {self.terminal_name(i): i for i in range(self.num_terminals)}
+        return self._terminal_ids.get(name)
+
+    def to_grammar(self) -> ChomskyNormalFormGrammar:
+        """
+        バイナリ形式から ChomskyNormalFormGrammar を復元する
+
+        Returns:
+            ChomskyNormalFormGrammar: 復元した文法
+        """
+        variables = [Variable(self.variable_name(i)) for i in range(self.num_variables)]
+        terminals = [Terminal(self.terminal_name(i)) for i in range(self.num_terminals)]
+        production_rules = ProductionRules()
+        start_symbol = variables[self.start_symbol_id]
+        production_rules[start_symbol] = ProductionRuleRHS()
+        if self.flags & FLAG_START_NULLABLE:
+            production_rules[start_symbol].add(Sequence([]))
+        for terminal in range(self.num_terminals):
+            for r in range(self.unary_index[terminal], self.unary_index[terminal + 1]):
+                lhs = variables[self.unary_lhs[r]]
+                if lhs not in production_rules.keys():
+                    production_rules[lhs] = ProductionRuleRHS()
+                production_rules[lhs].add(Sequence([terminals[terminal]]))
+        for left in range(self.num_variables):
+            for r in range(self.binary_index[left], self.binary_index[left + 1]):
+                lhs = variables[self.binary_lhs[r]]
+                if lhs not in production_rules.keys():
+                    production_rules[lhs] = ProductionRuleRHS()
+                production_rules[lhs].add(Sequence([variables[left], variables[self.binary_right[r]]]))
+        return ChomskyNormalFormGrammar(set(variables), set(terminals), start_symbol, production_rules)
+
+    def terminal_mask(self, terminal_id: int) -> int:
+        """
+        終端記号を直接生成する変数の集合をビット集合で返す
+
+        Args:
+            terminal_id: 終端記号の番号
+
+        Returns:
+            int: 変数の番号をビット位置とするビット集合
+        """
+        mask = self._terminal_masks.get(terminal_id)
+        if mask is None:
+            mask = 0
+            for r in range(self.unary_index[terminal_id], self.unary_index[terminal_id + 1]):
+                mask |= 1 << self.unary_lhs[r]
+            self._terminal_masks[terminal_id] = mask
+        return mask
+
+    def get_cyk_chart(self, terminal_ids: list[int]) -> list[list[int]]:
+        """
+        CYKアルゴリズムの表を、各セルを変数のビット集合として計算する
+
+        Args:
+            terminal_ids: 終端記号の番号の列
+
+        Returns:
+            list[list[int]]: chart[length - 1][i] が部分列 [i, i + length) を生成する変数のビット集合
+        """
+        n = len(terminal_ids)
+        binary_index, binary_lhs, binary_right = self.binary_index, self.binary_lhs, self.binary_right
+        chart = [[self.terminal_mask(t) for t in terminal_ids]]
+        for length in range(2, n + 1):
+            row = []
+            for i in range(n - length + 1):
+                bits = 0
+                for left_length in range(1, length):
+                    left = chart[left_length - 1][i]
+                    right = chart[length - left_length - 1][i + left_length]
+                    if not left or not right:
+                        continue
+                    while left:
+                        lowest = left & -left
+                        b = lowest.bit_length() - 1
+                        left ^= lowest
+                        for r in range(binary_index[b], binary_index[b + 1]):
+                            if right >> binary_right[r] & 1:
+                                bits |= 1 << binary_lhs[r]
+                row.append(bits)
+            chart.append(row)
+        return chart
+
+    def is_member_ids(self, terminal_ids: list[int]) -> bool:
+        """
+        終端記号の番号の列が言語に含まれるか判定する
+
+        Args:
+            terminal_ids: 終端記号の番号の列
+
+        Returns:
+            bool: 言語に含まれるかどうか
+        """
+        if not terminal_ids:
+            return bool(self.flags & FLAG_START_NULLABLE)
+        chart = self.get_cyk_chart(terminal_ids)
+        return bool(chart[-1][0] >> self.start_symbol_id & 1)
+
+    def is_member(self, string: str) -> bool:
+        """
+        空白区切りの文字列が言語に含まれるか判定する
+
+        Args:
+            string: 判定対象の文字列
+
+        Returns:
+            bool: 言語に含まれるかどうか
+        """
+        return self.is_member_ids(self.tokenize(string))
+
+    def tokenize(self, string: str) -> list[int]:
+        """
+        空白区切りの文字列を終端記号の番号の列にする
+
+        Args:
+            string: 空白区切りの文字列
+
+        Returns:
+            list[int]: 終端記号の番号の列
+        """
+        if not isinstance(string, str):
+            raise ValueError("Input must be a string.")
+        terminal_ids = []
+        for token in string.split():
+            terminal_id = self.terminal_id(token)
+            if terminal_id is None:
+                raise ValueError(f"Terminal {token} is not in the grammar's terminals.\n Given: {string}")
+            terminal_ids.append(terminal_id)
+        return terminal_ids
+
+    def get_parse_tree_ids(self, terminal_ids: list[int]) -> dict | None:
+        """
+        CYK の表をたどって、終端記号の番号の列の解析木を1つ構築する
+        解析木はチョムスキー標準形の文法での導出であり、元の文法の導出ではない。節点の記号には変換で追加された変数
+        (開始記号の "Expr'"、長い規則を分解する X1 など、終端記号の代わりの Y1 など) が現れ、単位規則の除去や
+        minimize で消えた元の変数 (Expr := Term の Term など) は現れない。
+
+        Args:
+            terminal_ids: 終端記号の番号の列
+
+        Returns:
+            dict | None: {"symbol": 変数名, "children": [子の解析木...]} の形の解析木
+                (葉は {"symbol": 終端記号名})。言語に含まれない場合は None
+        """
+        if not terminal_ids:
+            if not self.flags & FLAG_START_NULLABLE:
+                return None
+            return {"symbol": self.variable_name(self.start_symbol_id), "children": []}
+        chart = self.get_cyk_chart(terminal_ids)
+        if not chart[-1][0] >> self.start_symbol_id & 1:
+            return None
+
+        binary_index, binary_lhs, binary_right = self.binary_index, self.binary_lhs, self.binary_right
+        root = {"symbol": self.variable_name(self.start_symbol_id), "children": []}
+        # 再帰の深さが入力の長さに比例しないよう、(節点, 変数, 開始位置, 長さ) のスタックで構築する
+        stack = [(root, self.start_symbol_id, 0, len(terminal_ids))]
+        while stack:
+            node, variable, i, length = stack.pop()
+            if length == 1:
+                node["children"].append({"symbol": self.terminal_name(terminal_ids[i])})
+                continue
+            found = None
+            for left_length in range(1, length):
+                left_bits = chart[left_length - 1][i]
+                right_bits = chart[length - left_length - 1][i + left_length]
+                while left_bits and found is None:
+                    lowest = left_bits & -left_bits
+                    b = lowest.bit_length() - 1
+                    left_bits ^= lowest
+                    for r in range(binary_index[b], binary_index[b + 1]):
+                        if binary_lhs[r] == variable and right_bits >> binary_right[r] & 1:
+                            found = (b, binary_right[r], left_length)
+                            break
+                if found is not None:
+                    break
+            left, right, left_length = found
+            left_node = {"symbol": self.variable_name(left), "children": []}
+            right_node = {"symbol": self.variable_name(right), "children": []}
+            node["children"] = [left_node, right_node]
+            stack.append((right_node, right, i + left_length, length - left_length))
+            stack.append((left_node, left, i, left_length))
+        return root
+
+    def get_parse_tree(self, string: str) -> dict | None:
+        """
+        空白区切りの文字列の解析木を1つ構築する (get_parse_tree_ids)。解析木はチョムスキー標準形の文法での導出
+
+        Args:
+            string: 空白区切りの文字列
+
+        Returns:
+            dict | None: 解析木。言語に含まれない場合は None
+        """
+        return self.get_parse_tree_ids(self.tokenize(string))
+
+    def first_masks(self) -> list[int]:
+        """
+        各変数が生成する記号列の先頭に現れうる終端記号の集合をビット集合で返す
+
+        Returns:
+            list[int]: 変数の番号 -> 終端記号の番号をビット位置とするビット集合
+        """
+        if self._first_masks is None:
+            first = [0] * self.num_variables
+            for terminal in range(self.num_terminals):
+                for r in range(self.unary_index[terminal], self.unary_index[terminal + 1]):
+                    first[self.unary_lhs[r]] |= 1 << terminal
+            # A := B C のとき FIRST(A) ⊇ FIRST(B) (チョムスキー標準形では開始記号以外は空文字列を生成しない)
+            changed = True
+            while changed:
+                changed = False
+                for left in range(self.num_variables):
+                    for r in range(self.binary_index[left], self.binary_index[left + 1]):
+                        lhs = self.binary_lhs[r]
+                        if first[left] & ~first[lhs]:
+                            first[lhs] |= first[left]
+                            changed = True
+            self._first_masks = first
+        return self._first_masks
+
+    def next_terminal_ids(self, terminal_ids: list[int]) -> list[int]:
+        """
+        終端記号の番号の列 w に続けられる終端記号 t (w t v が言語に含まれる記号列 v が存在するもの) を求める
+
+        位置 i について、各変数 A から w[i:] t ... を導出できる t の集合 N[i][A] を i の大きい順に計算する。
+        A := B C に対して、B が w[i:k] を生成するなら N[i][A] ⊇ N[k][C]、また N[i][A] ⊇ N[i][B] である。
+        N[n][A] は A の FIRST 集合となる。
+
+        Args:
+            terminal_ids: 終端記号の番号の列
+
+        Returns:
+            list[int]: 続けられる終端記号の番号 (昇順)
+        """
+        n = len(terminal_ids)
+        binary_index, binary_lhs, binary_right = self.binary_index, self.binary_lhs, self.binary_right
+        chart = self.get_cyk_chart(terminal_ids) if n > 0 else []
+        first = self.first_masks()
+        # next_masks[k]: 変数 -> N[k][変数] (空集合は省略)
+        next_masks: list[dict[int, int]] = [{} for _ in range(n)]
+        next_masks.append({variable: mask for variable, mask in enumerate(first) if mask})
+        for i in range(n - 1, -1, -1):
+            masks: dict[int, int] = {}
+            for k in range(i + 1, n + 1):
+                following = next_masks[k]
+                if not following:
+                    continue
+                left_bits = chart[k - i - 1][i]
+                while left_bits:
+                    lowest = left_bits & -left_bits
+                    b = lowest.bit_length() - 1
+                    left_bits ^= lowest
+                    for r in range(binary_index[b], binary_index[b + 1]):
+                        mask = following.get(binary_right[r])
+                        if mask:
+                            masks[binary_lhs[r]] = masks.get(binary_lhs[r], 0) | mask
+            # 左の子を通じて N[i][B] を N[i][A] に伝播する
+            worklist = list(masks)
+            while worklist:
+                b = worklist.pop()
+                mask = masks[b]
+                for r in range(binary_index[b], binary_index[b + 1]):
+                    lhs = binary_lhs[r]
+                    if mask & ~masks.get(lhs, 0):
+                        masks[lhs] = masks.get(lhs, 0) | mask
+                        worklist.append(lhs)
+            next_masks[i] = masks
+        mask = next_masks[0].get(self.start_symbol_id, 0)
+        return [t for t in range(self.num_terminals) if mask >> t & 1]
+
+    def next_terminals(self, string: str) -> list[str]:
+        """
+        空白区切りの文字列に続けられる終端記号の名前を求める (next_terminal_ids)
+
+        Args:
+            string: 空白区切りの文字列
+
+        Returns:
+            list[str]: 続けられる終端記号の名前 (番号順、すなわち名前順)
+        """
+        return [self.terminal_name(t) for t in self.next_terminal_ids(self.tokenize(string))]
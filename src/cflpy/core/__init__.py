@@ -1,3 +1,11 @@
-from cflpy.core.types import ProductionRuleRHS, ProductionRules, Sequence, Symbol, Terminal, Variable
+from cflpy.core.types import (
+    ProductionRuleRHS,
+    ProductionRules,
+    Sequence,
+    SimplificationStats,
+    Symbol,
+    Terminal,
+    Variable,
+)
 
-__all__ = ["ProductionRuleRHS", "ProductionRules", "Sequence", "Symbol", "Terminal", "Variable"]
+__all__ = ["ProductionRuleRHS", "ProductionRules", "Sequence", "SimplificationStats", "Symbol", "Terminal", "Variable"]
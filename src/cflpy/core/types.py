@@ -1,4 +1,9 @@
+import dataclasses
+import hashlib
+import itertools
+import json
 import random
+import types
 
 
 class Symbol:
@@ -16,13 +21,14 @@ class Symbol:
     def __str__(self):
         return self.name
 
+    # 集合や辞書で頻繁に呼ばれるため、プロパティを経由せずに属性を参照する
     def __eq__(self, other):
         if not isinstance(other, Symbol):
             return False
-        return self.name == other.name
+        return self._name == other._name
 
     def __hash__(self):
-        return hash(self.name)
+        return hash(self._name)
 
     def startswith(self, prefix: str) -> bool:
         return self.name.startswith(prefix)
@@ -51,7 +57,8 @@ class Sequence:
             symbols = []
         elif not isinstance(symbols, list):
             raise TypeError("symbols must be a list of Symbol objects")
-        if not all(isinstance(symbol, Symbol) for symbol in symbols):
+        # isinstance を map で呼び出し、要素ごとに Python のジェネレータを経由しないようにする
+        if not all(map(isinstance, symbols, itertools.repeat(Symbol))):
             raise TypeError("all elements in symbols must be Symbol objects")
         self._symbols = symbols
 
@@ -84,10 +91,10 @@ class Sequence:
     def __eq__(self, other):
         if not isinstance(other, Sequence):
             return False
-        return self.symbols == other.symbols
+        return self._symbols == other._symbols
 
     def __hash__(self):
-        return hash(tuple(self.symbols))
+        return hash(tuple(self._symbols))
 
 
 class ProductionRuleRHS:
@@ -99,11 +106,15 @@ class ProductionRuleRHS:
     def add(self, sequence: Sequence):
         if not isinstance(sequence, Sequence):
             raise TypeError("sequence must be a Sequence object")
+        if self.frozen:
+            raise TypeError("frozen ProductionRuleRHS cannot be modified")
         self._rhs.add(sequence)
 
     def remove(self, sequence: Sequence):
         if not isinstance(sequence, Sequence):
             raise TypeError("sequence must be a Sequence object")
+        if self.frozen:
+            raise TypeError("frozen ProductionRuleRHS cannot be modified")
         if sequence not in self._rhs:
             raise ValueError("sequence not found in rhs")
         self._rhs.remove(sequence)
@@ -111,13 +122,29 @@ class ProductionRuleRHS:
     def update(self, other: "ProductionRuleRHS"):
         if not isinstance(other, ProductionRuleRHS):
             raise TypeError("other must be a ProductionRuleRHS object")
+        if self.frozen:
+            raise TypeError("frozen ProductionRuleRHS cannot be modified")
         self._rhs.update(other.rhs)
 
     def get_random(self):
         return random.choice(list(self._rhs))
 
     def copy(self):
-        return ProductionRuleRHS(self._rhs.copy())
+        # 凍結された右辺を複製した場合も、複製は変更可能にする
+        return ProductionRuleRHS(set(self._rhs))
+
+    def freeze(self) -> "ProductionRuleRHS":
+        """右辺の集合を変更できないようにする
+
+        Returns:
+            ProductionRuleRHS: 自身
+        """
+        self._rhs = frozenset(self._rhs)
+        return self
+
+    @property
+    def frozen(self) -> bool:
+        return isinstance(self._rhs, frozenset)
 
     @property
     def rhs(self):
@@ -138,7 +165,24 @@ class ProductionRuleRHS:
         return self.rhs == other.rhs
 
     def __hash__(self):
-        return hash(self.rhs)
+        return hash(frozenset(self.rhs))
+
+
+@dataclasses.dataclass
+class SimplificationStats:
+    """不要な記号の除去の統計
+
+    Attributes:
+        non_generating: 終端記号列を生成できないため除去した変数
+        unreachable: 開始記号から到達できないため除去した変数
+        unused_terminals: 除去後の規則に現れなくなった終端記号
+        removed_rules: 除去した規則の数
+    """
+
+    non_generating: set[Variable] = dataclasses.field(default_factory=set)
+    unreachable: set[Variable] = dataclasses.field(default_factory=set)
+    unused_terminals: set[Terminal] = dataclasses.field(default_factory=set)
+    removed_rules: int = 0
 
 
 class ProductionRules:
@@ -146,6 +190,7 @@ class ProductionRules:
         if production_rules is None:
             production_rules = {}
         self._production_rules = production_rules
+        self._frozen = False
 
     def keys(self):
         return self._production_rules.keys()
@@ -159,6 +204,152 @@ class ProductionRules:
     def copy(self):
         return ProductionRules(self._production_rules.copy())
 
+    def deepcopy(self) -> "ProductionRules":
+        """右辺の集合まで複製した生成規則を返す (Sequence は共有する)
+
+        Returns:
+            ProductionRules: 変更可能な複製
+        """
+        return ProductionRules({lhs: rhs.copy() for lhs, rhs in self.items()})
+
+    def freeze(self) -> "ProductionRules":
+        """生成規則と全ての右辺を変更できないようにする
+
+        Returns:
+            ProductionRules: 自身
+        """
+        for rhs in self._production_rules.values():
+            rhs.freeze()
+        self._frozen = True
+        return self
+
+    @property
+    def frozen(self) -> bool:
+        return self._frozen
+
+    def find_generating(self) -> set[Variable]:
+        """終端記号列を生成できる変数を求める
+        各規則について生成可能と確定していない変数の出現数を数え、ワークリストで線形時間で計算する。
+
+        Returns:
+            set[Variable]: 終端記号列を生成できる変数の集合
+        """
+        rule_lhs: list[Variable] = []
+        pending_variables: list[int] = []
+        occurrences: dict[Variable, list[int]] = {}
+        for lhs, rhs in self.items():
+            for seq in rhs:
+                rule_id = len(rule_lhs)
+                rule_lhs.append(lhs)
+                pending_variables.append(0)
+                for sym in seq:
+                    if isinstance(sym, Variable):
+                        occurrences.setdefault(sym, []).append(rule_id)
+                        pending_variables[rule_id] += 1
+
+        generating = {rule_lhs[rule_id] for rule_id, count in enumerate(pending_variables) if count == 0}
+        worklist = list(generating)
+        while worklist:
+            var = worklist.pop()
+            for rule_id in occurrences.get(var, []):
+                pending_variables[rule_id] -= 1
+                lhs = rule_lhs[rule_id]
+                if pending_variables[rule_id] == 0 and lhs not in generating:
+                    generating.add(lhs)
+                    worklist.append(lhs)
+        return generating
+
+    def find_reachable(self, start_symbol: Variable) -> set[Variable]:
+        """開始記号から到達できる変数をグラフ探索で求める
+
+        Args:
+            start_symbol: 開始記号
+
+        Returns:
+            set[Variable]: 開始記号から到達できる変数の集合 (開始記号を含む)
+        """
+        reachable = {start_symbol}
+        worklist = [start_symbol]
+        while worklist:
+            var = worklist.pop()
+            if var not in self._production_rules:
+                continue
+            for seq in self._production_rules[var]:
+                for sym in seq:
+                    if isinstance(sym, Variable) and sym not in reachable:
+                        reachable.add(sym)
+                        worklist.append(sym)
+        return reachable
+
+    def simplify(
+        self, start_symbol: Variable, return_stats: bool = False
+    ) -> "ProductionRules | tuple[ProductionRules, SimplificationStats]":
+        """不要な記号を除去した新しい生成規則を返す (simplify_in_place を複製に対して適用する)
+
+        Args:
+            start_symbol: 開始記号
+            return_stats: True の場合、除去の統計 (SimplificationStats) も返す
+
+        Returns:
+            ProductionRules: 不要な記号を除去した生成規則
+            SimplificationStats: 除去の統計 (return_stats が True の場合のみ)
+        """
+        new_production_rules = self.deepcopy()
+        stats = new_production_rules.simplify_in_place(start_symbol)
+        if return_stats:
+            return new_production_rules, stats
+        return new_production_rules
+
+    def simplify_in_place(self, start_symbol: Variable) -> SimplificationStats:
+        """不要な記号をこの生成規則から直接除去する
+        まず終端記号列を生成できない変数とそれを含む規則を除去し、次に開始記号から到達できない変数を除去する。
+        言語が空の場合でも、開始記号は右辺が空の規則として残す。
+
+        Args:
+            start_symbol: 開始記号
+
+        Returns:
+            SimplificationStats: 除去の統計
+        """
+        if self._frozen:
+            raise TypeError("frozen ProductionRules cannot be modified")
+
+        all_variables = set(self.keys())
+        old_terminals: set[Terminal] = set()
+        num_rules = 0
+        for rhs in self.values():
+            num_rules += len(rhs)
+            for seq in rhs:
+                for sym in seq:
+                    if isinstance(sym, Terminal):
+                        old_terminals.add(sym)
+                    else:
+                        all_variables.add(sym)
+
+        generating = self.find_generating()
+        for lhs in [lhs for lhs in self.keys() if lhs not in generating]:
+            del self._production_rules[lhs]
+        for rhs in self.values():
+            useless = [
+                seq for seq in rhs if not all(not isinstance(sym, Variable) or sym in generating for sym in seq)
+            ]
+            for seq in useless:
+                rhs.remove(seq)
+
+        reachable = self.find_reachable(start_symbol)
+        for lhs in [lhs for lhs in self.keys() if lhs not in reachable]:
+            del self._production_rules[lhs]
+        if start_symbol not in self.keys():
+            self._production_rules[start_symbol] = ProductionRuleRHS()
+
+        new_terminals = {sym for rhs in self.values() for seq in rhs for sym in seq if isinstance(sym, Terminal)}
+        return SimplificationStats(
+            non_generating=all_variables - generating,
+            unreachable=generating - reachable,
+            unused_terminals=old_terminals - new_terminals,
+            removed_rules=num_rules - sum(len(rhs) for rhs in self.values()),
+        )
+
     def __getitem__(self, key: Variable) -> ProductionRuleRHS:
         if not isinstance(key, Variable):
             raise TypeError("key must be a Variable object")
@@ -169,17 +360,23 @@ class ProductionRules:
             raise TypeError("key must be a Variable object")
         if not isinstance(value, ProductionRuleRHS):
             raise TypeError("value must be a ProductionRuleRHS object")
+        if self._frozen:
+            raise TypeError("frozen ProductionRules cannot be modified")
         self._production_rules[key] = value
 
     def __delitem__(self, key: Variable):
         if not isinstance(key, Variable):
             raise TypeError("key must be a Variable object")
+        if self._frozen:
+            raise TypeError("frozen ProductionRules cannot be modified")
         if key not in self._production_rules:
             raise KeyError("key not found in production rules")
         del self._production_rules[key]
 
     @property
     def production_rules(self):
+        if self._frozen:
+            return types.MappingProxyType(self._production_rules)
         return self._production_rules
 
     def __repr__(self):
@@ -191,4 +388,37 @@ class ProductionRules:
         return self.production_rules == other.production_rules
 
     def __hash__(self):
-        return hash(tuple(self.production_rules.items()))
+        return hash(frozenset(self.production_rules.items()))
+
+    def fingerprint(self) -> str:
+        """生成規則の順序に依存しない正規化されたハッシュ値を返す
+        各規則を JSON で正規化して並べ替えたものの SHA-256 を計算する。
+        Symbol の等価性は名前のみで判定されるが、ここでは終端記号かどうかも区別する。
+
+        Returns:
+            str: SHA-256 の16進文字列
+        """
+        digest = hashlib.sha256()
+        for line in sorted(self.canonical_lines()):
+            digest.update(line.encode("utf-8"))
+            digest.update(b"\n")
+        return digest.hexdigest()
+
+    def canonical_lines(self) -> list[str]:
+        """各規則を1行の JSON 文字列に正規化したリストを返す (順序は不定)
+
+        Returns:
+            list[str]: ["左辺", [["v" | "t", "記号"], ...]] 形式の JSON 文字列のリスト。
+                右辺が空の左辺も区別できるよう、左辺ごとに ["左辺", null] の行も含む
+        """
+        lines = [json.dumps([lhs.name, None], ensure_ascii=False) for lhs in self.keys()]
+        lines.extend(
+            json.dumps(
+                [lhs.name, [["t" if sym.is_terminal else "v", sym.name] for sym in seq]],
+                ensure_ascii=False,
+                separators=(",", ":"),
+            )
+            for lhs, rhs in self.items()
+            for seq in rhs
+        )
+        return lines
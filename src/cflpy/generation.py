@@ -0,0 +1,332 @@
+import collections
+import concurrent.futures
+import hashlib
+import math
+import random
+from collections.abc import Iterator
+
+from cflpy.analysis import find_max_yield_lengths, find_min_yield_lengths, find_yield_lengths
+from cflpy.core import Variable
+from cflpy.grammar import CFGrammar
+
+# 長さの範囲から生成できる記号列があるかを find_yield_lengths で確かめる max_len の上限 (長さの集合の計算量は max_len の2乗に比例する)
+LENGTH_ANALYSIS_LIMIT = 10_000
+
+
+def find_derivation_heights(alternatives: dict[Variable, list[tuple]]) -> dict[Variable, int]:
+    """
+    各変数から終端記号列を導出する導出木の高さの最小値を求める
+    高さの小さい変数から順に幅優先で確定させる (find_generating と同じく、規則ごとに未確定の変数の出現数を数える)。
+
+    Args:
+        alternatives: 変数 -> 規則のリスト (各規則の先頭の要素が右辺の記号の列)。終端記号列を生成できる規則のみ
+
+    Returns:
+        dict[Variable, int]: 変数 -> 高さの最小値 (右辺が終端記号のみの規則は高さ1)
+    """
+    rule_lhs: list[Variable] = []
+    pending_variables: list[int] = []
+    occurrences: dict[Variable, list[int]] = {}
+    queue: collections.deque[tuple[Variable, int]] = collections.deque()
+    for lhs, rules in alternatives.items():
+        for alt in rules:
+            rule_id = len(rule_lhs)
+            rule_lhs.append(lhs)
+            pending_variables.append(0)
+            for sym in alt[0]:
+                if not sym.is_terminal:
+                    occurrences.setdefault(sym, []).append(rule_id)
+                    pending_variables[rule_id] += 1
+            if pending_variables[rule_id] == 0:
+                queue.append((lhs, 1))
+
+    heights: dict[Variable, int] = {}
+    while queue:
+        var, height = queue.popleft()
+        if var in heights:
+            continue
+        heights[var] = height
+        for rule_id in occurrences.get(var, []):
+            pending_variables[rule_id] -= 1
+            if pending_variables[rule_id] == 0 and rule_lhs[rule_id] not in heights:
+                # キューの高さは単調に増加するため、最後に確定した変数の高さ + 1 が規則の高さになる
+                queue.append((rule_lhs[rule_id], height + 1))
+    return heights
+
+
+class StringGenerator:
+    def __init__(
+        self,
+        grammar: CFGrammar,
+        min_len: int = 0,
+        max_len: int | None = None,
+        max_depth: int = 1000,
+        max_attempts: int = 100,
+    ):
+        """
+        文法からランダムに終端記号列を生成する
+
+        最左導出で変数を展開するたびに、生成できる長さの最小値・最大値 (analysis) から
+        [min_len, max_len] に収まる可能性のある規則だけを選ぶ。展開の回数が max_depth に達した後は、
+        各変数の導出木の高さが最小になる規則だけを使うため、生成は必ず停止する。
+        長さの範囲に収まらなかった記号列は捨てて生成し直す。
+        範囲内の長さの記号列が文法から生成できない場合 (奇数長の記号列のみの文法で偶数長を指定した場合など) は、
+        生成を試みずに ValueError を送出する (max_len が LENGTH_ANALYSIS_LIMIT を超える場合は長さの偶奇などを確かめない)。
+
+        Args:
+            grammar: 文法
+            min_len: 記号列の長さ (終端記号の数) の最小値
+            max_len: 記号列の長さの最大値。None の場合は制限しない
+            max_depth: 規則を自由に選ぶ展開の回数の上限
+            max_attempts: 1つの記号列を生成するための試行回数の上限
+        """
+        if min_len < 0 or (max_len is not None and max_len < min_len):
+            raise ValueError(f"Invalid length range: [{min_len}, {max_len}]")
+        production_rules = grammar.production_rules
+        min_lengths = find_min_yield_lengths(production_rules)
+        max_lengths = find_max_yield_lengths(production_rules)
+        generating = {var for var, length in min_lengths.items() if length != math.inf}
+        if grammar.start_symbol not in generating:
+            raise ValueError(f"Start symbol {grammar.start_symbol} generates no strings.")
+        start_max_length = max_lengths[grammar.start_symbol]
+        if max_len is not None and max_len <= LENGTH_ANALYSIS_LIMIT:
+            producible = find_yield_lengths(production_rules, max_len)[grammar.start_symbol] >> min_len != 0
+        else:
+            producible = start_max_length == math.inf or start_max_length >= min_len
+        if not producible:
+            raise ValueError(
+                f"Start symbol {grammar.start_symbol} generates no strings of length in [{min_len}, {max_len}]."
+            )
+
+        def bounds(symbols) -> tuple[int, int, int]:
+            # (長さの最小値, 長さの最大値の有限部分, 最大値が無限大の記号の数)
+            low, high, unbounded = 0, 0, 0
+            for sym in symbols:
+                if sym.is_terminal:
+                    low += 1
+                    high += 1
+                elif max_lengths[sym] == math.inf:
+                    low += min_lengths[sym]
+                    unbounded += 1
+                else:
+                    low += min_lengths[sym]
+                    high += max_lengths[sym]
+            return low, high, unbounded
+
+        # 変数 -> [(右辺の記号の逆順のタプル, 最小値, 最大値の有限部分, 無限大の数)]。終端記号列を生成できる規則のみ
+        self._alternatives: dict[Variable, list[tuple[tuple, int, int, int]]] = {}
+        for lhs in generating:
+            self._alternatives[lhs] = [
+                (tuple(reversed(seq.symbols)), *bounds(seq.symbols))
+                # 乱数で選ぶ順序が文字列のハッシュ値 (PYTHONHASHSEED) によらないよう、規則を名前順に並べる
+                for seq in sorted(
+                    production_rules[lhs], key=lambda seq: [(sym.is_terminal, sym.name) for sym in seq.symbols]
+                )
+                if all(sym.is_terminal or sym in generating for sym in seq.symbols)
+            ]
+        # 変数 -> 導出木の高さが最小の規則のうち、長さの最小値が最小で最初のもの
+        heights = find_derivation_heights(self._alternatives)
+        self._min_rules: dict[Variable, tuple[tuple, int, int, int]] = {
+            lhs: min(
+                (
+                    alt
+                    for alt in alternatives
+                    if 1 + max((heights[sym] for sym in alt[0] if not sym.is_terminal), default=0) == heights[lhs]
+                ),
+                key=lambda alt: alt[1],
+            )
+            for lhs, alternatives in self._alternatives.items()
+        }
+        self._start = (grammar.start_symbol,)
+        self._start_bounds = bounds(self._start)
+        self._bounds = {lhs: bounds([lhs]) for lhs in generating}
+        self.min_len = min_len
+        self.max_len = math.inf if max_len is None else max_len
+        self.max_depth = max_depth
+        self.max_attempts = max_attempts
+
+    def generate_once(self, rng: random.Random) -> list[str] | None:
+        """
+        記号列を1回生成する
+
+        Args:
+            rng: 乱数生成器
+
+        Returns:
+            list[str] | None: 終端記号の名前の列。長さの範囲に収まらなかった場合は None
+        """
+        min_len, max_len = self.min_len, self.max_len
+        alternatives, min_rules, var_bounds = self._alternatives, self._min_rules, self._bounds
+        output: list[str] = []
+        stack = list(self._start)
+        # 出力済みの記号と stack の記号から生成される長さの (最小値, 最大値の有限部分, 無限大の数)
+        low, high, unbounded = self._start_bounds
+        expansions = 0
+        while stack:
+            sym = stack.pop()
+            if sym.is_terminal:
+                output.append(sym.name)
+                continue
+            sym_low, sym_high, sym_unbounded = var_bounds[sym]
+            low -= sym_low
+            high -= sym_high
+            unbounded -= sym_unbounded
+            if expansions < self.max_depth:
+                candidates = [
+                    alt
+                    for alt in alternatives[sym]
+                    if low + alt[1] <= max_len and (unbounded + alt[3] > 0 or high + alt[2] >= min_len)
+                ]
+                alt = rng.choice(candidates) if candidates else min_rules[sym]
+            else:
+                alt = min_rules[sym]
+            expansions += 1
+            stack.extend(alt[0])
+            low += alt[1]
+            high += alt[2]
+            unbounded += alt[3]
+        if min_len <= len(output) <= max_len:
+            return output
+        return None
+
+    def generate(self, rng: random.Random) -> str | None:
+        """
+        長さの範囲に収まる記号列を生成する
+
+        Args:
+            rng: 乱数生成器
+
+        Returns:
+            str | None: 空白区切りの記号列。max_attempts 回試行しても範囲に収まらなかった場合は None
+        """
+        for _ in range(self.max_attempts):
+            output = self.generate_once(rng)
+            if output is not None:
+                return " ".join(output)
+        return None
+
+    def generate_batch(self, seed: int, batch_index: int, size: int) -> list[str]:
+        """
+        (seed, batch_index) から決まる乱数で size 回生成する
+        バッチごとに乱数を初期化するため、結果はどのプロセスで生成しても同じになる。
+
+        Args:
+            seed: 乱数の種
+            batch_index: バッチの番号
+            size: 生成する回数
+
+        Returns:
+            list[str]: 生成した記号列 (範囲に収まらなかった分は含まない)
+        """
+        rng = random.Random(f"{seed}:{batch_index}")
+        return [string for string in (self.generate(rng) for _ in range(size)) if string is not None]
+
+
+# ワーカープロセスで使う StringGenerator (_init_generator で設定する)
+_worker_generator: StringGenerator | None = None
+
+
+def _init_generator(grammar: CFGrammar, options: dict) -> None:
+    global _worker_generator
+    _worker_generator = StringGenerator(grammar, **options)
+
+
+def _generate_batch(seed: int, batch_index: int, size: int) -> list[str]:
+    return _worker_generator.generate_batch(seed, batch_index, size)
+
+
+def generate_strings(
+    grammar: CFGrammar,
+    count: int,
+    seed: int | None = None,
+    workers: int = 1,
+    batch_size: int = 1024,
+    unique: bool = False,
+    max_stalled_batches: int = 10,
+    **options,
+) -> Iterator[str]:
+    """
+    文法から count 個の記号列を順に生成する
+
+    記号列は batch_size 個ずつのバッチとして生成し、バッチ i は (seed, i) から決まる乱数を使うため、
+    seed が同じなら workers の数によらず同じ列が得られる。workers が2以上の場合はバッチをプロセスプールで生成し、
+    処理中のバッチの数を workers の数倍に制限するため、メモリ使用量は count によらない。
+    unique の場合は生成済みの記号列のハッシュ値 (8バイト) を保持して重複を除く。
+    新しい記号列が得られないバッチが max_stalled_batches 回続いた場合 (言語が有限の場合など) は count 個に満たなくても終了する。
+    バッチの全ての生成が長さの範囲に収まらなかった場合は、範囲の長さがほとんど生成されないとみなしてすぐに終了する。
+
+    Args:
+        grammar: 文法
+        count: 生成する記号列の数
+        seed: 乱数の種。None の場合はランダムに決める
+        workers: 生成に使うプロセス数
+        batch_size: 1回にワーカーに生成させる数
+        unique: 重複した記号列を除くかどうか
+        max_stalled_batches: 新しい記号列が得られないバッチがこの回数続いたら終了する
+        options: StringGenerator の引数 (min_len, max_len, max_depth, max_attempts)
+
+    Returns:
+        Iterator[str]: 空白区切りの記号列
+    """
+    if count < 0:
+        raise ValueError(f"count must be non-negative, got {count}")
+    if batch_size <= 0:
+        raise ValueError(f"batch_size must be positive, got {batch_size}")
+    if seed is None:
+        seed = random.SystemRandom().getrandbits(64)
+    seen: set[bytes] = set()
+    produced = 0
+    stalled = 0
+    if count == 0:
+        return
+    batches = _iter_batches(grammar, seed, workers, batch_size, options)
+    try:
+        for batch in batches:
+            if not batch:
+                # batch_size * max_attempts 回の試行が全て長さの範囲に収まらなかった
+                return
+            new_strings = 0
+            for string in batch:
+                if unique:
+                    digest = hashlib.blake2b(string.encode("utf-8"), digest_size=8).digest()
+                    if digest in seen:
+                        continue
+                    seen.add(digest)
+                yield string
+                new_strings += 1
+                produced += 1
+                if produced >= count:
+                    return
+            stalled = 0 if new_strings else stalled + 1
+            if stalled >= max_stalled_batches:
+                return
+    finally:
+        # ワーカーに投入済みのバッチを取り消す
+        batches.close()
+
+
+def _iter_batches(grammar: CFGrammar, seed: int, workers: int, batch_size: int, options: dict) -> Iterator[list[str]]:
+    # 生成したバッチを番号順に無限に返す (終了は呼び出し側が決める)
+    if workers <= 1:
+        generator = StringGenerator(grammar, **options)
+        batch_index = 0
+        while True:
+            yield generator.generate_batch(seed, batch_index, batch_size)
+            batch_index += 1
+
+    # 引数の検証はワーカーを起動する前に行う
+    StringGenerator(grammar, **options)
+    with concurrent.futures.ProcessPoolExecutor(
+        max_workers=workers, initializer=_init_generator, initargs=(grammar, options)
+    ) as executor:
+        pending: collections.deque[concurrent.futures.Future] = collections.deque()
+        batch_index = 0
+        try:
+            while True:
+                while len(pending) < workers * 4:
+                    pending.append(executor.submit(_generate_batch, seed, batch_index, batch_size))
+                    batch_index += 1
+                yield pending.popleft().result()
+        finally:
+            for future in pending:
+                future.cancel()
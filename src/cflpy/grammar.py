@@ -1,7 +1,46 @@
+import dataclasses
+import hashlib
+import json
+import logging
 import random
-
-from cflpy.core import ProductionRuleRHS, ProductionRules, Sequence, Terminal, Variable
-from cflpy.to_chomsly_normal_form import to_chomsky_normal_form
+from collections.abc import Callable
+
+from cflpy.analysis import (
+    find_left_corners,
+    find_max_yield_lengths,
+    find_min_yield_lengths,
+    find_yield_terminals,
+)
+from cflpy.cache import GrammarCache
+from cflpy.core import ProductionRuleRHS, ProductionRules, Sequence, SimplificationStats, Terminal, Variable
+from cflpy.to_chomsly_normal_form import (
+    ConversionRecorder,
+    ConversionReport,
+    StepReport,
+    to_binary_normal_form,
+    to_chomsky_normal_form,
+)
+from cflpy.to_chomsly_normal_form.report import logger as report_logger
+from cflpy.to_chomsly_normal_form.step3_remove_unit import find_unit_pairs
+
+logger = logging.getLogger(__name__)
+
+
+@dataclasses.dataclass
+class CYKStats:
+    """CYK アルゴリズムの計算量の統計
+
+    Attributes:
+        checked: 規則を調べた (変数, 区間) の組の数
+        pruned_by_length: 生成できる長さの範囲外のため調べなかった組の数
+        pruned_by_terminals: 生成しない終端記号を区間が含むため調べなかった組の数
+        pruned_by_prediction: 区間の開始位置で開始記号から予測されないため調べなかった組の数
+    """
+
+    checked: int = 0
+    pruned_by_length: int = 0
+    pruned_by_terminals: int = 0
+    pruned_by_prediction: int = 0
 
 
 class CFGrammar:
@@ -29,16 +68,139 @@ class CFGrammar:
     def __repr__(self):
         return f"{self.__class__.__name__}(\n  variables={self.variables},\n  terminals={self.terminals},\n  start_symbol={self.start_symbol},\n  production_rules={self.production_rules}\n)"
 
-    def to_chomsky_normal_form(self) -> "ChomskyNormalFormGrammar":
+    def fingerprint(self) -> str:
+        """
+        文法の内容から、集合や辞書の順序に依存しない正規化されたハッシュ値を計算する
+
+        Returns:
+            str: SHA-256 の16進文字列
+        """
+        header = json.dumps(
+            {
+                "start_symbol": self.start_symbol.name,
+                "variables": sorted(var.name for var in self.variables),
+                "terminals": sorted(term.name for term in self.terminals),
+            },
+            ensure_ascii=False,
+            separators=(",", ":"),
+        )
+        digest = hashlib.sha256(header.encode("utf-8"))
+        digest.update(self.production_rules.fingerprint().encode("ascii"))
+        return digest.hexdigest()
+
+    def simplify(self, return_stats: bool = False) -> "CFGrammar | tuple[CFGrammar, SimplificationStats]":
+        """
+        終端記号列を生成できない記号と、開始記号から到達できない記号を除去した文法を返す
+
+        Args:
+            return_stats: True の場合、除去の統計 (SimplificationStats) も返す
+
+        Returns:
+            CFGrammar: 不要な記号を除去した文法 (元の文法と同じクラス)
+            SimplificationStats: 除去の統計 (return_stats が True の場合のみ)
+        """
+        production_rules, stats = self.production_rules.simplify(self.start_symbol, return_stats=True)
+        variables = set(production_rules.keys())
+        terminals = {
+            sym for rhs in production_rules.values() for seq in rhs for sym in seq if isinstance(sym, Terminal)
+        }
+        # 規則を持たない変数は終端記号列を生成できない
+        stats.non_generating |= self.variables - variables - stats.unreachable
+        stats.unused_terminals = self.terminals - terminals
+
+        grammar = self.__class__(variables, terminals, self.start_symbol, production_rules)
+        if return_stats:
+            return grammar, stats
+        return grammar
+
+    def to_chomsky_normal_form(
+        self,
+        binarize_first: bool = True,
+        simplify: bool = True,
+        minimize: bool = False,
+        cache: GrammarCache | None = None,
+        return_report: bool = False,
+        on_step: Callable[[StepReport], None] | None = None,
+        trace_memory: bool = False,
+    ) -> "ChomskyNormalFormGrammar | tuple[ChomskyNormalFormGrammar, ConversionReport]":
         """
         文法をチョムスキー標準形に変換
+
+        cache を指定した場合 (指定しない場合は環境変数 CFLPY_CACHE_DIR が設定されていればそのディレクトリ)、
+        同じ内容の文法を同じオプションで変換した結果がキャッシュにあればそれを読み込み、なければ変換結果を保存する。
+
+        各ステップの経過時間と変数・規則の数は、return_report, on_step で受け取れるほか、
+        ロガー cflpy.to_chomsly_normal_form.report に DEBUG レベルで出力される。
+
+        Args:
+            binarize_first: ε規則の除去の前に長い規則を分解するかどうか (False で従来の変換順序)
+            simplify: 変換の前後で不要な記号を除去するかどうか
+            minimize: 変換後に等価な変数を併合するかどうか (ChomskyNormalFormGrammar.minimize)
+            cache: 変換結果のキャッシュ
+            return_report: True の場合、変換の計測結果 (ConversionReport) も返す
+            on_step: ステップが終わるたびに、そのステップの計測結果 (StepReport) を渡して呼び出される関数
+            trace_memory: tracemalloc で各ステップのメモリ確保の最大値を計測するかどうか
+
+        Returns:
+            ChomskyNormalFormGrammar: 変換後の文法
+            ConversionReport: 変換の計測結果 (return_report が True の場合のみ)
         """
-        print("Converting grammar to Chomsky Normal Form...")
+        recorder = None
+        if return_report or on_step is not None or trace_memory or report_logger.isEnabledFor(logging.DEBUG):
+            recorder = ConversionRecorder(on_step=on_step, trace_memory=trace_memory)
+        report = recorder.report if recorder is not None else ConversionReport()
+
+        if cache is None:
+            cache = GrammarCache.from_environment()
+        if cache is not None:
+            cache_key = cache.key(
+                self.fingerprint(), binarize_first=binarize_first, simplify=simplify, minimize=minimize
+            )
+            cached = cache.load(cache_key)
+            if cached is not None:
+                report.cache_hit = True
+                grammer = ChomskyNormalFormGrammar(*cached)
+                return (grammer, report) if return_report else grammer
+
         grammer = ChomskyNormalFormGrammar(
-            *to_chomsky_normal_form(self.variables, self.terminals, self.start_symbol, self.production_rules)
+            *to_chomsky_normal_form(
+                self.variables,
+                self.terminals,
+                self.start_symbol,
+                self.production_rules,
+                binarize_first=binarize_first,
+                simplify=simplify,
+                recorder=recorder,
+            )
+        )
+        if minimize:
+            if recorder is None:
+                grammer = grammer.minimize()
+            else:
+                with recorder.step("minimize", lambda: (grammer.variables, grammer.production_rules)):
+                    grammer = grammer.minimize()
+
+        if cache is not None:
+            cache.store(
+                cache_key, grammer.variables, grammer.terminals, grammer.start_symbol, grammer.production_rules
+            )
+        return (grammer, report) if return_report else grammer
+
+    def to_binary_normal_form(self, simplify: bool = True) -> "BinaryNormalFormGrammar":
+        """
+        文法を2項標準形 (単位規則を残したチョムスキー標準形) に変換
+
+        Args:
+            simplify: 変換の前後で不要な記号を除去するかどうか
+
+        Returns:
+            BinaryNormalFormGrammar: 変換後の文法
+        """
+        return BinaryNormalFormGrammar(
+            *to_binary_normal_form(
+                self.variables, self.terminals, self.start_symbol, self.production_rules, simplify=simplify
+            )
         )
-        print("Conversion complete.")
-        return grammer
 
     def is_member(self, sequence: Sequence) -> bool:
         """
@@ -149,68 +311,225 @@ class ChomskyNormalFormGrammar(CFGrammar):
                     raise ValueError(f"Production rule {lhs} -> {rhs} is not in Chomsky Normal Form: Unit production.")
         return
 
-    def get_cyk_table(self, sequence: Sequence) -> list[list[dict[Variable, bool]]]:
+    def minimize(self) -> "ChomskyNormalFormGrammar":
+        """
+        等価な変数を併合した文法を返す
+
+        変数の分割を「全ての変数が同じクラス」(開始記号のみ別クラス) から始め、
+        右辺の集合を現在のクラスで書き換えたものが異なる変数どうしを別のクラスに分ける操作を
+        分割が変化しなくなるまで繰り返す (分割の細分化による不動点計算)。
+        同じクラスに属する変数は右辺の集合が名前の付け替えを除いて一致するため、1つの変数に併合できる。
+        各クラスの代表には開始記号、もしくは名前が最小の変数を用いる。
+
+        Returns:
+            ChomskyNormalFormGrammar: 等価な変数を併合した文法
+        """
+        variables = sorted(self.variables | set(self.production_rules.keys()), key=lambda var: var.name)
+        class_of: dict[Variable, int] = {var: int(var == self.start_symbol) for var in variables}
+        num_classes = len(set(class_of.values()))
+
+        while True:
+            signatures: dict[tuple, int] = {}
+            new_class_of: dict[Variable, int] = {}
+            for var in variables:
+                rhs = self.production_rules[var] if var in self.production_rules.keys() else ProductionRuleRHS()
+                signature = (
+                    class_of[var],
+                    frozenset(
+                        tuple(
+                            ("t", sym.name) if isinstance(sym, Terminal) else ("v", class_of.get(sym, sym.name))
+                            for sym in seq
+                        )
+                        for seq in rhs
+                    ),
+                )
+                new_class_of[var] = signatures.setdefault(signature, len(signatures))
+            class_of = new_class_of
+            if len(signatures) == num_classes:
+                break
+            num_classes = len(signatures)
+
+        # 各クラスの代表を決める (variables は名前順なので、最初に現れた変数が名前最小)
+        representatives: dict[int, Variable] = {class_of[self.start_symbol]: self.start_symbol}
+        for var in variables:
+            representatives.setdefault(class_of[var], var)
+
+        def rename(sym):
+            if isinstance(sym, Variable) and sym in class_of:
+                return representatives[class_of[sym]]
+            return sym
+
+        production_rules = ProductionRules()
+        for representative in representatives.values():
+            if representative not in self.production_rules.keys():
+                continue
+            production_rules[representative] = ProductionRuleRHS(
+                {Sequence([rename(sym) for sym in seq]) for seq in self.production_rules[representative]}
+            )
+        return self.__class__(set(representatives.values()), self.terminals, self.start_symbol, production_rules)
+
+    def get_yield_analysis(
+        self,
+    ) -> tuple[dict[Variable, int | float], dict[Variable, int | float], dict[Variable, frozenset[Terminal]]]:
+        """
+        CYK の枝刈りに用いる、各変数が生成できる終端記号列の長さの範囲と終端記号の集合を返す
+        初回の呼び出しで計算した結果を保持するため、以降に生成規則を変更してはならない。
+
+        Returns:
+            dict[Variable, int | float]: 変数 -> 長さの最小値 (cflpy.analysis.find_min_yield_lengths)
+            dict[Variable, int | float]: 変数 -> 長さの最大値 (cflpy.analysis.find_max_yield_lengths)
+            dict[Variable, frozenset[Terminal]]: 変数 -> 終端記号の集合 (cflpy.analysis.find_yield_terminals)
+        """
+        if getattr(self, "_yield_analysis", None) is None:
+            self._yield_analysis = (
+                find_min_yield_lengths(self.production_rules),
+                find_max_yield_lengths(self.production_rules),
+                find_yield_terminals(self.production_rules),
+            )
+        return self._yield_analysis
+
+    def get_left_corner_analysis(
+        self,
+    ) -> tuple[dict[Variable, frozenset[Variable]], dict[Variable, list[tuple[Variable, Variable]]]]:
+        """
+        CYK の予測フィルタに用いる、左隅の閉包と2項規則の左の変数による逆引きを返す
+        初回の呼び出しで計算した結果を保持するため、以降に生成規則を変更してはならない。
+
+        Returns:
+            dict[Variable, frozenset[Variable]]: 変数 -> 左隅の閉包 (cflpy.analysis.find_left_corners)
+            dict[Variable, list[tuple[Variable, Variable]]]: B -> 規則 A := B C の (A, C) のリスト
+        """
+        if getattr(self, "_left_corner_analysis", None) is None:
+            rules_by_left: dict[Variable, list[tuple[Variable, Variable]]] = {}
+            for lhs, rhs in self.production_rules.items():
+                for seq in rhs:
+                    if len(seq) == 2:
+                        rules_by_left.setdefault(seq[0], []).append((lhs, seq[1]))
+            self._left_corner_analysis = (find_left_corners(self.production_rules), rules_by_left)
+        return self._left_corner_analysis
+
+    def get_cyk_table(
+        self, sequence: Sequence, prune: bool = False, predict: bool = False, return_stats: bool = False
+    ) -> list[list[dict[Variable, bool]]] | tuple[list[list[dict[Variable, bool]]], CYKStats]:
         """
         CYKアルゴリズムのテーブルを生成
 
+        テーブルは終了位置の昇順 (同じ終了位置の中では開始位置の降順) に埋める。
+        prune が True の場合、区間の長さが変数の生成できる長さの範囲外である組と、
+        変数が生成しない終端記号を区間が含む組は、規則を調べずに False とする (get_yield_analysis)。
+        predict が True の場合、区間の開始位置 i で開始記号から予測される変数、すなわち
+        S =>* sequence[:i] A γ となる変数 A のみを調べる (左隅による Earley 法の予測)。
+        位置 i の予測は、i より前で終わる区間が埋まった時点で、予測された変数の規則 A := B C のうち
+        B が位置 i で終わる区間を生成するものの C の左隅の閉包として求める (get_left_corner_analysis)。
+        予測で除外した変数は導出木に現れないため、判定結果と導出履歴は変わらない。
+
         Args:
             sequence: 判定対象の文字列
+            prune: 生成できないことが明らかな (変数, 区間) の組を調べずに済ませるかどうか
+            predict: 開始記号から予測されない (変数, 区間) の組を調べずに済ませるかどうか
+            return_stats: True の場合、計算量の統計 (CYKStats) も返す
 
         Returns:
             list[list[dict[Variable, bool]]]: CYKテーブル
+            CYKStats: 計算量の統計 (return_stats が True の場合のみ)
         """
         if not all(isinstance(symbol, Terminal) for symbol in sequence):
             raise ValueError("All symbols in the sequence must be terminals.")
 
         n = len(sequence)
-        r = len(self.variables)
+        stats = CYKStats()
 
         cyk_table = [[{v: False for v in self.variables} for _ in range(n)] for _ in range(n)]
 
-        # Initialize the table with terminal symbols production rules
-        for i in range(n):
+        if prune:
+            min_lengths, max_lengths, yield_terminals = self.get_yield_analysis()
+            # foreign[lhs][p]: sequence[:p] のうち lhs が生成しない終端記号の数 (区間に含まれるかを O(1) で判定する)
+            foreign: dict[Variable, list[int]] = {}
+            for lhs in self.production_rules.keys():
+                counts = [0]
+                for symbol in sequence:
+                    counts.append(counts[-1] + (symbol not in yield_terminals[lhs]))
+                foreign[lhs] = counts
+
+        if predict:
+            left_corners, rules_by_left = self.get_left_corner_analysis()
+            # predicted[i]: 位置 i で開始記号から予測される変数の集合
+            predicted: list[set[Variable]] = [set(left_corners.get(self.start_symbol, {self.start_symbol}))]
+
+        for j in range(n):
+            if predict and j > 0:
+                # 位置 j で終わる区間 (i, j - 1) を生成する B について、予測済みの A := B C から C を予測する
+                expected: set[Variable] = set()
+                for i in range(j):
+                    for left, derivable in cyk_table[i][j - 1].items():
+                        if not derivable:
+                            continue
+                        for lhs, right in rules_by_left.get(left, []):
+                            if lhs in predicted[i] and right not in expected:
+                                expected |= left_corners.get(right, {right})
+                predicted.append(expected)
+
+            # Initialize the table with terminal symbols production rules
             for lhs, rhs in self.production_rules.items():
-                cyk_table[i][i][lhs] = Sequence([sequence[i]]) in rhs
-
-        for length in range(2, n + 1):
-            for i in range(n - length + 1):
-                j = i + length - 1
-                for k in range(i, j):
-                    for lhs, rhs in self.production_rules.items():
+                if predict and lhs not in predicted[j]:
+                    stats.pruned_by_prediction += 1
+                    continue
+                stats.checked += 1
+                cyk_table[j][j][lhs] = Sequence([sequence[j]]) in rhs
+
+            for i in range(j - 1, -1, -1):
+                length = j - i + 1
+                for lhs, rhs in self.production_rules.items():
+                    if prune:
+                        if not min_lengths[lhs] <= length <= max_lengths[lhs]:
+                            stats.pruned_by_length += 1
+                            continue
+                        if foreign[lhs][j + 1] - foreign[lhs][i] > 0:
+                            stats.pruned_by_terminals += 1
+                            continue
+                    if predict and lhs not in predicted[i]:
+                        stats.pruned_by_prediction += 1
+                        continue
+                    stats.checked += 1
+                    for k in range(i, j):
                         for seq in rhs:
-                            if len(seq) == 1:
+                            if len(seq) != 2:
                                 continue
                             if cyk_table[i][k][seq[0]] and cyk_table[k + 1][j][seq[1]]:
                                 cyk_table[i][j][lhs] = True
                                 break
                         if cyk_table[i][j][lhs] is True:
                             break
-                    if cyk_table[i][j][lhs] is True:
-                        break
+        if return_stats:
+            return cyk_table, stats
         return cyk_table
 
-    def is_member_seq(self, sequence: Sequence) -> bool:
+    def is_member_seq(self, sequence: Sequence, prune: bool = False, predict: bool = False) -> bool:
         """
         CYKアルゴリズムで文字列が言語に含まれるか判定
 
         Args:
             sequence: 判定対象の文字列
+            prune: CYK で生成できないことが明らかな (変数, 区間) の組を調べずに済ませるかどうか
+            predict: CYK で開始記号から予測されない (変数, 区間) の組を調べずに済ませるかどうか
 
         Returns:
             bool: 言語に含まれるかどうか
         """
         # cyk_tableを生成
-        cyk_table = self.get_cyk_table(sequence)
+        cyk_table = self.get_cyk_table(sequence, prune=prune, predict=predict)
 
         # 開始記号が生成するかどうかを確認
         return cyk_table[0][-1][self.start_symbol]
 
-    def is_member(self, string: str) -> bool:
+    def is_member(self, string: str, prune: bool = False, predict: bool = False) -> bool:
         """
         文字列が文法に含まれるか判定
 
         Args:
             string: 判定対象の文字列
+            prune: CYK で生成できないことが明らかな (変数, 区間) の組を調べずに済ませるかどうか
+            predict: CYK で開始記号から予測されない (変数, 区間) の組を調べずに済ませるかどうか
 
         Returns:
             bool: 文法に含まれるかどうか
@@ -221,7 +540,7 @@ class ChomskyNormalFormGrammar(CFGrammar):
         for t in sequence:
             if t not in self.terminals:
                 raise ValueError(f"Terminal {t} is not in the grammar's terminals.\n Given: {string}")
-        return self.is_member_seq(sequence)
+        return self.is_member_seq(sequence, prune=prune, predict=predict)
 
     def get_generation_history(self, seq: Sequence) -> dict:
         """
@@ -283,7 +602,7 @@ class ChomskyNormalFormGrammar(CFGrammar):
         if start == end:
             for rhs in self.production_rules[variable]:
                 if len(rhs) == 1 and rhs[0] == seq[start]:
-                    print(f"Conversion: {variable} -> {seq[start]}")
+                    logger.debug("Conversion: %s -> %s", variable, seq[start])
                     return seq[start]
             raise ValueError(f"Could not reconstruct parse tree for {variable} from {start} to {end}")
 
@@ -304,8 +623,154 @@ class ChomskyNormalFormGrammar(CFGrammar):
                     left_tree = self._build_parse_tree(cyk_table, start, k, left_var, seq)
                     right_tree = self._build_parse_tree(cyk_table, k + 1, end, right_var, seq)
 
-                    print(f"Conversion: {variable} -> {left_var} {right_var}")
+                    logger.debug("Conversion: %s -> %s %s", variable, left_var, right_var)
                     return {left_var: left_tree, right_var: right_tree}
 
         # ここに到達するのは理論上はあり得ない（CYKテーブルが正しければ）
         raise ValueError(f"Could not reconstruct parse tree for {variable} from {start} to {end}")
+
+
+class BinaryNormalFormGrammar(CFGrammar):
+    def __init__(
+        self,
+        variables: set[Variable],
+        terminals: set[Terminal],
+        start_symbol: Variable,
+        production_rules: ProductionRules,
+    ):
+        """
+        2項標準形 (2NF) の文法を表現するクラス
+
+        チョムスキー標準形の規則 (A := B C, A := a) に加えて単位規則 A := B を許す。
+        ε規則は開始記号のみが持つことができる。
+        CYK では各セルに単位規則の閉包を適用するため、単位規則を除去せずにメンバーシップ判定ができる。
+
+        Args:
+            variables: 非終端記号の集合
+            terminals: 終端記号の集合
+            start_symbol: 開始記号
+            production_rules: 生成規則の辞書 {非終端: [右辺の記号...]}
+        """
+        self.validate_binary_normal_form(start_symbol, production_rules)
+        super().__init__(variables, terminals, start_symbol, production_rules)
+
+        # 単位規則の閉包の逆引き {B: B := ... を単位規則の連鎖で導出できる変数 A の集合 (B 自身を含む)}
+        self.unit_closure: dict[Variable, set[Variable]] = {}
+        for lhs, targets in find_unit_pairs(production_rules).items():
+            for target in targets | {lhs}:
+                self.unit_closure.setdefault(target, set()).add(lhs)
+
+        # CYK のための逆引きインデックス
+        self.terminal_index: dict[Terminal, set[Variable]] = {}
+        self.binary_index: dict[tuple[Variable, Variable], set[Variable]] = {}
+        for lhs, rhs in production_rules.items():
+            for seq in rhs:
+                if len(seq) == 1 and isinstance(seq[0], Terminal):
+                    self.terminal_index.setdefault(seq[0], set()).add(lhs)
+                elif len(seq) == 2:
+                    self.binary_index.setdefault((seq[0], seq[1]), set()).add(lhs)
+
+    def validate_binary_normal_form(self, start_symbol: Variable, production_rules: ProductionRules) -> None:
+        """
+        2項標準形の文法かどうかを検証
+
+        Args:
+            start_symbol: 開始記号
+            production_rules: 生成規則の辞書 {非終端: [右辺の記号...]}
+
+        Raises:
+            ValueError: 2項標準形でない場合
+        """
+        for lhs, rhs_set in production_rules.items():
+            for rhs in rhs_set:
+                if len(rhs) > 2:
+                    raise ValueError(f"Production rule {lhs} -> {rhs} is not in Binary Normal Form: Too long.")
+                if len(rhs) == 2 and any(isinstance(symbol, Terminal) for symbol in rhs):
+                    raise ValueError(
+                        f"Production rule {lhs} -> {rhs} is not in Binary Normal Form: 2 terms rule with terminals."
+                    )
+                if len(rhs) == 0 and lhs != start_symbol:
+                    raise ValueError(f"Production rule {lhs} -> {rhs} is not in Binary Normal Form: Epsilon rule.")
+
+    def close_units(self, cell: set[Variable]) -> set[Variable]:
+        """
+        セルの変数の集合に、単位規則でそれらを導出できる変数を加える
+
+        Args:
+            cell: 変数の集合
+
+        Returns:
+            set[Variable]: 単位規則の閉包を適用した変数の集合
+        """
+        closed: set[Variable] = set()
+        for var in cell:
+            closed |= self.unit_closure.get(var, {var})
+        return closed
+
+    def get_cyk_table(self, sequence: Sequence) -> list[list[set[Variable]]]:
+        """
+        単位規則の閉包を各セルに適用する CYK アルゴリズムのテーブルを生成
+
+        Args:
+            sequence: 判定対象の文字列
+
+        Returns:
+            list[list[set[Variable]]]: CYKテーブル。cyk_table[i][j] は sequence[i..j] を導出できる変数の集合
+        """
+        if not all(isinstance(symbol, Terminal) for symbol in sequence):
+            raise ValueError("All symbols in the sequence must be terminals.")
+
+        n = len(sequence)
+        cyk_table: list[list[set[Variable]]] = [[set() for _ in range(n)] for _ in range(n)]
+        for i in range(n):
+            cyk_table[i][i] = self.close_units(self.terminal_index.get(sequence[i], set()))
+
+        for length in range(2, n + 1):
+            for i in range(n - length + 1):
+                j = i + length - 1
+                cell: set[Variable] = set()
+                for k in range(i, j):
+                    left = cyk_table[i][k]
+                    right = cyk_table[k + 1][j]
+                    if not left or not right:
+                        continue
+                    for b in left:
+                        for c in right:
+                            lhs_set = self.binary_index.get((b, c))
+                            if lhs_set:
+                                cell |= lhs_set
+                cyk_table[i][j] = self.close_units(cell)
+        return cyk_table
+
+    def is_member_seq(self, sequence: Sequence) -> bool:
+        """
+        CYKアルゴリズムで文字列が言語に含まれるか判定
+
+        Args:
+            sequence: 判定対象の文字列
+
+        Returns:
+            bool: 言語に含まれるかどうか
+        """
+        if len(sequence) == 0:
+            return Sequence([]) in self.production_rules[self.start_symbol]
+        cyk_table = self.get_cyk_table(sequence)
+        return self.start_symbol in cyk_table[0][-1]
+
+    def is_member(self, string: str) -> bool:
+        """
+        文字列が文法に含まれるか判定
+
+        Args:
+            string: 判定対象の文字列
+
+        Returns:
+            bool: 文法に含まれるかどうか
+        """
+        if not isinstance(string, str):
+            raise ValueError("Input must be a string.")
+        sequence = Sequence([Terminal(symbol) for symbol in string.split()])
+        for t in sequence:
+            if t not in self.terminals:
+                raise ValueError(f"Terminal {t} is not in the grammar's terminals.\n Given: {string}")
+        return self.is_member_seq(sequence)
@@ -0,0 +1,503 @@
+from cflpy.core import ProductionRuleRHS, ProductionRules, Sequence, Symbol, Terminal, Variable
+from cflpy.grammar import CFGrammar, ChomskyNormalFormGrammar
+from cflpy.to_chomsly_normal_form.step2_remove_epsilon import generate_nullable_expansions
+
+
+class IncrementalChomskyNormalForm:
+    def __init__(self, grammar: CFGrammar):
+        """
+        規則の追加・削除に追従して更新されるチョムスキー標準形
+
+        to_chomsky_normal_form と同じ順序 (START → BIN → DEL → UNIT → TERM) で変換するが、
+        各段階の結果を変数ごとに保持し、規則を追加・削除したときは影響を受ける変数の結果だけを計算し直す。
+
+        - BIN: 長い規則は接尾辞ごとに共有される変数 (X1, X2, ...) に分解し、接尾辞の変数は参照数で管理する
+        - DEL: nullable な変数の集合は、追加時はワークリストで増やし、削除時は削除した規則の左辺に
+          依存する変数だけをいったん取り除いてから導出し直す
+        - UNIT: 単位規則のグラフの到達可能集合 (単位閉包) は、単位規則が変化した変数に到達できる変数についてのみ計算し直す
+        - TERM: 終端記号の代理の変数 (Y1, Y2, ...) は終端記号ごとに1つ作り、参照数で管理する
+
+        変換前後の不要な記号の除去 (simplify) と代理の変数の再利用は行わないため、
+        結果の規則は to_chomsky_normal_form と一致するとは限らないが、同じ言語を表す。
+
+        Args:
+            grammar: 元の文法 (複製して保持するため、以降の変更は反映されない)
+        """
+        self._source_start_symbol = grammar.start_symbol
+        self._terminals: set[Terminal] = set(grammar.terminals)
+
+        names = {sym.name for sym in grammar.variables} | {sym.name for sym in grammar.terminals}
+        for lhs, rhs in grammar.production_rules.items():
+            names.add(lhs.name)
+            names.update(sym.name for seq in rhs for sym in seq)
+
+        # 新しい記号の名前: 既存の記号と衝突しないようにする (step1, step4, step5 と同じ規則)
+        start_symbol = Variable(f"{grammar.start_symbol}'")
+        while start_symbol.name in names:
+            start_symbol = Variable(f"{start_symbol.name}'")
+        self._start_symbol = start_symbol
+        self._suffix_prefix = "X"
+        while any(name.startswith(self._suffix_prefix) for name in names):
+            self._suffix_prefix += "X"
+        self._proxy_prefix = "Y"
+        while any(name.startswith(self._proxy_prefix) for name in names):
+            self._proxy_prefix += "Y"
+        self._counter = 1
+
+        # 元の文法
+        self._source = ProductionRules()
+        self._mentions: dict[Variable, int] = {}
+
+        # BIN: 分解後の規則 {左辺: {右辺: 参照数}} と、右辺の変数 -> {その変数を右辺に含む左辺: 規則数}
+        self._binarized: dict[Variable, dict[Sequence, int]] = {}
+        self._users: dict[Variable, dict[Variable, int]] = {}
+        self._suffix_variables: dict[tuple[tuple[bool, Symbol], ...], Variable] = {}
+        self._suffix_references: dict[Variable, int] = {}
+
+        # DEL: nullable な変数と、ε規則を除去した後の規則 (単位規則とそれ以外に分ける)
+        self._nullable: set[Variable] = set()
+        self._units: dict[Variable, set[Variable]] = {}
+        self._non_units: dict[Variable, set[Sequence]] = {}
+
+        # UNIT: 単位閉包と、その逆引き {B: B を単位閉包に含む変数の集合}
+        self._closure: dict[Variable, set[Variable]] = {}
+        self._dependents: dict[Variable, set[Variable]] = {}
+
+        # TERM: 単位規則を除去した後の規則 (終端記号の置き換え前) と、終端記号の代理
+        self._expanded: dict[Variable, set[Sequence]] = {}
+        self._proxies: dict[Terminal, Variable] = {}
+        self._proxy_references: dict[Terminal, int] = {}
+
+        # 結果の規則と、CYK のための逆引きインデックス
+        self._production_rules = ProductionRules()
+        self._unary_index: dict[Terminal, set[Variable]] = {}
+        self._binary_index: dict[tuple[Variable, Variable], set[Variable]] = {}
+
+        self._add_variable(self._start_symbol)
+        added = [(self._start_symbol, Sequence([self._source_start_symbol]))]
+        self._mention(self._source_start_symbol, 1)
+        for lhs, rhs in grammar.production_rules.items():
+            for seq in rhs:
+                self._add_source_rule(lhs, seq, added)
+        self._update(added, [])
+
+    @property
+    def start_symbol(self) -> Variable:
+        return self._start_symbol
+
+    @property
+    def variables(self) -> set[Variable]:
+        return set(self._production_rules.keys())
+
+    @property
+    def terminals(self) -> set[Terminal]:
+        return self._terminals
+
+    @property
+    def production_rules(self) -> ProductionRules:
+        """
+        現在のチョムスキー標準形の生成規則 (以降の更新で変更されるため、呼び出し側で変更してはならない)
+
+        Returns:
+            ProductionRules: 生成規則
+        """
+        return self._production_rules
+
+    @property
+    def source_production_rules(self) -> ProductionRules:
+        """
+        現在の元の文法の生成規則 (呼び出し側で変更してはならない)
+
+        Returns:
+            ProductionRules: 生成規則
+        """
+        return self._source
+
+    def to_grammar(self) -> ChomskyNormalFormGrammar:
+        """
+        現在のチョムスキー標準形の複製を返す
+
+        Returns:
+            ChomskyNormalFormGrammar: 以降の更新の影響を受けない文法
+        """
+        return ChomskyNormalFormGrammar(
+            self.variables, set(self._terminals), self._start_symbol, self._production_rules.deepcopy()
+        )
+
+    def add_rule(self, lhs: Variable, sequence: Sequence) -> set[Variable]:
+        """
+        元の文法に規則 lhs := sequence を追加し、チョムスキー標準形を更新する
+
+        Args:
+            lhs: 左辺の変数
+            sequence: 右辺
+
+        Returns:
+            set[Variable]: 規則が変化した変数 (追加・削除された変数を含む)
+
+        Raises:
+            ValueError: 記号の名前が変換で作成する変数の名前と衝突する場合
+        """
+        if lhs in self._source.keys() and sequence in self._source[lhs]:
+            return set()
+        for sym in [lhs, *sequence]:
+            if self._is_reserved(sym):
+                raise ValueError(f"Symbol {sym} conflicts with a variable created by the conversion.")
+        added: list[tuple[Variable, Sequence]] = []
+        self._add_source_rule(lhs, sequence, added)
+        self._terminals.update(sym for sym in sequence if isinstance(sym, Terminal))
+        return self._update(added, [])
+
+    def remove_rule(self, lhs: Variable, sequence: Sequence) -> set[Variable]:
+        """
+        元の文法から規則 lhs := sequence を削除し、チョムスキー標準形を更新する
+
+        Args:
+            lhs: 左辺の変数
+            sequence: 右辺
+
+        Returns:
+            set[Variable]: 規則が変化した変数 (追加・削除された変数を含む)
+
+        Raises:
+            ValueError: 規則が存在しない場合
+        """
+        if lhs not in self._source.keys() or sequence not in self._source[lhs]:
+            raise ValueError(f"Production rule {lhs} -> {sequence} not found.")
+        removed: list[tuple[Variable, Sequence]] = []
+        self._source[lhs].remove(sequence)
+        if len(self._source[lhs]) == 0:
+            del self._source[lhs]
+        self._mention(lhs, -1)
+        for sym in sequence:
+            if isinstance(sym, Variable):
+                self._mention(sym, -1)
+
+        if len(sequence) <= 2:
+            removed.append((lhs, sequence))
+        else:
+            # 接尾辞の変数を参照数が 0 になったものから順に解放する
+            suffix = Sequence(sequence[1:])
+            removed.append((lhs, Sequence([sequence[0], self._suffix_variables[self._suffix_key(suffix)]])))
+            while True:
+                key = self._suffix_key(suffix)
+                var = self._suffix_variables[key]
+                self._suffix_references[var] -= 1
+                if self._suffix_references[var] > 0:
+                    break
+                del self._suffix_variables[key]
+                del self._suffix_references[var]
+                if len(suffix) == 2:
+                    removed.append((var, suffix))
+                    break
+                tail = Sequence(suffix[1:])
+                removed.append((var, Sequence([suffix[0], self._suffix_variables[self._suffix_key(tail)]])))
+                suffix = tail
+        return self._update([], removed)
+
+    def is_member(self, string: str) -> bool:
+        """
+        現在の文法で、空白区切りの文字列が言語に含まれるか判定 (逆引きインデックスを用いた CYK)
+
+        Args:
+            string: 判定対象の文字列
+
+        Returns:
+            bool: 言語に含まれるかどうか
+        """
+        if not isinstance(string, str):
+            raise ValueError("Input must be a string.")
+        sequence = [Terminal(symbol) for symbol in string.split()]
+        for t in sequence:
+            if t not in self._terminals:
+                raise ValueError(f"Terminal {t} is not in the grammar's terminals.\n Given: {string}")
+        n = len(sequence)
+        if n == 0:
+            return self._source_start_symbol in self._nullable
+
+        # chart[length - 1][i]: sequence[i:i + length] を生成する変数の集合
+        chart = [[set(self._unary_index.get(t, ())) for t in sequence]]
+        for length in range(2, n + 1):
+            row = []
+            for i in range(n - length + 1):
+                cell: set[Variable] = set()
+                for left_length in range(1, length):
+                    left = chart[left_length - 1][i]
+                    right = chart[length - left_length - 1][i + left_length]
+                    if not left or not right:
+                        continue
+                    for b in left:
+                        for c in right:
+                            cell.update(self._binary_index.get((b, c), ()))
+                row.append(cell)
+            chart.append(row)
+        return self._start_symbol in chart[n - 1][0]
+
+    def _is_reserved(self, sym: Symbol) -> bool:
+        if sym == self._start_symbol:
+            return True
+        return sym.startswith(self._suffix_prefix) or sym.startswith(self._proxy_prefix)
+
+    @staticmethod
+    def _suffix_key(suffix: Sequence) -> tuple[tuple[bool, Symbol], ...]:
+        # Symbol の等価性は名前のみで判定されるため、終端記号かどうかもキーに含める
+        return tuple((sym.is_terminal, sym) for sym in suffix)
+
+    def _new_variable(self, prefix: str) -> Variable:
+        var = Variable(f"{prefix}{self._counter}")
+        self._counter += 1
+        return var
+
+    def _add_variable(self, var: Variable) -> None:
+        if var in self._production_rules.keys():
+            return
+        self._production_rules[var] = ProductionRuleRHS()
+        self._binarized[var] = {}
+        self._users[var] = {}
+        self._units[var] = set()
+        self._non_units[var] = set()
+        self._closure[var] = {var}
+        self._dependents[var] = {var}
+        self._expanded[var] = set()
+
+    def _remove_variable(self, var: Variable) -> None:
+        del self._production_rules[var]
+        del self._binarized[var]
+        del self._users[var]
+        del self._units[var]
+        del self._non_units[var]
+        del self._closure[var]
+        del self._dependents[var]
+        del self._expanded[var]
+
+    def _mention(self, var: Variable, delta: int) -> None:
+        self._mentions[var] = self._mentions.get(var, 0) + delta
+        if self._mentions[var] == 0:
+            del self._mentions[var]
+
+    def _add_source_rule(self, lhs: Variable, sequence: Sequence, added: list[tuple[Variable, Sequence]]) -> None:
+        """元の文法に規則を追加し、分解後の規則を added に追加する"""
+        if lhs not in self._source.keys():
+            self._source[lhs] = ProductionRuleRHS()
+        self._source[lhs].add(sequence)
+        self._mention(lhs, 1)
+        for sym in sequence:
+            if isinstance(sym, Variable):
+                self._mention(sym, 1)
+
+        if len(sequence) <= 2:
+            added.append((lhs, sequence))
+            return
+
+        # 長い規則を分解する。既に分解済みの接尾辞に到達したらその変数を再利用する
+        parent, head, suffix = lhs, sequence[0], Sequence(sequence[1:])
+        while True:
+            key = self._suffix_key(suffix)
+            var = self._suffix_variables.get(key)
+            if var is not None:
+                self._suffix_references[var] += 1
+                added.append((parent, Sequence([head, var])))
+                break
+            var = self._new_variable(self._suffix_prefix)
+            self._suffix_variables[key] = var
+            self._suffix_references[var] = 1
+            added.append((parent, Sequence([head, var])))
+            if len(suffix) == 2:
+                added.append((var, suffix))
+                break
+            parent, head, suffix = var, suffix[0], Sequence(suffix[1:])
+
+    def _has_nullable_rule(self, var: Variable) -> bool:
+        return any(
+            all(isinstance(sym, Variable) and sym in self._nullable for sym in seq) for seq in self._binarized[var]
+        )
+
+    def _propagate_nullable(self, worklist: list[Variable]) -> None:
+        """worklist の変数から、nullable になった変数を右辺に含む変数へ nullable を伝播する"""
+        while worklist:
+            var = worklist.pop()
+            for user in self._users[var]:
+                if user not in self._nullable and self._has_nullable_rule(user):
+                    self._nullable.add(user)
+                    worklist.append(user)
+
+    def _update(
+        self, added: list[tuple[Variable, Sequence]], removed: list[tuple[Variable, Sequence]]
+    ) -> set[Variable]:
+        """分解後の規則の追加・削除を、DEL, UNIT, TERM の各段階の結果と逆引きインデックスに反映する"""
+        changed: set[Variable] = set()
+
+        # BIN: 分解後の規則の参照数を更新し、右辺の集合が変化した規則を集める
+        new_rules: list[tuple[Variable, Sequence]] = []
+        old_rules: list[tuple[Variable, Sequence]] = []
+        for lhs, seq in added:
+            for var in [lhs, *(sym for sym in seq if isinstance(sym, Variable))]:
+                if var not in self._production_rules.keys():
+                    self._add_variable(var)
+                    changed.add(var)
+            count = self._binarized[lhs].get(seq, 0)
+            self._binarized[lhs][seq] = count + 1
+            if count == 0:
+                new_rules.append((lhs, seq))
+        for lhs, seq in removed:
+            self._binarized[lhs][seq] -= 1
+            if self._binarized[lhs][seq] == 0:
+                del self._binarized[lhs][seq]
+                old_rules.append((lhs, seq))
+        for lhs, seq in new_rules:
+            for var in {sym for sym in seq if isinstance(sym, Variable)}:
+                self._users[var][lhs] = self._users[var].get(lhs, 0) + 1
+        for lhs, seq in old_rules:
+            for var in {sym for sym in seq if isinstance(sym, Variable)}:
+                self._users[var][lhs] -= 1
+                if self._users[var][lhs] == 0:
+                    del self._users[var][lhs]
+
+        # DEL: 削除した規則の左辺に (nullable の導出で) 依存する変数をいったん取り除き、導出し直す
+        old_nullable = set(self._nullable)
+        candidates: set[Variable] = set()
+        worklist = [lhs for lhs, _ in old_rules if lhs in self._nullable]
+        while worklist:
+            var = worklist.pop()
+            if var in candidates:
+                continue
+            candidates.add(var)
+            worklist.extend(user for user in self._users[var] if user in self._nullable)
+        self._nullable -= candidates
+        worklist = [var for var in candidates if self._has_nullable_rule(var)]
+        self._nullable.update(worklist)
+        self._propagate_nullable(worklist)
+        worklist = [lhs for lhs, _ in new_rules if lhs not in self._nullable and self._has_nullable_rule(lhs)]
+        self._nullable.update(worklist)
+        self._propagate_nullable(worklist)
+        nullable_changed = old_nullable ^ self._nullable
+
+        # ε規則を除去した規則を、規則または右辺の nullable が変化した変数についてのみ計算し直す
+        dirty = {lhs for lhs, _ in new_rules} | {lhs for lhs, _ in old_rules}
+        for var in nullable_changed:
+            dirty.update(self._users.get(var, ()))
+        units_changed: set[Variable] = set()
+        non_units_changed: set[Variable] = set()
+        for var in dirty:
+            units: set[Variable] = set()
+            non_units: set[Sequence] = set()
+            for seq in self._binarized[var]:
+                for new_seq in generate_nullable_expansions(seq, self._nullable):
+                    if len(new_seq) == 1 and isinstance(new_seq[0], Variable):
+                        units.add(new_seq[0])
+                    else:
+                        non_units.add(new_seq)
+            if units != self._units[var]:
+                self._units[var] = units
+                units_changed.add(var)
+            if non_units != self._non_units[var]:
+                self._non_units[var] = non_units
+                non_units_changed.add(var)
+
+        # UNIT: 単位規則が変化した変数に (変化前のグラフで) 到達できる変数の単位閉包を計算し直す
+        # 変化後のグラフで新しく到達できるようになった変数も、変化した辺の手前までは変化前の辺で到達できる
+        recompute = set()
+        for var in units_changed:
+            recompute.update(self._dependents[var])
+        closure_changed: set[Variable] = set()
+        for var in recompute:
+            closure = {var}
+            stack = [var]
+            while stack:
+                for target in self._units[stack.pop()]:
+                    if target not in closure:
+                        closure.add(target)
+                        stack.append(target)
+            if closure == self._closure[var]:
+                continue
+            for target in self._closure[var] - closure:
+                self._dependents[target].discard(var)
+            for target in closure - self._closure[var]:
+                self._dependents[target].add(var)
+            self._closure[var] = closure
+            closure_changed.add(var)
+
+        expand = set(closure_changed)
+        for var in non_units_changed:
+            expand.update(self._dependents[var])
+        if self._source_start_symbol in nullable_changed:
+            expand.add(self._start_symbol)
+
+        # TERM: 単位閉包の規則の和集合を計算し直し、差分を結果の規則と逆引きインデックスに反映する
+        for var in expand:
+            expanded: set[Sequence] = set()
+            for target in self._closure[var]:
+                expanded |= self._non_units[target]
+            if var == self._start_symbol and self._source_start_symbol in self._nullable:
+                expanded.add(Sequence([]))
+            if expanded == self._expanded[var]:
+                continue
+            for seq in self._expanded[var] - expanded:
+                self._remove_result_rule(var, seq)
+            for seq in expanded - self._expanded[var]:
+                self._add_result_rule(var, seq, changed)
+            self._expanded[var] = expanded
+            changed.add(var)
+
+        # 参照されなくなった変数を削除する
+        unused_terminals = [t for t, count in self._proxy_references.items() if count == 0]
+        for t in unused_terminals:
+            proxy = self._proxies.pop(t)
+            del self._proxy_references[t]
+            self._unary_index[t].discard(proxy)
+            if not self._unary_index[t]:
+                del self._unary_index[t]
+            del self._production_rules[proxy]
+            changed.add(proxy)
+        for lhs, seq in old_rules:
+            for var in [lhs, *(sym for sym in seq if isinstance(sym, Variable))]:
+                if var in self._production_rules.keys() and self._is_unused(var):
+                    self._remove_variable(var)
+                    changed.add(var)
+        return changed
+
+    def _is_unused(self, var: Variable) -> bool:
+        if var == self._start_symbol or var in self._mentions or var in self._suffix_references:
+            return False
+        return not self._binarized[var] and not self._users[var] and not self._expanded[var]
+
+    def _result_sequence(self, seq: Sequence, delta: int, changed: set[Variable]) -> Sequence:
+        """右辺の2項規則に含まれる終端記号を代理の変数に置き換え、代理の参照数を更新する"""
+        if len(seq) != 2 or not any(isinstance(sym, Terminal) for sym in seq):
+            return seq
+        symbols = []
+        for sym in seq:
+            if isinstance(sym, Terminal):
+                proxy = self._proxies.get(sym)
+                if proxy is None:
+                    proxy = self._new_variable(self._proxy_prefix)
+                    self._proxies[sym] = proxy
+                    self._proxy_references[sym] = 0
+                    self._production_rules[proxy] = ProductionRuleRHS({Sequence([sym])})
+                    self._unary_index.setdefault(sym, set()).add(proxy)
+                    changed.add(proxy)
+                self._proxy_references[sym] += delta
+                sym = proxy
+            symbols.append(sym)
+        return Sequence(symbols)
+
+    def _add_result_rule(self, var: Variable, seq: Sequence, changed: set[Variable]) -> None:
+        result = self._result_sequence(seq, 1, changed)
+        self._production_rules[var].add(result)
+        if len(result) == 1:
+            self._unary_index.setdefault(result[0], set()).add(var)
+        elif len(result) == 2:
+            self._binary_index.setdefault((result[0], result[1]), set()).add(var)
+
+    def _remove_result_rule(self, var: Variable, seq: Sequence) -> None:
+        result = self._result_sequence(seq, -1, set())
+        self._production_rules[var].remove(result)
+        if len(result) == 1:
+            index, key = self._unary_index, result[0]
+        elif len(result) == 2:
+            index, key = self._binary_index, (result[0], result[1])
+        else:
+            return
+        index[key].discard(var)
+        if not index[key]:
+            del index[key]
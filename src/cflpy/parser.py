@@ -1,21 +1,35 @@
+import concurrent.futures
+import contextlib
+import dataclasses
+import gc
+import gzip
+import io
+import json
+import mmap
 import pathlib
+import re
+from collections.abc import Callable, Iterable, Iterator
+from typing import IO
 
-import pydantic
-
-from cflpy.core import ProductionRuleRHS, ProductionRules, Sequence, Terminal, Variable
+from cflpy.core import ProductionRuleRHS, ProductionRules, Sequence, Symbol, Terminal, Variable
 
 from .grammar import CFGrammar
 
 
-class CFGParserConfig(pydantic.BaseModel):
+@dataclasses.dataclass(slots=True)
+class CFGParserConfig:
     """CFGParserの設定を定義するクラス
 
+    pydantic に依存しない slots 付きの dataclass で、生成時に型を検証する (リストで指定した組はタプルに変換する)。
+
     Attributes:
         transition_symbol (str): 生成規則の変換記号。 default: ":="
         variable_enclosure (tuple[str, str]): 非終端記号を囲む文字列。 default: ("<", ">")
         terminal_enclosure (tuple[str, str]): 終端記号を囲む文字列。 default: ('"', '"')
         comment_symbol (str): コメント行の開始記号。 default: "#"
         rhs_separator (str): 右辺の区切り文字。 default: "|"
+        empty_string_symbol (str): 空文字列を表す記号。 default: "eps"
+        include_directive (str): 他の文法定義ファイルを読み込む指令。 default: "@include"
     """
 
     transition_symbol: str = ":="
@@ -24,9 +38,23 @@ class CFGParserConfig(pydantic.BaseModel):
     comment_symbol: str = "#"
     rhs_separator: str = "|"
     empty_string_symbol: str = "eps"
+    include_directive: str = "@include"
+
+    def __post_init__(self):
+        for field in dataclasses.fields(self):
+            value = getattr(self, field.name)
+            if field.type == tuple[str, str]:
+                if (
+                    not isinstance(value, tuple | list)
+                    or len(value) != 2
+                    or not all(isinstance(v, str) for v in value)
+                ):
+                    raise ValueError(f"{field.name} must be a pair of strings, got {value!r}")
+                setattr(self, field.name, tuple(value))
+            elif not isinstance(value, str):
+                raise ValueError(f"{field.name} must be a string, got {value!r}")
 
     # # validation: 全ての記号は重複してはいけない -> terminal_enclosure: tuple[str, str] = ('"', '"') は許容したいのでどうするか検討
-    # @pydantic.model_validator(mode="after")
     # def validate_non_equality(self):
     #     all_set = set(
     #         self.transition_symbol,
@@ -38,18 +66,286 @@ class CFGParserConfig(pydantic.BaseModel):
     #     if len(all_set) < 7:
     #         raise ValueError(f"Config cannot contain duplicated values in different field. Given: {self}")
 
+    def model_dump(self) -> dict:
+        """
+        設定を辞書にする (pydantic.BaseModel だった頃の API との互換のため)
+
+        Returns:
+            dict: フィールド名 -> 値
+        """
+        return dataclasses.asdict(self)
+
+    def model_dump_json(self) -> str:
+        """
+        設定を JSON 文字列にする (pydantic.BaseModel だった頃の API との互換のため)
+
+        Returns:
+            str: フィールドの順に並べた JSON 文字列
+        """
+        return json.dumps(self.model_dump(), ensure_ascii=False, separators=(",", ":"))
+
+
+# gzip 形式のファイルの先頭のバイト列
+GZIP_MAGIC = b"\x1f\x8b"
+
+
+def iter_mmap_lines(mm: mmap.mmap) -> Iterator[str]:
+    """
+    mmap から1行ずつ UTF-8 の文字列として読み出す
+
+    Args:
+        mm(mmap.mmap): 読み出し元
+
+    Returns:
+        Iterator[str]: 行 (末尾の改行を含む)
+    """
+    for line in iter(mm.readline, b""):
+        yield line.decode("utf-8")
+
+
+@contextlib.contextmanager
+def gc_paused() -> Iterator[None]:
+    """
+    with 文の中で循環参照のガベージコレクションを止める
+    解析では記号・Sequence・集合を大量に作るが循環参照は作らないため、世代別 GC の走査は何も回収せずに時間だけかかる。
+    """
+    enabled = gc.isenabled()
+    gc.disable()
+    try:
+        yield
+    finally:
+        if enabled:
+            gc.enable()
+
+
+def split_file_at_lines(filepath: pathlib.Path, chunk_size: int) -> list[tuple[int, int]]:
+    """
+    ファイルを行の境界でおよそ chunk_size バイトずつの範囲に分割する
+
+    Args:
+        filepath(pathlib.Path): 分割するファイルのパス
+        chunk_size(int): 1つの範囲の目安のバイト数
+
+    Returns:
+        list[tuple[int, int]]: ファイル先頭から順に並べた (開始位置, 終了位置) のリスト
+    """
+    if chunk_size <= 0:
+        raise ValueError(f"chunk_size must be positive, got {chunk_size}")
+    size = filepath.stat().st_size
+    ranges = []
+    with filepath.open("rb") as f:
+        start = 0
+        while start < size:
+            f.seek(start + chunk_size - 1)
+            # 途中の行の末尾まで読み進めて、次の範囲が行の先頭から始まるようにする
+            f.readline()
+            end = min(f.tell(), size)
+            ranges.append((start, end))
+            start = end
+    return ranges
+
+
+@dataclasses.dataclass
+class GrammarModule:
+    """1つの文法定義を解析した結果 (include した文法は含まない)
+
+    Attributes:
+        variables: 非終端記号の集合
+        terminals: 終端記号の集合
+        production_rules: 生成規則
+        start_symbol: 最初の規則の左辺。規則がない場合は None
+        includes: include 指令で指定されたパスと行番号 (0始まり) の組を記述した順に並べたもの
+    """
+
+    variables: set[Variable]
+    terminals: set[Terminal]
+    production_rules: ProductionRules
+    start_symbol: Variable | None
+    includes: list[tuple[str, int]] = dataclasses.field(default_factory=list)
+
+
+@dataclasses.dataclass
+class EncodedModule:
+    """GrammarModule の記号を番号で表したもの (並列に解析した結果をワーカープロセスから受け渡すため)
+
+    記号と Sequence のオブジェクトを pickle で受け渡すと、受け取る側で全てのオブジェクトを作り直して hash を計算するため、
+    逐次に解析するのと同程度の時間がかかる。番号のタプルは C で実装された pickle だけで復元できるため、
+    受け取る側ではオブジェクトを併合後の文法に1回だけ作ればよい。
+
+    Attributes:
+        variables: 変数の名前 (番号 i の変数は variables[i])
+        terminals: 終端記号の名前 (番号 ~j (負の数) の終端記号は terminals[j])
+        production_rules: 左辺の変数の番号 -> 右辺の記号の番号のタプルのリスト (左辺は最初に現れた順)
+        start_symbol: 最初の規則の左辺の変数の番号。規則がない場合は None
+        includes: include 指令で指定されたパスと行番号 (0始まり) の組
+    """
+
+    variables: list[str]
+    terminals: list[str]
+    production_rules: dict[int, list[tuple[int, ...]]]
+    start_symbol: int | None
+    includes: list[tuple[str, int]]
+
+
+class ModuleCache:
+    def __init__(self):
+        """
+        include したファイルの解析結果を、パスと更新時刻をキーとして保持する
+
+        ファイルの更新時刻かサイズが変わっていれば解析し直すため、同じ文法を読み込み直すと
+        変更されたファイルだけが解析される。CFGParser は既定でプロセス全体で共有する DEFAULT_MODULE_CACHE を使う。
+        """
+        self._modules: dict[tuple[str, pathlib.Path], tuple[int, int, GrammarModule]] = {}
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: tuple[str, pathlib.Path], stat) -> GrammarModule | None:
+        """
+        解析結果を取得する
+
+        Args:
+            key: (CFGParserConfig の識別子, 解決済みのパス)
+            stat: ファイルの os.stat_result
+
+        Returns:
+            GrammarModule | None: 解析結果。未解析またはファイルが変更されている場合は None
+        """
+        entry = self._modules.get(key)
+        if entry is None or entry[:2] != (stat.st_mtime_ns, stat.st_size):
+            self.misses += 1
+            return None
+        self.hits += 1
+        return entry[2]
+
+    def store(self, key: tuple[str, pathlib.Path], stat, module: GrammarModule) -> None:
+        """
+        解析結果を保存する。stat は解析を始める前に取得したものを渡す
+
+        Args:
+            key: (CFGParserConfig の識別子, 解決済みのパス)
+            stat: ファイルの os.stat_result
+            module: 解析結果
+        """
+        self._modules[key] = (stat.st_mtime_ns, stat.st_size, module)
+
+    def clear(self) -> None:
+        self._modules.clear()
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self) -> int:
+        return len(self._modules)
+
+
+DEFAULT_MODULE_CACHE = ModuleCache()
+
+
+# ワーカープロセスで使う CFGParser (_init_chunk_parser で設定する)
+_chunk_parser: "CFGParser | None" = None
+
+
+def _init_chunk_parser(cfg: CFGParserConfig) -> None:
+    global _chunk_parser
+    _chunk_parser = CFGParser(cfg)
+
+
+def _parse_file_chunk(filepath: pathlib.Path, start: int, end: int) -> tuple[EncodedModule, int]:
+    """
+    ワーカープロセスでファイルの範囲 [start, end) を解析する
+
+    Returns:
+        tuple: (記号を番号で表した解析結果, 範囲の行数)
+    """
+    with filepath.open("rb") as f:
+        f.seek(start)
+        content = f.read(end - start).decode("utf-8")
+    # テキストモードで開いたファイルと同じく、\r\n と \r も行の区切りとする
+    lines = io.StringIO(content, newline=None).readlines()
+    with gc_paused():
+        return _chunk_parser._parse_rules(lines, encoded=True), len(lines)
+
+
+class CFGLexer:
+    # トークンの種類
+    VARIABLE = "variable"
+    TERMINAL = "terminal"
+    TRANSITION = "transition"
+    SEPARATOR = "separator"
+    EMPTY = "empty"
+    INVALID = "invalid"
+
+    def __init__(self, cfg: CFGParserConfig):
+        """
+        CFGParserConfig から1行を1回の走査でトークン列に分割する正規表現を構築する
+
+        非終端記号・終端記号は囲み文字の間の文字列全体を名前とするため、
+        名前に空白や区切り文字、変換記号を含めることができる (閉じる囲み文字は含められない)。
+
+        Args:
+            cfg(CFGParserConfig): CFGParserの設定
+        """
+        variable_open, variable_close = map(re.escape, cfg.variable_enclosure)
+        terminal_open, terminal_close = map(re.escape, cfg.terminal_enclosure)
+        # 囲みのない記号は、一方が他方の接頭辞である場合に備えて長い順に試す
+        bare_symbols = sorted(
+            [
+                (self.TRANSITION, cfg.transition_symbol),
+                (self.SEPARATOR, cfg.rhs_separator),
+                (self.EMPTY, cfg.empty_string_symbol),
+            ],
+            key=lambda item: -len(item[1]),
+        )
+        # 各トークンの前の空白も同じマッチで読み飛ばす
+        self._pattern = re.compile(
+            r"\s*(?:"
+            + "|".join(
+                [
+                    rf"(?P<{self.VARIABLE}>{variable_open}(?P<{self.VARIABLE}_name>.*?){variable_close})",
+                    rf"(?P<{self.TERMINAL}>{terminal_open}(?P<{self.TERMINAL}_name>.*?){terminal_close})",
+                    *(f"(?P<{kind}>{re.escape(symbol)})" for kind, symbol in bare_symbols),
+                    rf"(?P<{self.INVALID}>\S+)",
+                ]
+            )
+            + ")"
+        )
+
+    def tokenize(self, line: str) -> list[tuple[str, str, int]]:
+        """
+        1行をトークン列に分割する (空白は除く)
+
+        Args:
+            line(str): 文法定義の1行
+
+        Returns:
+            list[tuple[str, str, int]]: (トークンの種類, 記号の名前またはトークンの文字列, 行内の開始位置) のリスト
+        """
+        tokens = []
+        for match in self._pattern.finditer(line):
+            kind = match.lastgroup
+            if kind == self.VARIABLE or kind == self.TERMINAL:
+                tokens.append((kind, match.group(kind + "_name"), match.start(kind)))
+            else:
+                tokens.append((kind, match.group(kind), match.start(kind)))
+        return tokens
+
 
 class CFGParser:
-    def __init__(self, cfg: CFGParserConfig = CFGParserConfig()):
+    def __init__(self, cfg: CFGParserConfig = CFGParserConfig(), module_cache: ModuleCache | None = None):
         """
         CFGParserのコンストラクタ
 
         Args:
             cfg(CFGParserConfig): CFGParserの設定
+            module_cache(ModuleCache | None): include したファイルの解析結果のキャッシュ。
+                None の場合はプロセス全体で共有する DEFAULT_MODULE_CACHE を使う
         """
         if not isinstance(cfg, CFGParserConfig):
             raise TypeError(f"Expected ParserConfig, got {type(cfg)}")
         self._cfg = cfg
+        self._lexer = CFGLexer(cfg)
+        self._module_cache = DEFAULT_MODULE_CACHE if module_cache is None else module_cache
+        # 設定が異なれば同じファイルでも解析結果が異なるため、キャッシュのキーに含める
+        self._cfg_key = cfg.model_dump_json()
 
     @property
     def cfg(self) -> CFGParserConfig:
@@ -61,12 +357,36 @@ class CFGParser:
         """
         return self._cfg
 
-    def from_file(self, filepath: pathlib.Path) -> CFGrammar:
+    def from_file(
+        self,
+        filepath: pathlib.Path,
+        use_mmap: bool = False,
+        workers: int | None = None,
+        chunk_size: int | None = None,
+    ) -> CFGrammar:
         """
         .cflファイルから文法を読み込む
+        ファイルは1行ずつ読み込んで解析するため、ファイル全体をメモリに読み込むことはない。
+        gzip で圧縮されたファイル (.cfl.gz など) は先頭のバイト列で判別して展開しながら読み込む。
+        バイナリ形式の文法 (python -m cflpy compile で作成した .cflc) も先頭のバイト列で判別し、
+        解析せずにチョムスキー標準形の文法 (ChomskyNormalFormGrammar) として読み込む。
+
+        "@include "path/to/module.cfl"" の行 (CFGParserConfig.include_directive) で他のファイルの規則を読み込める。
+        相対パスは include を書いたファイルのディレクトリを基準とする。include したファイルは ModuleCache に
+        パスと更新時刻をキーとして保持し、同じ文法を読み込み直した場合は変更されたファイルだけを解析し直す。
+        開始記号は include したファイルではなく、このファイルの最初の規則の左辺とする。
+
+        workers に2以上を指定すると、圧縮されていないファイルを行の境界で分割し、プロセスプールで並列に解析する。
+        各範囲の結果はファイルの順に併合するため、開始記号 (最初の規則の左辺)・規則・エラーの内容は
+        逐次に解析した場合と同じになる。各範囲の結果は記号を番号で表して受け渡し (EncodedModule)、
+        記号と Sequence のオブジェクトは併合しながら1回だけ作る。
 
         Args:
             filepath(pathlib.Path): 文法定義ファイルのパス
+            use_mmap(bool): True の場合、圧縮されていないファイルを mmap で読み込む (行は LF で区切る)
+            workers(int | None): 並列に解析するプロセス数。None または1の場合は逐次に解析する
+            chunk_size(int | None): 並列に解析する場合の1つの範囲の目安のバイト数。
+                None の場合はファイルを workers の4倍程度の範囲に分割する
 
         Returns:
             CFGrammar: 構築された文法オブジェクト
@@ -77,9 +397,72 @@ class CFGParser:
             raise FileNotFoundError(f"File not found: {filepath}")
         if not filepath.is_file():
             raise IsADirectoryError(f"Expected a file, but got a directory: {filepath}")
+        if filepath.stat().st_size == 0:
+            raise ValueError("Empty content")
+        # バイナリ形式を読み込む場合のみ必要なため、import cflpy の時点では読み込まない
+        from cflpy.compiled import CompiledGrammar, is_compiled_file
+
+        if is_compiled_file(filepath):
+            compiled = CompiledGrammar.load(filepath, use_mmap=False)
+            try:
+                return compiled.to_grammar()
+            finally:
+                compiled.close()
+        with gc_paused():
+            module = None
+            if workers is not None and workers > 1 and not self._is_gzip(filepath):
+                if chunk_size is None:
+                    chunk_size = max(-(-filepath.stat().st_size // (workers * 4)), 1 << 16)
+                ranges = split_file_at_lines(filepath, chunk_size)
+                if len(ranges) > 1:
+                    module = self._parse_file_parallel(filepath, ranges, workers)
+            if module is None:
+                module = self._parse_file(filepath, use_mmap)
+            return self._link(module, filepath.parent, filepath.resolve())
+
+    @staticmethod
+    def _is_gzip(filepath: pathlib.Path) -> bool:
+        with filepath.open("rb") as f:
+            return f.read(len(GZIP_MAGIC)) == GZIP_MAGIC
+
+    def _parse_file(self, filepath: pathlib.Path, use_mmap: bool = False) -> GrammarModule:
+        """
+        ファイルを1行ずつ読み込んで解析する (gzip で圧縮されたファイルは展開しながら読み込む)
+
+        Args:
+            filepath(pathlib.Path): 文法定義ファイルのパス
+            use_mmap(bool): True の場合、圧縮されていないファイルを mmap で読み込む
+
+        Returns:
+            GrammarModule: 解析結果
+        """
+        if self._is_gzip(filepath):
+            with gzip.open(filepath, "rt") as f:
+                return self._parse_rules(f)
+        if use_mmap:
+            with filepath.open("rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                return self._parse_rules(iter_mmap_lines(mm))
         with filepath.open("r") as f:
-            content = f.read()
-        return self.from_string(content)
+            return self._parse_rules(f)
+
+    def from_stream(self, stream: IO) -> CFGrammar:
+        """
+        ファイルオブジェクトから1行ずつ文法を読み込む
+
+        Args:
+            stream(IO): テキストまたはバイナリ (UTF-8) のファイルオブジェクト
+
+        Returns:
+            CFGrammar: 構築された文法オブジェクト
+        """
+        if not isinstance(stream, io.TextIOBase):
+            stream = io.TextIOWrapper(stream, encoding="utf-8")
+            try:
+                return self.parse_lines(stream)
+            finally:
+                # 呼び出し側のファイルオブジェクトを閉じないように切り離す
+                stream.detach()
+        return self.parse_lines(stream)
 
     def from_string(self, content: str) -> CFGrammar:
         """
@@ -96,85 +479,345 @@ class CFGParser:
         if not content:
             raise ValueError("Empty content")
 
-        variables: set[Variable] = set()
-        terminals: set[Terminal] = set()
+        return self.parse_lines(content.split("\n"))
+
+    def _parse_file_parallel(
+        self, filepath: pathlib.Path, ranges: list[tuple[int, int]], workers: int
+    ) -> GrammarModule:
+        """
+        ファイルの各範囲をプロセスプールで解析し、ファイルの順に併合する
+
+        Args:
+            filepath(pathlib.Path): 文法定義ファイルのパス
+            ranges(list[tuple[int, int]]): split_file_at_lines で分割した範囲
+            workers(int): プロセス数
+
+        Returns:
+            GrammarModule: 解析結果
+        """
+        with concurrent.futures.ProcessPoolExecutor(
+            max_workers=workers, initializer=_init_chunk_parser, initargs=(self.cfg,)
+        ) as executor:
+            futures = [executor.submit(_parse_file_chunk, filepath, start, end) for start, end in ranges]
+
+            def results() -> Iterator[tuple[EncodedModule, int]]:
+                line_offset = 0
+                for future, (start, end) in zip(futures, ranges):
+                    try:
+                        chunk, num_lines = future.result()
+                    except ValueError:
+                        # 最初に失敗した範囲を行番号をずらして解析し直し、逐次に解析した場合と同じエラーを送出する
+                        for other in futures:
+                            other.cancel()
+                        with filepath.open("rb") as f:
+                            f.seek(start)
+                            content = f.read(end - start).decode("utf-8")
+                        self._parse_rules(io.StringIO(content, newline=None), line_offset)
+                        raise
+                    yield chunk, num_lines
+                    line_offset += num_lines
+
+            # 先に終わった範囲の併合は、後の範囲の解析と並行して進む
+            return self._decode_chunks(results())
+
+    @staticmethod
+    def _decode_chunks(chunks: Iterable[tuple[EncodedModule, int]]) -> GrammarModule:
+        """
+        番号で表した各範囲の解析結果をファイルの順に併合し、記号と Sequence のオブジェクトを作る
+
+        Args:
+            chunks: ファイルの順に並べた (記号を番号で表した解析結果, 範囲の行数)
+
+        Returns:
+            GrammarModule: 解析結果
+        """
+        variables: dict[str, Variable] = {}
+        terminals: dict[str, Terminal] = {}
         production_rules = ProductionRules()
         start_symbol = None
+        includes: list[tuple[str, int]] = []
+        line_offset = 0
+        for chunk, num_lines in chunks:
+            # 範囲の記号の番号 -> 記号 (同じ名前の記号は範囲をまたいで1つのオブジェクトを共有する)
+            # 終端記号を逆順に後ろに並べると、終端記号の番号 ~j (負の数) でそのまま引ける
+            symbols: list[Symbol] = []
+            for names, table, symbol_class in [
+                (chunk.variables, variables, Variable),
+                (reversed(chunk.terminals), terminals, Terminal),
+            ]:
+                for name in names:
+                    symbol = table.get(name)
+                    if symbol is None:
+                        symbol = table[name] = symbol_class(name)
+                    symbols.append(symbol)
+            lookup = symbols.__getitem__
+            for lhs_id, sequences in chunk.production_rules.items():
+                rhs = ProductionRuleRHS({Sequence(list(map(lookup, ids))) for ids in sequences})
+                lhs = symbols[lhs_id]
+                if lhs in production_rules.keys():
+                    production_rules[lhs].update(rhs)
+                else:
+                    production_rules[lhs] = rhs
+            if start_symbol is None and chunk.start_symbol is not None:
+                start_symbol = symbols[chunk.start_symbol]
+            includes.extend((path, line_index + line_offset) for path, line_index in chunk.includes)
+            line_offset += num_lines
+        return GrammarModule(
+            set(variables.values()), set(terminals.values()), production_rules, start_symbol, includes
+        )
+
+    @staticmethod
+    def _merge(target: GrammarModule, module: GrammarModule) -> None:
+        """
+        module の記号と規則を target に追加する。target の開始記号が未定なら module の開始記号を使う
+
+        Args:
+            target: 追加先
+            module: 追加する解析結果 (ModuleCache と共有するため、右辺の集合は複製して追加する)
+        """
+        target.variables |= module.variables
+        target.terminals |= module.terminals
+        for lhs, rhs in module.production_rules.items():
+            if lhs in target.production_rules.keys():
+                target.production_rules[lhs].update(rhs)
+            else:
+                target.production_rules[lhs] = rhs.copy()
+        if target.start_symbol is None:
+            target.start_symbol = module.start_symbol
+
+    def parse_lines(self, lines: Iterable[str], base_dir: pathlib.Path | None = None) -> CFGrammar:
+        """
+        文法定義の行の列から文法を読み込む
+        各行は CFGLexer で1回だけ走査し、同じ名前の記号は1つのオブジェクトを共有する。
+
+        Args:
+            lines(Iterable[str]): 文法定義の行 (末尾の改行は含んでいてもよい)
+            base_dir(pathlib.Path | None): include 指令の相対パスの基準。None の場合はカレントディレクトリ
+
+        Returns:
+            CFGrammar: 構築された文法オブジェクト
+        """
+        with gc_paused():
+            return self._link(self._parse_rules(lines), pathlib.Path.cwd() if base_dir is None else base_dir)
+
+    def _link(self, root: GrammarModule, base_dir: pathlib.Path, root_path: pathlib.Path | None = None) -> CFGrammar:
+        """
+        解析結果に include したファイルの規則を加えて文法を構築する
+        include したファイルを深さ優先で1回ずつ読み込み、循環する include はエラーとする。
+
+        Args:
+            root: 読み込んだ文法の解析結果
+            base_dir: root の include 指令の相対パスの基準
+            root_path: root のファイルの解決済みのパス (ファイルでない場合は None)
+
+        Returns:
+            CFGrammar: 構築された文法オブジェクト
+        """
+        visited: set[pathlib.Path] = set()
+
+        def visit(module: GrammarModule, base: pathlib.Path, stack: list[pathlib.Path]) -> None:
+            for name, line_index in module.includes:
+                path = (base / name).resolve()
+                if path in stack:
+                    cycle = " -> ".join(str(p) for p in [*stack[stack.index(path) :], path])
+                    raise ValueError(f"Circular include: {cycle}")
+                if path in visited:
+                    continue
+                visited.add(path)
+                if not path.is_file():
+                    raise FileNotFoundError(
+                        f"Included file not found: {path}\nIncluded from: {stack[-1] if stack else '<string>'}\nLine: {line_index + 1}"
+                    )
+                included = self._load_module(path)
+                self._merge(root, included)
+                visit(included, path.parent, [*stack, path])
+
+        if root.includes:
+            visit(root, base_dir, [] if root_path is None else [root_path])
+
+        if root.start_symbol is None:
+            raise ValueError("No production rules found. Please check the grammar content.")
+
+        return CFGrammar(root.variables, root.terminals, root.start_symbol, root.production_rules)
+
+    def _load_module(self, path: pathlib.Path) -> GrammarModule:
+        """
+        include したファイルを解析する。変更されていなければ ModuleCache の解析結果を返す
+
+        Args:
+            path(pathlib.Path): 解決済みのパス
+
+        Returns:
+            GrammarModule: 解析結果 (キャッシュと共有するため変更してはならない)
+        """
+        key = (self._cfg_key, path)
+        stat = path.stat()
+        module = self._module_cache.get(key, stat)
+        if module is None:
+            try:
+                module = self._parse_file(path)
+            except ValueError as e:
+                raise ValueError(f"{e}\nFile: {path}") from e
+            self._module_cache.store(key, stat, module)
+        return module
+
+    def _parse_rules(
+        self, lines: Iterable[str], line_offset: int = 0, encoded: bool = False
+    ) -> GrammarModule | EncodedModule:
+        """
+        文法定義の行の列を解析する (include 指令は読み込まずに記録する)
+
+        Args:
+            lines(Iterable[str]): 文法定義の行
+            line_offset(int): エラーメッセージの行番号に加える値 (ファイルの途中から解析する場合)
+            encoded(bool): True の場合、記号と Sequence のオブジェクトを作らずに番号で表した結果を返す
+
+        Returns:
+            GrammarModule | EncodedModule: 解析結果 (encoded の場合は EncodedModule)
+        """
+        lexer = self._lexer
+        include_directive = self.cfg.include_directive
+        variables: dict[str, Variable] = {}
+        terminals: dict[str, Terminal] = {}
+        if encoded:
+            # 記号は作成した順の番号 (終端記号は ~j)、右辺は番号のタプルの集合で表す
+            make_variable = lambda name: len(variables)  # noqa: E731
+            make_terminal = lambda name: ~len(terminals)  # noqa: E731
+            make_sequence, make_rhs = tuple, set
+            production_rules = {}
+        else:
+            make_variable, make_terminal, make_sequence, make_rhs = Variable, Terminal, Sequence, ProductionRuleRHS
+            production_rules = ProductionRules()
+        start_symbol = None
+        includes: list[tuple[str, int]] = []
 
         # 行ごとに処理
-        for i, line in enumerate(content.split("\n")):
+        for i, line in enumerate(lines, line_offset):
             line = line.strip()
             if not line or line.startswith(self.cfg.comment_symbol):
                 # 空行またはコメント行はスキップ
                 continue
-            if self.cfg.transition_symbol not in line:
+            if include_directive and line.startswith(include_directive):
+                includes.append((self.parse_include(line, i), i))
+                continue
+            tokens = lexer.tokenize(line)
+            transitions = [n for n, (kind, _, _) in enumerate(tokens) if kind == CFGLexer.TRANSITION]
+            if not transitions:
                 # 生成規則の記号がない行はエラー
                 raise ValueError(
                     f"Invalid production rule format. All rules must contain the transition symbol '{self.cfg.transition_symbol}'.\nLine: {i + 1}\nGiven line: {line}"
                 )
-            if line.count(self.cfg.transition_symbol) > 1:
+            if len(transitions) > 1:
                 # 生成規則の記号が2つ以上ある行はエラー
                 raise ValueError(
                     f"Invalid production rule format. Only one transition symbol '{self.cfg.transition_symbol}' is allowed.\nLine: {i + 1}\nGiven line: {line}"
                 )
 
-            # 生成規則のパース
-            lhs_str, rhs_str = line.split(self.cfg.transition_symbol, 1)
-            lhs_str = lhs_str.strip()
-            rhs_str = rhs_str.strip()
-
-            lhs = self.parse_variable(lhs_str)
-            variables.add(lhs)
+            # 左辺の解析 : 左辺は1つの非終端記号
+            if transitions[0] != 1 or tokens[0][0] != CFGLexer.VARIABLE:
+                # 左辺の文字列を parse_variable に渡してエラーの内容を揃える
+                self.parse_variable(line[: tokens[transitions[0]][2]])
+                raise ValueError(f"Invalid left-hand side.\nLine: {i + 1}\nGiven line: {line}")
+            lhs = self._intern(tokens[0], variables, terminals, line, i, make_variable, make_terminal)
             if start_symbol is None:
                 start_symbol = lhs
+            if lhs not in production_rules.keys():
+                production_rules[lhs] = make_rhs()
+            rhs = production_rules[lhs]
+
+            # 右辺の解析 : 右辺は rhs_separator で区切られたトークン列に分割できる
+            # 各トークン列は非終端記号・終端記号の列か、空文字列記号1つのみからなる
+            symbols: list[Symbol] = []
+            is_empty = False
+            for token in [*tokens[2:], (CFGLexer.SEPARATOR, "", len(line))]:
+                kind = token[0]
+                if kind == CFGLexer.SEPARATOR:
+                    rhs.add(make_sequence(symbols))
+                    symbols = []
+                    is_empty = False
+                elif kind == CFGLexer.EMPTY and not symbols and not is_empty:
+                    is_empty = True
+                elif kind in (CFGLexer.VARIABLE, CFGLexer.TERMINAL) and not is_empty:
+                    symbols.append(self._intern(token, variables, terminals, line, i, make_variable, make_terminal))
+                else:
+                    # 空文字列記号は他の記号と並べることはできない
+                    raise ValueError(
+                        f"Invalid token in right-hand side:\n  Line: {i + 1}\n  Given line: {line}\n  Token: {line[token[2] :].split()[0]}"
+                    )
+
+        if encoded:
+            return EncodedModule(
+                list(variables),
+                list(terminals),
+                {lhs: list(rhs) for lhs, rhs in production_rules.items()},
+                start_symbol,
+                includes,
+            )
+        return GrammarModule(
+            set(variables.values()), set(terminals.values()), production_rules, start_symbol, includes
+        )
 
-            # 右辺の解析 : 右辺は rhs_separator で区切られた文字列に分割できる
-            # 各文字列は variable_enclosure もしくは terminal_enclosure に囲まれた token の列に分割できるか空文字列記号と一致する
-            rhs = ProductionRuleRHS()
-            for seq_str in rhs_str.split(self.cfg.rhs_separator):
-                seq_str = seq_str.strip()
+    def parse_include(self, line: str, line_index: int = 0) -> str:
+        """
+        include 指令の行から読み込むファイルのパスを取り出す
+        例: '@include "lib/identifiers.cfl"' -> "lib/identifiers.cfl"
 
-                # 変換先が空文字列の場合
-                if seq_str == self.cfg.empty_string_symbol:
-                    rhs.add(Sequence([]))
-                    continue
+        Args:
+            line(str): include 指令の行
+            line_index(int): エラーメッセージに含める行番号 (0始まり)
 
-                # 変換先が token 列の場合
-                # 空文字列記号を含むことはできないないことに注意
-                seq = Sequence()
-                # token間に空白がないケースを考慮して、enclosure[1]enclosure[0] の列の部分の間にスペースを挿入する
-                for c, o in [
-                    (self.cfg.variable_enclosure[1], self.cfg.variable_enclosure[0]),
-                    (self.cfg.variable_enclosure[1], self.cfg.terminal_enclosure[0]),
-                    (self.cfg.terminal_enclosure[1], self.cfg.variable_enclosure[0]),
-                    (self.cfg.terminal_enclosure[1], self.cfg.terminal_enclosure[0]),
-                ]:
-                    seq_str = seq_str.replace(c + o, c + " " + o)
-                for token in seq_str.split():
-                    token = token.strip()
-                    if token.startswith(self.cfg.variable_enclosure[0]):
-                        sym = self.parse_variable(token)
-                        seq.append(sym)
-                        variables.add(sym)
-                    elif token.startswith(self.cfg.terminal_enclosure[0]):
-                        sym = self.parse_terminal(token)
-                        seq.append(sym)
-                        terminals.add(sym)
-                    else:
-                        raise ValueError(
-                            f"Invalid token in right-hand side:\n  Line: {i + 1}\n  Given line: {line}\n  Token: {token}"
-                        )
-                rhs.add(seq)
-
-            # 生成規則に追加
-            if lhs not in production_rules.keys():
-                production_rules[lhs] = ProductionRuleRHS()
-            production_rules[lhs].update(rhs)
+        Returns:
+            str: パス (終端記号の囲み文字で囲まれていれば外したもの)
+        """
+        path = line.strip()[len(self.cfg.include_directive) :].strip()
+        open_, close = self.cfg.terminal_enclosure
+        if len(path) >= len(open_) + len(close) and path.startswith(open_) and path.endswith(close):
+            path = path[len(open_) : len(path) - len(close)]
+        if not path:
+            raise ValueError(
+                f"Invalid include directive. A path is required.\nLine: {line_index + 1}\nGiven line: {line}"
+            )
+        return path
+
+    def _intern(
+        self,
+        token: tuple[str, str, int],
+        variables: dict[str, Variable],
+        terminals: dict[str, Terminal],
+        line: str,
+        line_index: int,
+        make_variable: Callable[[str], Variable] = Variable,
+        make_terminal: Callable[[str], Terminal] = Terminal,
+    ) -> Symbol:
+        """
+        トークンに対応する記号を返す。同じ名前の記号は最初に作成したオブジェクトを再利用する
 
-        if start_symbol is None:
-            raise ValueError("No production rules found. Please check the grammar content.")
+        Args:
+            token: CFGLexer.tokenize が返す非終端記号または終端記号のトークン
+            variables: 名前 -> 作成済みの非終端記号
+            terminals: 名前 -> 作成済みの終端記号
+            line: エラーメッセージに含める行
+            line_index: エラーメッセージに含める行番号 (0始まり)
+            make_variable: 名前から非終端記号を作る関数
+            make_terminal: 名前から終端記号を作る関数
 
-        return CFGrammar(variables, terminals, start_symbol, production_rules)
+        Returns:
+            Symbol: 記号
+        """
+        kind, name, _ = token
+        if not name:
+            raise ValueError(
+                f"Empty {'variable' if kind == CFGLexer.VARIABLE else 'terminal'} name\nLine: {line_index + 1}\nGiven line: {line}"
+            )
+        if kind == CFGLexer.VARIABLE:
+            symbol = variables.get(name)
+            if symbol is None:
+                symbol = variables[name] = make_variable(name)
+            return symbol
+        symbol = terminals.get(name)
+        if symbol is None:
+            symbol = terminals[name] = make_terminal(name)
+        return symbol
 
     def parse_variable(self, variable_token: str) -> Variable:
         """
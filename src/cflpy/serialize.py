@@ -0,0 +1,363 @@
+import gzip
+import io
+import json
+import pathlib
+from collections.abc import Iterator
+from typing import IO
+
+from cflpy.core import ProductionRuleRHS, ProductionRules, Sequence, Symbol, Terminal, Variable
+from cflpy.grammar import BinaryNormalFormGrammar, CFGrammar, ChomskyNormalFormGrammar
+from cflpy.parser import CFGParserConfig
+
+# 構造化形式 (JSON / msgpack) の識別子とバージョン。形式を変更した場合はバージョンを上げる
+FORMAT_NAME = "cflpy-grammar"
+FORMAT_VERSION = 1
+
+# 構造化形式に記録する文法のクラス
+GRAMMAR_CLASSES: dict[str, type[CFGrammar]] = {
+    cls.__name__: cls for cls in (CFGrammar, ChomskyNormalFormGrammar, BinaryNormalFormGrammar)
+}
+
+
+# ストリームに書き出す前にまとめる規則の数
+WRITE_BATCH_SIZE = 4096
+
+
+class CanonicalGrammar:
+    def __init__(self, grammar: CFGrammar):
+        """
+        文法を集合や辞書の順序に依存しない順序に並べたもの
+
+        変数と終端記号はそれぞれ名前順に番号を付ける (開始記号も含め、規則や記号集合に現れる全ての記号)。
+        右辺の記号は、変数なら変数表の番号 i、終端記号なら終端記号表の番号 j を用いて ~j (負の数) で表す。
+        規則は開始記号の規則を先頭に、残りを左辺の名前順に並べ、同じ左辺の規則は右辺の番号の列の順に並べる。
+
+        Args:
+            grammar: 文法
+        """
+        # Symbol は名前のみで比較されるため、同じ名前の変数と終端記号が1つにまとまらないよう名前の集合を分けて作る
+        variable_names = {var.name for var in grammar.variables} | {grammar.start_symbol.name}
+        variable_names.update(lhs.name for lhs in grammar.production_rules.keys())
+        terminal_names = {term.name for term in grammar.terminals}
+        for rhs in grammar.production_rules.values():
+            for seq in rhs:
+                for sym in seq.symbols:
+                    if isinstance(sym, Variable):
+                        variable_names.add(sym.name)
+                    else:
+                        terminal_names.add(sym.name)
+        self.grammar_class = type(grammar).__name__
+        self.variables = sorted(variable_names)
+        self.terminals = sorted(terminal_names)
+        self.variable_ids = {name: i for i, name in enumerate(self.variables)}
+        self.terminal_ids = {name: i for i, name in enumerate(self.terminals)}
+        self.start_symbol = self.variable_ids[grammar.start_symbol.name]
+        self.lhs_order = sorted(
+            grammar.production_rules.keys(), key=lambda lhs: (lhs != grammar.start_symbol, lhs.name)
+        )
+        self._grammar = grammar
+
+    def encode_sequence(self, sequence: Sequence) -> tuple[int, ...]:
+        variable_ids = self.variable_ids
+        terminal_ids = self.terminal_ids
+        return tuple(
+            variable_ids[sym.name] if isinstance(sym, Variable) else ~terminal_ids[sym.name]
+            for sym in sequence.symbols
+        )
+
+    def iter_sequences(self) -> Iterator[tuple[Variable, list[tuple[tuple[int, ...], Sequence]]]]:
+        """
+        左辺と、右辺の (番号の列, 右辺) を並べ替えたリストの組を順に返す
+
+        Returns:
+            Iterator[tuple]: (左辺, [(右辺の番号の列, 右辺), ...])
+        """
+        for lhs in self.lhs_order:
+            rhs = self._grammar.production_rules[lhs]
+            yield lhs, sorted(((self.encode_sequence(seq), seq) for seq in rhs), key=lambda pair: pair[0])
+
+    def iter_rules(self) -> Iterator[tuple[int, tuple[int, ...] | None]]:
+        """
+        規則を (左辺, 右辺の番号の列) の形で順に返す (右辺が空の左辺は (左辺, None))
+
+        Returns:
+            Iterator[tuple]: 規則
+        """
+        for lhs, sequences in self.iter_sequences():
+            lhs_id = self.variable_ids[lhs.name]
+            if not sequences:
+                yield lhs_id, None
+            for ids, _ in sequences:
+                yield lhs_id, ids
+
+    def header(self) -> dict:
+        return {
+            "format": FORMAT_NAME,
+            "version": FORMAT_VERSION,
+            "class": self.grammar_class,
+            "start_symbol": self.start_symbol,
+            "variables": self.variables,
+            "terminals": self.terminals,
+        }
+
+
+def decode_grammar(header: dict, rules) -> CFGrammar:
+    """
+    構造化形式のヘッダと規則の列から文法を復元する
+
+    Args:
+        header: CanonicalGrammar.header の形式の辞書
+        rules: CanonicalGrammar.iter_rules の形式の規則の反復可能オブジェクト
+
+    Returns:
+        CFGrammar: 復元した文法 (ヘッダに記録したクラス)
+    """
+    if header.get("format") != FORMAT_NAME:
+        raise ValueError(f"Invalid serialized grammar: unexpected format {header.get('format')!r}")
+    if header.get("version") != FORMAT_VERSION:
+        raise ValueError(f"Unsupported serialized grammar version {header.get('version')} (expected {FORMAT_VERSION})")
+    grammar_class = GRAMMAR_CLASSES.get(header.get("class"))
+    if grammar_class is None:
+        raise ValueError(f"Invalid serialized grammar: unknown class {header.get('class')!r}")
+
+    variables = [Variable(name) for name in header["variables"]]
+    terminals = [Terminal(name) for name in header["terminals"]]
+    # 左辺の番号 -> 右辺の集合 (ProductionRuleRHS.add の検査を規則ごとに行わないよう、集合に直接追加する)
+    sequences: dict[int, set[Sequence]] = {}
+    for lhs_id, rhs in rules:
+        target = sequences.get(lhs_id)
+        if target is None:
+            target = sequences[lhs_id] = set()
+        if rhs is not None:
+            target.add(Sequence([variables[i] if i >= 0 else terminals[~i] for i in rhs]))
+    production_rules = ProductionRules(
+        {variables[lhs_id]: ProductionRuleRHS(target) for lhs_id, target in sequences.items()}
+    )
+    return grammar_class(set(variables), set(terminals), variables[header["start_symbol"]], production_rules)
+
+
+class CFGWriter:
+    def __init__(self, cfg: CFGParserConfig = CFGParserConfig()):
+        """
+        文法を CFGParser で読み込める .cfl 形式で書き出す
+
+        出力は正規化した順序 (CanonicalGrammar) で1つの左辺につき1行とするため、同じ文法からは常に同じ出力が得られる。
+        .cfl 形式は規則に現れない記号を表現できないため、記号の集合は読み込み直すと規則に現れる記号のみになる。
+
+        Args:
+            cfg(CFGParserConfig): 出力に使う構文の設定
+        """
+        if not isinstance(cfg, CFGParserConfig):
+            raise TypeError(f"Expected ParserConfig, got {type(cfg)}")
+        self._cfg = cfg
+
+    @property
+    def cfg(self) -> CFGParserConfig:
+        return self._cfg
+
+    def format_symbol(self, symbol: Symbol) -> str:
+        """
+        記号を囲み文字で囲んだ文字列にする
+        例: Variable("S") -> "<S>"
+
+        Args:
+            symbol(Symbol): 記号
+
+        Returns:
+            str: 記号の文字列
+        """
+        open_, close = self.cfg.terminal_enclosure if symbol.is_terminal else self.cfg.variable_enclosure
+        name = symbol.name
+        if not name or close in name or "\n" in name or "\r" in name:
+            raise ValueError(f"Symbol name cannot be written in .cfl format: {symbol!r}")
+        return f"{open_}{name}{close}"
+
+    def iter_lines(self, grammar: CFGrammar) -> Iterator[str]:
+        """
+        文法を .cfl 形式の行 (末尾の改行を含む) として順に返す
+
+        Args:
+            grammar(CFGrammar): 文法
+
+        Returns:
+            Iterator[str]: 行
+        """
+        rules = grammar.production_rules
+        if grammar.start_symbol not in rules.keys() or len(rules[grammar.start_symbol]) == 0:
+            # .cfl 形式では最初の規則の左辺が開始記号になる
+            raise ValueError(f"Start symbol has no rules and cannot be written in .cfl format: {grammar.start_symbol}")
+        transition = f" {self.cfg.transition_symbol} "
+        separator = f" {self.cfg.rhs_separator} "
+        canonical = CanonicalGrammar(grammar)
+        # 記号ごとに1回だけ整形し、右辺は番号の列から組み立てる
+        variable_strs = [self.format_symbol(Variable(name)) for name in canonical.variables]
+        terminal_strs = [self.format_symbol(Terminal(name)) for name in canonical.terminals]
+        for lhs, sequences in canonical.iter_sequences():
+            if not sequences:
+                continue
+            alternatives = [
+                " ".join(variable_strs[i] if i >= 0 else terminal_strs[~i] for i in ids)
+                if ids
+                else self.cfg.empty_string_symbol
+                for ids, _ in sequences
+            ]
+            yield variable_strs[canonical.variable_ids[lhs.name]] + transition + separator.join(alternatives) + "\n"
+
+    def write(self, grammar: CFGrammar, stream: IO[str]) -> None:
+        """
+        文法を .cfl 形式でテキストストリームに1行ずつ書き出す
+
+        Args:
+            grammar(CFGrammar): 文法
+            stream(IO[str]): 書き出し先
+        """
+        batch = []
+        for line in self.iter_lines(grammar):
+            batch.append(line)
+            if len(batch) >= WRITE_BATCH_SIZE:
+                stream.write("".join(batch))
+                batch.clear()
+        stream.write("".join(batch))
+
+    def to_string(self, grammar: CFGrammar) -> str:
+        """
+        文法を .cfl 形式の文字列にする
+
+        Args:
+            grammar(CFGrammar): 文法
+
+        Returns:
+            str: .cfl 形式の文字列
+        """
+        return "".join(self.iter_lines(grammar))
+
+    def to_file(self, grammar: CFGrammar, filepath: pathlib.Path) -> None:
+        """
+        文法を .cfl 形式のファイルに書き出す。拡張子が .gz の場合は gzip で圧縮する
+
+        Args:
+            grammar(CFGrammar): 文法
+            filepath(pathlib.Path): 書き出し先のパス
+        """
+        if filepath.suffix == ".gz":
+            with gzip.open(filepath, "wt", encoding="utf-8") as f:
+                self.write(grammar, f)
+        else:
+            with filepath.open("w", encoding="utf-8") as f:
+                self.write(grammar, f)
+
+
+def dump_json(grammar: CFGrammar, stream: IO[str]) -> None:
+    """
+    文法を構造化形式の JSON でテキストストリームに書き出す
+    規則は1つずつ書き出すため、出力全体の文字列を構築しない。出力は同じ文法に対して常に同じになる。
+
+    Args:
+        grammar(CFGrammar): 文法
+        stream(IO[str]): 書き出し先
+    """
+    canonical = CanonicalGrammar(grammar)
+    header = json.dumps(canonical.header(), ensure_ascii=False, separators=(",", ":"))
+    batch = [header[:-1] + ',"rules":[']
+    separator = "\n"
+    for lhs_id, ids in canonical.iter_rules():
+        # 整数だけからなるため json.dumps を呼ばずに整形する
+        rhs = "null" if ids is None else "[" + ",".join(map(str, ids)) + "]"
+        batch.append(f"{separator}[{lhs_id},{rhs}]")
+        separator = ",\n"
+        if len(batch) >= WRITE_BATCH_SIZE:
+            stream.write("".join(batch))
+            batch.clear()
+    stream.write("".join(batch))
+    stream.write("]}\n")
+
+
+def dumps_json(grammar: CFGrammar) -> str:
+    """
+    文法を構造化形式の JSON 文字列にする
+
+    Args:
+        grammar(CFGrammar): 文法
+
+    Returns:
+        str: JSON 文字列
+    """
+    stream = io.StringIO()
+    dump_json(grammar, stream)
+    return stream.getvalue()
+
+
+def load_json(stream: IO) -> CFGrammar:
+    """
+    構造化形式の JSON から文法を読み込む
+
+    Args:
+        stream(IO): dump_json で書き出したテキストまたはバイナリのストリーム
+
+    Returns:
+        CFGrammar: 文法
+    """
+    return loads_json(stream.read())
+
+
+def loads_json(content: str | bytes) -> CFGrammar:
+    """
+    構造化形式の JSON 文字列から文法を読み込む
+
+    Args:
+        content(str | bytes): dumps_json の戻り値
+
+    Returns:
+        CFGrammar: 文法
+    """
+    payload = json.loads(content)
+    if not isinstance(payload, dict):
+        raise ValueError("Invalid serialized grammar: expected a JSON object")
+    return decode_grammar(payload, payload.get("rules", []))
+
+
+def _import_msgpack():
+    try:
+        import msgpack
+    except ImportError as e:
+        raise ImportError("msgpack is required for the msgpack format. Install it with `pip install msgpack`.") from e
+    return msgpack
+
+
+def dump_msgpack(grammar: CFGrammar, stream: IO[bytes]) -> None:
+    """
+    文法を構造化形式の msgpack でバイナリストリームに書き出す (msgpack パッケージが必要)
+    ヘッダと各規則を順に独立した msgpack オブジェクトとして書き出すため、出力全体のバイト列を構築しない。
+
+    Args:
+        grammar(CFGrammar): 文法
+        stream(IO[bytes]): 書き出し先
+    """
+    msgpack = _import_msgpack()
+    canonical = CanonicalGrammar(grammar)
+    packer = msgpack.Packer()
+    stream.write(packer.pack(canonical.header()))
+    for rule in canonical.iter_rules():
+        stream.write(packer.pack(rule))
+
+
+def load_msgpack(stream: IO[bytes]) -> CFGrammar:
+    """
+    構造化形式の msgpack から文法を読み込む (msgpack パッケージが必要)
+    規則は1つずつ読み込むため、入力全体をメモリに読み込まない。
+
+    Args:
+        stream(IO[bytes]): dump_msgpack で書き出したバイナリストリーム
+
+    Returns:
+        CFGrammar: 文法
+    """
+    msgpack = _import_msgpack()
+    unpacker = msgpack.Unpacker(stream, use_list=False)
+    try:
+        header = next(unpacker)
+    except StopIteration:
+        raise ValueError("Invalid serialized grammar: empty input") from None
+    if not isinstance(header, dict):
+        raise ValueError("Invalid serialized grammar: expected a header map")
+    return decode_grammar(header, unpacker)
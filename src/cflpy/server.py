@@ -0,0 +1,398 @@
+import asyncio
+import collections
+import concurrent.futures
+import json
+import logging
+import math
+import os
+import time
+
+from cflpy.compiled import CompiledGrammar, release_shared_memory
+
+logger = logging.getLogger(__name__)
+
+# 問い合わせの種類 -> CompiledGrammar の処理
+QUERY_KINDS = ("member", "parse", "next")
+
+# HTTP の状態コード -> 理由句
+HTTP_REASONS = {
+    200: "OK",
+    400: "Bad Request",
+    404: "Not Found",
+    405: "Method Not Allowed",
+    413: "Payload Too Large",
+    431: "Request Header Fields Too Large",
+}
+
+# リクエストの本文の上限 (バイト)
+MAX_BODY_SIZE = 16 * 1024 * 1024
+
+
+class RequestError(Exception):
+    def __init__(self, status: int, message: str):
+        """
+        応答を返して接続を閉じる、読み込めないリクエスト
+
+        Args:
+            status: 応答の HTTP の状態コード
+            message: 応答の本文の "error" に入れる理由
+        """
+        super().__init__(message)
+        self.status = status
+
+
+def answer_query(grammar: CompiledGrammar, kind: str, string: str) -> dict:
+    """
+    1つの問い合わせに答える。文法に含まれない終端記号などのエラーは結果に含めて返す
+
+    Args:
+        grammar: 文法
+        kind: "member" (メンバーシップ判定)、"parse" (解析木)、"next" (続けられる終端記号)
+        string: 空白区切りの文字列
+
+    Returns:
+        dict: {"member": bool} / {"tree": 解析木 | None} / {"tokens": [終端記号...], "complete": bool}。
+            エラーの場合は {"error": 理由}。解析木はチョムスキー標準形の文法での導出 (CompiledGrammar.get_parse_tree_ids)
+    """
+    try:
+        terminal_ids = grammar.tokenize(string)
+        if kind == "member":
+            return {"member": grammar.is_member_ids(terminal_ids)}
+        if kind == "parse":
+            return {"tree": grammar.get_parse_tree_ids(terminal_ids)}
+        tokens = [grammar.terminal_name(t) for t in grammar.next_terminal_ids(terminal_ids)]
+        return {"tokens": tokens, "complete": grammar.is_member_ids(terminal_ids)}
+    except ValueError as e:
+        return {"error": str(e).splitlines()[0]}
+
+
+# ワーカープロセスで共有メモリから参照する文法 (_attach_grammar で設定する)
+_worker_grammar: CompiledGrammar | None = None
+
+
+def _attach_grammar(name: str) -> None:
+    global _worker_grammar
+    _worker_grammar = CompiledGrammar.attach(name)
+
+
+def _answer_batch(queries: list[tuple[str, str]]) -> list[dict]:
+    return [answer_query(_worker_grammar, kind, string) for kind, string in queries]
+
+
+class LatencyRecorder:
+    def __init__(self, window: int = 10000):
+        """
+        直近 window 件の応答時間を種類ごとに保持し、パーセンタイルを計算する
+
+        Args:
+            window: 保持する件数
+        """
+        self._window = window
+        self._latencies: dict[str, collections.deque[float]] = {}
+        self._counts: collections.Counter[str] = collections.Counter()
+
+    def record(self, kind: str, seconds: float) -> None:
+        if kind not in self._latencies:
+            self._latencies[kind] = collections.deque(maxlen=self._window)
+        self._latencies[kind].append(seconds)
+        self._counts[kind] += 1
+
+    def summary(self) -> dict:
+        """
+        種類ごとの件数と応答時間のパーセンタイル (ミリ秒)
+
+        Returns:
+            dict: {種類: {"count": 件数, "p50_ms": ..., "p90_ms": ..., "p99_ms": ..., "max_ms": ...}}
+        """
+        result = {}
+        for kind, latencies in self._latencies.items():
+            ordered = sorted(latencies)
+            result[kind] = {"count": self._counts[kind]}
+            for name, q in [("p50", 0.5), ("p90", 0.9), ("p99", 0.99), ("max", 1.0)]:
+                # nearest-rank 法
+                index = max(math.ceil(q * len(ordered)) - 1, 0)
+                result[kind][f"{name}_ms"] = round(ordered[index] * 1000, 3)
+        return result
+
+
+class GrammarServer:
+    def __init__(
+        self,
+        grammar: CompiledGrammar,
+        workers: int = 1,
+        max_batch_size: int = 256,
+        max_delay: float = 0.002,
+    ):
+        """
+        コンパイル済みの文法で問い合わせに答える常駐サーバー
+
+        I/O は asyncio で処理し、同時に届いた問い合わせを最大 max_batch_size 件 (最初の問い合わせから最大 max_delay 秒待つ)
+        のバッチにまとめてプロセスプールで処理する。ワーカーは共有メモリ上の文法を参照する。
+
+        HTTP (localhost の TCP ポートまたは Unix ソケット) で以下に答える。
+        - POST /member, /parse, /next: 本文 {"input": 文字列} または {"inputs": [文字列...]}
+          /parse の解析木はチョムスキー標準形の文法での導出で、変換で追加された変数を含む
+        - GET /stats: 種類ごとの件数、応答時間のパーセンタイル、バッチの統計
+        - GET /health: {"status": "ok"}
+
+        Args:
+            grammar: 文法
+            workers: プロセス数
+            max_batch_size: 1つのバッチの最大件数
+            max_delay: バッチに問い合わせを集める最大の待ち時間 (秒)
+        """
+        if workers < 1:
+            raise ValueError(f"workers must be positive, got {workers}")
+        if max_batch_size < 1:
+            raise ValueError(f"max_batch_size must be positive, got {max_batch_size}")
+        self.grammar = grammar
+        self.workers = workers
+        self.max_batch_size = max_batch_size
+        self.max_delay = max_delay
+        self.latencies = LatencyRecorder()
+        self.batches = 0
+        self.batched_queries = 0
+        self._queue: asyncio.Queue | None = None
+        self._batcher: asyncio.Task | None = None
+        self._in_flight: set[asyncio.Future] = set()
+        self._executor: concurrent.futures.ProcessPoolExecutor | None = None
+        self._shared_memory = None
+        self._servers: list[asyncio.AbstractServer] = []
+        self._unix_path: str | None = None
+
+    async def start(
+        self, host: str | None = "127.0.0.1", port: int | None = 0, unix_path: str | None = None
+    ) -> list[str]:
+        """
+        ワーカーを起動し、接続の受け付けを始める
+
+        Args:
+            host: TCP で待ち受けるアドレス。None の場合は TCP で待ち受けない
+            port: TCP のポート番号 (0 の場合は空いているポート)
+            unix_path: Unix ソケットのパス。None の場合は Unix ソケットで待ち受けない
+
+        Returns:
+            list[str]: 待ち受けているアドレス ("http://host:port" または "unix:path")
+        """
+        self._shared_memory = self.grammar.to_shared_memory()
+        self._executor = concurrent.futures.ProcessPoolExecutor(
+            max_workers=self.workers, initializer=_attach_grammar, initargs=(self._shared_memory.name,)
+        )
+        # fork で起動されるワーカーが接続のソケットを継承しないよう、待ち受けを始める前にワーカーを起動しておく
+        await asyncio.get_running_loop().run_in_executor(self._executor, _answer_batch, [])
+        self._queue = asyncio.Queue()
+        self._batcher = asyncio.create_task(self._run_batcher())
+
+        addresses = []
+        if host is not None:
+            server = await asyncio.start_server(self._handle_connection, host, port)
+            self._servers.append(server)
+            bound_host, bound_port = server.sockets[0].getsockname()[:2]
+            addresses.append(f"http://{bound_host}:{bound_port}")
+        if unix_path is not None:
+            server = await asyncio.start_unix_server(self._handle_connection, unix_path)
+            self._servers.append(server)
+            self._unix_path = unix_path
+            addresses.append(f"unix:{unix_path}")
+        return addresses
+
+    async def close(self) -> None:
+        """
+        接続の受け付けを止め、処理中のバッチを待ってワーカーと共有メモリを解放する
+        """
+        for server in self._servers:
+            server.close()
+            await server.wait_closed()
+        self._servers.clear()
+        if self._unix_path is not None:
+            os.unlink(self._unix_path)
+            self._unix_path = None
+        if self._batcher is not None:
+            self._batcher.cancel()
+            try:
+                await self._batcher
+            except asyncio.CancelledError:
+                pass
+            self._batcher = None
+        if self._in_flight:
+            await asyncio.gather(*self._in_flight, return_exceptions=True)
+        if self._executor is not None:
+            self._executor.shutdown()
+            self._executor = None
+        if self._shared_memory is not None:
+            release_shared_memory(self._shared_memory)
+            self._shared_memory = None
+
+    async def query(self, kind: str, string: str) -> dict:
+        """
+        問い合わせをバッチに加え、結果を待つ
+
+        Args:
+            kind: "member"、"parse"、"next" のいずれか
+            string: 空白区切りの文字列
+
+        Returns:
+            dict: answer_query の結果
+        """
+        if kind not in QUERY_KINDS:
+            raise ValueError(f"Unknown query kind: {kind}")
+        start = time.perf_counter()
+        future = asyncio.get_running_loop().create_future()
+        await self._queue.put((kind, string, future))
+        result = await future
+        self.latencies.record(kind, time.perf_counter() - start)
+        return result
+
+    def stats(self) -> dict:
+        return {
+            "latency": self.latencies.summary(),
+            "batches": self.batches,
+            "mean_batch_size": round(self.batched_queries / self.batches, 3) if self.batches else 0.0,
+            "workers": self.workers,
+        }
+
+    async def _run_batcher(self) -> None:
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = [await self._queue.get()]
+            deadline = loop.time() + self.max_delay
+            while len(batch) < self.max_batch_size:
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    batch.append(await asyncio.wait_for(self._queue.get(), timeout))
+                except TimeoutError:
+                    break
+            self.batches += 1
+            self.batched_queries += len(batch)
+            # バッチの完了を待たずに次のバッチを集める (同時に処理されるバッチの数はプールが制限する)
+            task = asyncio.ensure_future(self._dispatch(batch))
+            self._in_flight.add(task)
+            task.add_done_callback(self._in_flight.discard)
+
+    async def _dispatch(self, batch: list[tuple[str, str, asyncio.Future]]) -> None:
+        queries = [(kind, string) for kind, string, _ in batch]
+        try:
+            results = await asyncio.get_running_loop().run_in_executor(self._executor, _answer_batch, queries)
+        except Exception as e:
+            logger.exception("Batch failed")
+            results = [{"error": f"internal error: {e}"}] * len(batch)
+        for (_, _, future), result in zip(batch, results):
+            if not future.done():
+                future.set_result(result)
+
+    async def _handle_connection(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        try:
+            while True:
+                try:
+                    request = await self._read_request(reader)
+                except RequestError as e:
+                    # 本文を読み飛ばせないため、応答を返して接続を閉じる
+                    await self._write_response(writer, e.status, {"error": str(e)}, keep_alive=False)
+                    break
+                if request is None:
+                    break
+                method, path, body, keep_alive = request
+                status, payload = await self._route(method, path, body)
+                await self._write_response(writer, status, payload, keep_alive)
+                if not keep_alive:
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+
+    @staticmethod
+    async def _write_response(writer: asyncio.StreamWriter, status: int, payload: dict, keep_alive: bool) -> None:
+        data = json.dumps(payload, ensure_ascii=False).encode("utf-8")
+        writer.write(
+            f"HTTP/1.1 {status} {HTTP_REASONS[status]}\r\n"
+            f"Content-Type: application/json\r\n"
+            f"Content-Length: {len(data)}\r\n"
+            f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n\r\n".encode("ascii")
+            + data
+        )
+        await writer.drain()
+
+    @staticmethod
+    async def _read_request(reader: asyncio.StreamReader) -> tuple[str, str, bytes, bool] | None:
+        """
+        HTTP/1.1 のリクエストを1つ読み込む
+
+        Returns:
+            tuple | None: (メソッド, パス, 本文, 接続を維持するかどうか)。接続が閉じられた場合は None
+
+        Raises:
+            RequestError: リクエスト行や Content-Length が不正な場合 (400)、本文が MAX_BODY_SIZE を超える場合 (413)、
+                ヘッダの行が StreamReader の上限を超える場合 (431)
+        """
+        try:
+            request_line = await reader.readline()
+        except ValueError:
+            # 行が StreamReader の上限 (64 KiB) を超えた (LimitOverrunError)
+            raise RequestError(400, "Request line too long") from None
+        if not request_line.strip():
+            return None
+        parts = request_line.decode("latin-1").split()
+        if len(parts) != 3 or not parts[2].startswith("HTTP/"):
+            raise RequestError(400, f"Malformed request line: {request_line.decode('latin-1').strip()!r}")
+        method, path, version = parts
+        headers = {}
+        while True:
+            try:
+                line = await reader.readline()
+            except ValueError:
+                raise RequestError(431, "Header line too long") from None
+            if line in (b"\r\n", b"\n", b""):
+                break
+            name, _, value = line.decode("latin-1").partition(":")
+            headers[name.strip().lower()] = value.strip()
+        content_length = headers.get("content-length", "0")
+        if not (content_length.isascii() and content_length.isdigit()):
+            raise RequestError(400, f"Invalid Content-Length: {content_length!r}")
+        length = int(content_length)
+        if length > MAX_BODY_SIZE:
+            raise RequestError(413, f"Request body exceeds {MAX_BODY_SIZE} bytes")
+        body = await reader.readexactly(length) if length else b""
+        connection = headers.get("connection", "").lower()
+        keep_alive = connection != "close" if version == "HTTP/1.1" else connection == "keep-alive"
+        return method, path, body, keep_alive
+
+    async def _route(self, method: str, path: str, body: bytes) -> tuple[int, dict]:
+        path = path.split("?", 1)[0]
+        if path == "/health":
+            return 200, {"status": "ok"}
+        if path == "/stats":
+            return 200, self.stats()
+        kind = path.strip("/")
+        if kind not in QUERY_KINDS:
+            return 404, {"error": f"Unknown path: {path}"}
+        if method != "POST":
+            return 405, {"error": "Use POST"}
+        try:
+            request = json.loads(body or b"{}")
+        except (ValueError, UnicodeDecodeError) as e:
+            # JSONDecodeError も ValueError の派生クラス
+            return 400, {"error": f"Invalid JSON: {e}"}
+        if isinstance(request, dict) and isinstance(request.get("input"), str):
+            return 200, await self.query(kind, request["input"])
+        if isinstance(request, dict) and isinstance(request.get("inputs"), list):
+            if not all(isinstance(string, str) for string in request["inputs"]):
+                return 400, {"error": "inputs must be a list of strings"}
+            results = await asyncio.gather(*(self.query(kind, string) for string in request["inputs"]))
+            return 200, {"results": list(results)}
+        return 400, {"error": 'Expected {"input": string} or {"inputs": [string, ...]}'}
+
+    async def serve_forever(self, host: str | None = "127.0.0.1", port: int | None = 0, unix_path: str | None = None):
+        """
+        start して、キャンセルされるまで接続を受け付ける。終了時に応答時間の統計をログに出力する
+        """
+        addresses = await self.start(host, port, unix_path)
+        for address in addresses:
+            logger.info("Listening on %s", address)
+        try:
+            await asyncio.gather(*(server.serve_forever() for server in self._servers))
+        finally:
+            logger.info("Latency: %s", json.dumps(self.latencies.summary()))
+            await self.close()
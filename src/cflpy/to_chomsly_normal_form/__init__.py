@@ -1,3 +1,4 @@
-from .main import to_chomsky_normal_form
+from .main import to_binary_normal_form, to_chomsky_normal_form
+from .report import ConversionRecorder, ConversionReport, StepReport
 
-__all__ = ["to_chomsky_normal_form"]
+__all__ = ["ConversionRecorder", "ConversionReport", "StepReport", "to_binary_normal_form", "to_chomsky_normal_form"]
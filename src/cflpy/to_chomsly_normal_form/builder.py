@@ -0,0 +1,62 @@
+from cflpy.core import ProductionRuleRHS, ProductionRules, Sequence, SimplificationStats, Terminal, Variable
+
+
+class GrammarBuilder:
+    def __init__(
+        self,
+        variables: set[Variable],
+        terminals: set[Terminal],
+        start_symbol: Variable | None,
+        production_rules: ProductionRules,
+    ):
+        """
+        チョムスキー標準形への変換中の文法を保持する可変なオブジェクト
+
+        入力の生成規則は右辺の集合ごと一度だけ複製するため、各ステップがこのオブジェクトを直接変更しても
+        入力の文法は変更されない。右辺の Sequence は入力と共有するので、ステップは Sequence を変更せず、
+        新しい Sequence を作って置き換えること。
+
+        Args:
+            variables: 非終端記号の集合
+            terminals: 終端記号の集合
+            start_symbol: 開始記号
+            production_rules: 生成規則 (右辺が ProductionRuleRHS でなくても、Sequence の反復可能オブジェクトであればよい)
+        """
+        self.variables = set(variables)
+        self.terminals = set(terminals)
+        self.start_symbol = start_symbol
+        self.production_rules = ProductionRules(
+            {lhs: ProductionRuleRHS(set(rhs)) for lhs, rhs in production_rules.items()}
+        )
+
+    def add_rule(self, lhs: Variable, sequence: Sequence) -> None:
+        """
+        規則 lhs := sequence を追加する
+
+        Args:
+            lhs: 左辺の変数
+            sequence: 右辺
+        """
+        if lhs not in self.production_rules.keys():
+            self.production_rules[lhs] = ProductionRuleRHS()
+        self.production_rules[lhs].add(sequence)
+
+    def simplify(self) -> SimplificationStats:
+        """
+        不要な記号を除去する (ProductionRules.simplify_in_place)
+
+        Returns:
+            SimplificationStats: 除去の統計
+        """
+        stats = self.production_rules.simplify_in_place(self.start_symbol)
+        self.variables = set(self.production_rules.keys())
+        return stats
+
+    def freeze(self) -> tuple[set[Variable], set[Terminal], Variable, ProductionRules]:
+        """
+        変換結果を変更できない生成規則として取り出す。以降このオブジェクトを変更してはならない
+
+        Returns:
+            tuple: (非終端記号の集合, 終端記号の集合, 開始記号, 凍結した生成規則)
+        """
+        return self.variables, self.terminals, self.start_symbol, self.production_rules.freeze()
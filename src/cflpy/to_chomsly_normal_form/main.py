@@ -1,9 +1,37 @@
-from cflpy.core import ProductionRuleRHS, ProductionRules, Sequence, Terminal, Variable
-from cflpy.to_chomsly_normal_form.step1_start_symbol import step1_start_symbol
-from cflpy.to_chomsly_normal_form.step2_remove_epsilon import step2_remove_epsilon
-from cflpy.to_chomsly_normal_form.step3_remove_unit import step3_remove_unit
-from cflpy.to_chomsly_normal_form.step4_decompose_long_productions import step4_decompose_long_productions
-from cflpy.to_chomsly_normal_form.step5_remove_terminal_in_2_term_rule import step5_remove_terminal_in_2_term_rule
+from collections.abc import Callable
+
+from cflpy.core import ProductionRules, Terminal, Variable
+from cflpy.to_chomsly_normal_form.builder import GrammarBuilder
+from cflpy.to_chomsly_normal_form.report import ConversionRecorder
+from cflpy.to_chomsly_normal_form.step1_start_symbol import step1_start_symbol_in_place
+from cflpy.to_chomsly_normal_form.step2_remove_epsilon import step2_remove_epsilon_in_place
+from cflpy.to_chomsly_normal_form.step3_remove_unit import step3_remove_unit_in_place
+from cflpy.to_chomsly_normal_form.step4_decompose_long_productions import step4_decompose_long_productions_in_place
+from cflpy.to_chomsly_normal_form.step5_remove_terminal_in_2_term_rule import (
+    step5_remove_terminal_in_2_term_rule_in_place,
+)
+
+
+def run_step(
+    builder: GrammarBuilder,
+    recorder: ConversionRecorder | None,
+    name: str,
+    step: Callable[[GrammarBuilder], object],
+) -> None:
+    """
+    変換のステップを実行する。recorder が指定されていれば計測し、ステップの関数が返した統計を StepReport.stats に記録する
+
+    Args:
+        builder: 変換中の文法
+        recorder: 計測結果の記録先
+        name: ステップの名前
+        step: builder を直接変更するステップの関数
+    """
+    if recorder is None:
+        step(builder)
+        return
+    with recorder.step(name, lambda: (builder.variables, builder.production_rules)) as outcome:
+        outcome["stats"] = step(builder)
 
 
 def to_chomsky_normal_form(
@@ -11,35 +39,112 @@ def to_chomsky_normal_form(
     terminals: set[Terminal],
     start_symbol: Variable,
     production_rules: ProductionRules,
+    binarize_first: bool = True,
+    simplify: bool = True,
+    recorder: ConversionRecorder | None = None,
 ) -> tuple[set[Variable], set[Terminal], Variable, ProductionRules]:
     """
     文脈自由文法をチョムスキー標準形に変換
 
+    binarize_first が True の場合、ε規則の除去の前に長い規則を分解する (BIN → DEL)。
+    分解後の右辺は高々2記号なので、ε規則の除去で追加される規則は1規則あたり高々3個に抑えられ、
+    変換後の文法の大きさは元の文法の大きさの多項式で抑えられる。
+    False の場合は従来の順序 (DEL → UNIT → BIN) で変換する。
+    この場合、nullable な変数を n 個含む規則からは最大で 2^n 個の規則が生成される。
+
+    simplify が True の場合、変換の前後で終端記号列を生成できない変数と開始記号から到達できない変数を除去する。
+    終端記号の集合は入力の文字集合としてそのまま返す。
+
     Args:
         variables: 非終端記号の集合
         terminals: 終端記号の集合
         start_symbol: 開始記号
         productions: 生成規則 {非終端: {[右辺の記号...], ...}}
+        binarize_first: ε規則の除去の前に長い規則を分解するかどうか
+        simplify: 変換の前後で不要な記号を除去するかどうか
+        recorder: 指定した場合、各ステップの経過時間と文法の大きさを計測して recorder.report に追加する
 
     Returns:
         tuple: (新しい非終端記号の集合, 新しい終端記号の集合, 新しい開始記号, 新しい生成規則)
+            生成規則は凍結されており変更できない。入力の文法は変更されない。
     """
 
-    # 仮実装
+    # 入力の文法は一度だけ複製し、以降の各ステップはこの builder を直接変更する
+    builder = GrammarBuilder(variables, terminals, start_symbol, production_rules)
+
+    def run(name: str, step: Callable[[GrammarBuilder], object]) -> None:
+        run_step(builder, recorder, name, step)
+
+    # 不要な記号の除去 (変換前)
+    if simplify:
+        run("simplify", GrammarBuilder.simplify)
 
     # Step 1: 開始記号の処理
-    variables, start_symbol, production_rules = step1_start_symbol(variables, start_symbol, production_rules)
+    run("start", step1_start_symbol_in_place)
+
+    # Step 4 (BIN → DEL の場合): 長い規則をε規則の除去より先に分解する
+    if binarize_first:
+        run("bin", step4_decompose_long_productions_in_place)
 
     # Step 2: ε-規則の除去
-    variables, start_symbol, production_rules = step2_remove_epsilon(variables, start_symbol, production_rules)
+    run("del", step2_remove_epsilon_in_place)
 
     # Step 3: 単位規則の除去
-    production_rules = step3_remove_unit(production_rules)
+    run("unit", step3_remove_unit_in_place)
 
     # Step 4: 長い規則の分解
-    production_rules, variables = step4_decompose_long_productions(production_rules, variables, terminals)
+    if not binarize_first:
+        run("bin", step4_decompose_long_productions_in_place)
 
     # Step 5: 終端記号の処理
-    production_rules, variables = step5_remove_terminal_in_2_term_rule(production_rules, variables, terminals)
+    run("term", step5_remove_terminal_in_2_term_rule_in_place)
+
+    # 不要な記号の除去 (変換後): 単位規則の除去で参照されなくなった変数などを取り除く
+    if simplify:
+        run("simplify", GrammarBuilder.simplify)
+
+    return builder.freeze()
+
+
+def to_binary_normal_form(
+    variables: set[Variable],
+    terminals: set[Terminal],
+    start_symbol: Variable,
+    production_rules: ProductionRules,
+    simplify: bool = True,
+    recorder: ConversionRecorder | None = None,
+) -> tuple[set[Variable], set[Terminal], Variable, ProductionRules]:
+    """
+    文脈自由文法を2項標準形 (2NF) に変換
+
+    チョムスキー標準形への変換から単位規則の除去 (Step 3) を省いたもの (START → BIN → DEL → TERM)。
+    単位規則 A := B を残すため、B の規則を A に複製せずに済み、変換後の文法はチョムスキー標準形より小さくなる。
+    単位規則は BinaryNormalFormGrammar の CYK で、各セルに単位規則の閉包を適用して扱う (Lange & Leiß, 2009)。
+
+    Args:
+        variables: 非終端記号の集合
+        terminals: 終端記号の集合
+        start_symbol: 開始記号
+        production_rules: 生成規則
+        simplify: 変換の前後で不要な記号を除去するかどうか
+        recorder: 指定した場合、各ステップの経過時間と文法の大きさを計測して recorder.report に追加する
+
+    Returns:
+        tuple: (新しい非終端記号の集合, 新しい終端記号の集合, 新しい開始記号, 新しい生成規則)
+            生成規則は凍結されており変更できない。入力の文法は変更されない。
+    """
+    builder = GrammarBuilder(variables, terminals, start_symbol, production_rules)
+
+    def run(name: str, step: Callable[[GrammarBuilder], object]) -> None:
+        run_step(builder, recorder, name, step)
+
+    if simplify:
+        run("simplify", GrammarBuilder.simplify)
+    run("start", step1_start_symbol_in_place)
+    run("bin", step4_decompose_long_productions_in_place)
+    run("del", step2_remove_epsilon_in_place)
+    run("term", step5_remove_terminal_in_2_term_rule_in_place)
+    if simplify:
+        run("simplify", GrammarBuilder.simplify)
 
-    return variables, terminals, start_symbol, production_rules
+    return builder.freeze()
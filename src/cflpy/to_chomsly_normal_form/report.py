@@ -0,0 +1,139 @@
+import contextlib
+import dataclasses
+import logging
+import time
+import tracemalloc
+from collections.abc import Callable, Iterator
+
+from cflpy.core import ProductionRules, Variable
+
+logger = logging.getLogger(__name__)
+
+
+@dataclasses.dataclass
+class StepReport:
+    """変換の1ステップの計測結果
+
+    Attributes:
+        name: ステップの名前 ("simplify", "start", "bin", "del", "unit", "term", "minimize")
+        seconds: 経過時間 (秒)
+        variables_before: ステップ前の変数の数
+        variables_after: ステップ後の変数の数
+        rules_before: ステップ前の規則の数
+        rules_after: ステップ後の規則の数
+        peak_memory: ステップ中に確保されたメモリの最大値 (バイト)。メモリを計測しない場合は None
+        stats: ステップの関数が返した統計 ("simplify" は SimplificationStats、"bin" は DecompositionStats)。
+            統計を返さないステップでは None
+    """
+
+    name: str
+    seconds: float
+    variables_before: int
+    variables_after: int
+    rules_before: int
+    rules_after: int
+    peak_memory: int | None = None
+    stats: object | None = None
+
+
+@dataclasses.dataclass
+class ConversionReport:
+    """チョムスキー標準形への変換の計測結果
+
+    Attributes:
+        steps: 実行した順の各ステップの計測結果
+        cache_hit: 変換結果をキャッシュから読み込んだかどうか (この場合 steps は空)
+    """
+
+    steps: list[StepReport] = dataclasses.field(default_factory=list)
+    cache_hit: bool = False
+
+    @property
+    def seconds(self) -> float:
+        return sum(step.seconds for step in self.steps)
+
+    @property
+    def peak_memory(self) -> int | None:
+        peaks = [step.peak_memory for step in self.steps if step.peak_memory is not None]
+        return max(peaks) if peaks else None
+
+
+class ConversionRecorder:
+    def __init__(self, on_step: Callable[[StepReport], None] | None = None, trace_memory: bool = False):
+        """
+        変換の各ステップを計測し、ConversionReport にまとめる
+
+        計測結果は ConversionReport に追加されるほか、on_step に渡され、
+        ロガー cflpy.to_chomsly_normal_form.report に DEBUG レベルで出力される。
+
+        Args:
+            on_step: ステップが終わるたびに呼び出される関数
+            trace_memory: tracemalloc でステップ中のメモリ確保の最大値を計測するかどうか (変換が遅くなる)
+        """
+        self.report = ConversionReport()
+        self._on_step = on_step
+        self._trace_memory = trace_memory
+
+    @contextlib.contextmanager
+    def step(
+        self, name: str, grammar: Callable[[], tuple[set[Variable], ProductionRules]]
+    ) -> Iterator[dict[str, object]]:
+        """
+        with 文の中の処理を1ステップとして計測する
+
+        Args:
+            name: ステップの名前
+            grammar: 計測対象の (非終端記号の集合, 生成規則) を返す関数。ステップの前後で呼び出される
+
+        Yields:
+            dict[str, object]: with 文の中で "stats" にステップの統計を設定すると StepReport.stats に記録される
+        """
+        variables, production_rules = grammar()
+        variables_before = len(variables)
+        rules_before = sum(len(rhs) for rhs in production_rules.values())
+
+        started_tracing = False
+        if self._trace_memory:
+            if not tracemalloc.is_tracing():
+                tracemalloc.start()
+                started_tracing = True
+            tracemalloc.reset_peak()
+            memory_before = tracemalloc.get_traced_memory()[0]
+
+        outcome: dict[str, object] = {}
+        start = time.perf_counter()
+        try:
+            yield outcome
+        finally:
+            seconds = time.perf_counter() - start
+            peak_memory = None
+            if self._trace_memory:
+                peak_memory = max(tracemalloc.get_traced_memory()[1] - memory_before, 0)
+                if started_tracing:
+                    tracemalloc.stop()
+
+        variables, production_rules = grammar()
+        step = StepReport(
+            name=name,
+            seconds=seconds,
+            variables_before=variables_before,
+            variables_after=len(variables),
+            rules_before=rules_before,
+            rules_after=sum(len(rhs) for rhs in production_rules.values()),
+            peak_memory=peak_memory,
+            stats=outcome.get("stats"),
+        )
+        self.report.steps.append(step)
+        logger.debug(
+            "%s: %.6fs, variables %d -> %d, rules %d -> %d, peak memory %s, stats %s",
+            step.name,
+            step.seconds,
+            step.variables_before,
+            step.variables_after,
+            step.rules_before,
+            step.rules_after,
+            step.peak_memory,
+            step.stats,
+        )
+        if self._on_step is not None:
+            self._on_step(step)
@@ -1,4 +1,22 @@
 from cflpy.core import ProductionRuleRHS, ProductionRules, Sequence, Variable
+from cflpy.to_chomsly_normal_form.builder import GrammarBuilder
+
+
+def step1_start_symbol_in_place(builder: GrammarBuilder) -> None:
+    """チョムスキー標準形の変換ステップ1: 開始記号の処理 (builder を直接変更する)
+    開始記号が右辺に現れる場合、新しい非終端記号を追加し、開始記号を変更する。
+
+    Args:
+        builder: 変換中の文法
+    """
+    start_symbol = builder.start_symbol
+    if any(start_symbol in seq for rhs in builder.production_rules.values() for seq in rhs):
+        new_start_symbol = Variable(f"{start_symbol}'")
+        while new_start_symbol in builder.variables:
+            new_start_symbol = Variable(f"{new_start_symbol.name}'")
+        builder.variables.add(new_start_symbol)
+        builder.production_rules[new_start_symbol] = ProductionRuleRHS({Sequence([start_symbol])})
+        builder.start_symbol = new_start_symbol
 
 
 def step1_start_symbol(
@@ -17,16 +35,6 @@ def step1_start_symbol(
         new_start_symbol: 新しい開始記号
         new_production_rules: 新しい生成規則の辞書
     """
-    new_production_rules = production_rules.copy()
-    new_variables = variables.copy()
-
-    if any(start_symbol in seq for rhs in production_rules.values() for seq in rhs):
-        new_start_symbol = Variable(f"{start_symbol}'")
-        while new_start_symbol in variables:
-            new_start_symbol = Variable(f"{new_start_symbol.name}'")
-        new_variables.add(new_start_symbol)
-        new_production_rules[new_start_symbol] = ProductionRuleRHS({Sequence([start_symbol])})
-    else:
-        new_start_symbol = start_symbol
-
-    return new_variables, new_start_symbol, new_production_rules
+    builder = GrammarBuilder(variables, set(), start_symbol, production_rules)
+    step1_start_symbol_in_place(builder)
+    return builder.variables, builder.start_symbol, builder.production_rules
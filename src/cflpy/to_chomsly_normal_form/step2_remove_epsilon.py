@@ -1,8 +1,37 @@
-from cflpy.core import ProductionRuleRHS, ProductionRules, Sequence, Terminal, Variable
+from cflpy.core import ProductionRuleRHS, ProductionRules, Sequence, Symbol, Terminal, Variable
+from cflpy.to_chomsly_normal_form.builder import GrammarBuilder
+
+
+def index_rule_occurrences(
+    production_rules: ProductionRules,
+) -> tuple[list[Variable], list[int], dict[Symbol, list[int]]]:
+    """不動点計算のために、各規則の右辺に出現する記号の逆引きインデックスを作る
+
+    Args:
+        production_rules: 対象の生成規則
+
+    Returns:
+        list[Variable]: 規則番号 -> 左辺の変数
+        list[int]: 規則番号 -> 右辺の長さ (まだ条件を満たしていない記号の出現数の初期値)
+        dict[Symbol, list[int]]: 記号 -> その記号が出現する規則番号のリスト (出現ごとに1要素)
+    """
+    rule_lhs: list[Variable] = []
+    pending_symbols: list[int] = []
+    occurrences: dict[Symbol, list[int]] = {}
+    for var, rhs in production_rules.items():
+        for seq in rhs:
+            rule_id = len(rule_lhs)
+            rule_lhs.append(var)
+            pending_symbols.append(len(seq))
+            for sym in seq:
+                occurrences.setdefault(sym, []).append(rule_id)
+    return rule_lhs, pending_symbols, occurrences
 
 
 def find_null_definite(production_rules: ProductionRules) -> set[Variable]:
     """変換の結果 必ず epsilon を生成する変数を見つける
+    全ての右辺が null-definite な記号のみからなる変数を、逆引きインデックスを用いたワークリストで求める。
+    計算量は生成規則の大きさに対して線形。
 
     Args:
         production_rules: 変換対象の生成規則
@@ -10,29 +39,67 @@ def find_null_definite(production_rules: ProductionRules) -> set[Variable]:
     Returns:
         set[Variable]: epsilon を生成する変数の集合
     """
-    # null_definiteな変数を取り除く
-    null_definite = set()
-    changed = False
     eps = Sequence([])
 
-    for var, rhs in production_rules.items():
-        if rhs == ProductionRuleRHS({eps}):
-            null_definite.add(var)
-            changed = True
-
-    while changed:
-        changed = False
-        for var, rhs in production_rules.items():
-            if var in null_definite:
+    # epsilon のみを生成する変数がなければ null-definite な変数は存在しない
+    if not any(rhs == ProductionRuleRHS({eps}) for rhs in production_rules.values()):
+        return set()
+
+    rule_lhs, pending_symbols, occurrences = index_rule_occurrences(production_rules)
+
+    # 変数ごとに、null-definite な記号のみからなると確定していない右辺の数を数える
+    pending_sequences: dict[Variable, int] = {var: 0 for var in production_rules.keys()}
+    for rule_id, var in enumerate(rule_lhs):
+        if pending_symbols[rule_id] > 0:
+            pending_sequences[var] += 1
+
+    worklist = [var for var, count in pending_sequences.items() if count == 0]
+    null_definite = set(worklist)
+    while worklist:
+        sym = worklist.pop()
+        for rule_id in occurrences.get(sym, []):
+            pending_symbols[rule_id] -= 1
+            if pending_symbols[rule_id] > 0:
                 continue
-            if all(all(sym in null_definite for sym in seq) for seq in rhs):
+            var = rule_lhs[rule_id]
+            pending_sequences[var] -= 1
+            if pending_sequences[var] == 0 and var not in null_definite:
                 null_definite.add(var)
-                changed = True
-                break
+                worklist.append(var)
 
     return null_definite
 
 
+def remove_null_definite_in_place(builder: GrammarBuilder) -> None:
+    """null-definiteな変数を削除し、右辺からその出現を取り除く (builder を直接変更する)
+    開始記号が null-definite の場合、文法は 開始記号 := ε のみになる。
+
+    Args:
+        builder: 変換中の文法
+    """
+    null_definite = find_null_definite(builder.production_rules)
+
+    if not null_definite:
+        return
+
+    start_symbol = builder.start_symbol
+    if start_symbol in null_definite:
+        builder.production_rules = ProductionRules({start_symbol: ProductionRuleRHS({Sequence([])})})
+        builder.variables = {start_symbol}
+        return
+
+    builder.variables -= null_definite
+    for var in null_definite:
+        del builder.production_rules[var]
+
+    for rhs in builder.production_rules.values():
+        affected = [seq for seq in rhs if any(sym in null_definite for sym in seq)]
+        for seq in affected:
+            rhs.remove(seq)
+        for seq in affected:
+            rhs.add(Sequence([sym for sym in seq if sym not in null_definite]))
+
+
 def remove_null_definite(
     production_rules: ProductionRules, variables: set[Variable], start_symbol: Variable
 ) -> tuple[ProductionRules, set[Variable]]:
@@ -48,40 +115,15 @@ def remove_null_definite(
         set[Variable]: 変換後の変数の集合
 
     """
-    null_definite = find_null_definite(production_rules)
-
-    if not null_definite:
-        return production_rules, variables
-
-    if start_symbol in null_definite:
-        new_production_rules = ProductionRules({start_symbol: ProductionRuleRHS({Sequence([])})})
-        new_variables = {start_symbol}
-        return new_production_rules, new_variables
-
-    new_production_rules = production_rules.copy()
-    new_variables = variables - null_definite
-    for var in null_definite:
-        del new_production_rules[var]
-
-    for var in new_variables:
-        new_rhs = ProductionRuleRHS()
-        for seq in new_production_rules[var]:
-            indices = [i for i, sym in enumerate(seq) if sym in null_definite]
-            if not indices:
-                new_rhs.add(seq)
-                continue
-            new_seq_list = seq.copy().symbols
-            for i in reversed(indices):
-                new_seq_list = new_seq_list[:i] + new_seq_list[i + 1 :]
-            new_seq = Sequence(new_seq_list)
-            new_rhs.add(new_seq)
-        new_production_rules[var] = new_rhs
-
-    return new_production_rules, new_variables
+    builder = GrammarBuilder(variables, set(), start_symbol, production_rules)
+    remove_null_definite_in_place(builder)
+    return builder.production_rules, builder.variables
 
 
 def find_nullable(production_rules: ProductionRules) -> set[Variable]:
     """変換の結果 epsilon を生成しうる変数を見つける
+    nullable な記号のみからなる右辺を持つ変数を、逆引きインデックスを用いたワークリストで求める。
+    計算量は生成規則の大きさに対して線形。
 
     Args:
         production_rules: 変換対象の生成規則
@@ -89,27 +131,21 @@ def find_nullable(production_rules: ProductionRules) -> set[Variable]:
     Returns:
         set[Variable]: epsilon を生成しうる変数の集合
     """
-    nullable = set()
-    changed = False
-    eps = Sequence([])
-
-    # First pass: find variables with direct epsilon productions
-    for var, rhs in production_rules.items():
-        if any(seq == eps for seq in rhs):
-            nullable.add(var)
-            changed = True
-
-    # Subsequent passes: find variables that derive all nullable symbols
-    while changed:
-        changed = False
-        for var, rhs in production_rules.items():
-            if var in nullable:
-                continue
-            for seq in rhs:
-                if all(sym in nullable for sym in seq):
-                    nullable.add(var)
-                    changed = True
-                    break
+    rule_lhs, pending_symbols, occurrences = index_rule_occurrences(production_rules)
+
+    # epsilon を直接生成する変数から始める
+    nullable = {rule_lhs[rule_id] for rule_id, count in enumerate(pending_symbols) if count == 0}
+    worklist = list(nullable)
+
+    # nullable になった記号の出現ごとに、その規則の残りの記号数を減らす
+    while worklist:
+        sym = worklist.pop()
+        for rule_id in occurrences.get(sym, []):
+            pending_symbols[rule_id] -= 1
+            var = rule_lhs[rule_id]
+            if pending_symbols[rule_id] == 0 and var not in nullable:
+                nullable.add(var)
+                worklist.append(var)
 
     return nullable
 
@@ -127,16 +163,12 @@ def generate_nullable_replaced_sequences(sequence: Sequence, nullable_variable:
         set[Sequence]: 新しい列の集合
     """
     generated_sequences: set[Sequence] = set()
-    # Generate all combinations of nullable variables
-    for i in range(1 << len(sequence)):
-        new_sequence_symbols = []
-        for j, sym in enumerate(sequence):
-            if isinstance(sym, Variable) and sym == nullable_variable:
-                # Replace with epsilon (empty string)
-                if i & (1 << j):
-                    continue
-            new_sequence_symbols.append(sym)
-        new_sequence = Sequence(new_sequence_symbols)
+    # nullable_variable の出現位置についてのみ組み合わせを列挙する
+    positions = [j for j, sym in enumerate(sequence) if isinstance(sym, Variable) and sym == nullable_variable]
+    for i in range(1 << len(positions)):
+        # Replace with epsilon (empty string)
+        removed = {position for k, position in enumerate(positions) if i & (1 << k)}
+        new_sequence = Sequence([sym for j, sym in enumerate(sequence) if j not in removed])
         if new_sequence == Sequence([]):
             continue
         generated_sequences.add(new_sequence)
@@ -165,6 +197,56 @@ def replace_nullable(production_rules: ProductionRules, target_nullable: Variabl
     return new_production_rules
 
 
+def generate_nullable_expansions(sequence: Sequence, nullable: set[Variable]) -> set[Sequence]:
+    """右辺に出現する全ての nullable な変数について、その出現を取り除いた列を全て生成する
+    nullable な変数の出現が n 個ある場合、最大で 2^n 個の列を生成する (元の列を含み、空の列は含まない)。
+    replace_nullable を nullable な変数ごとに繰り返し適用した結果と一致する。
+
+    Args:
+        sequence: Symbolの列
+        nullable: nullable な変数の集合
+
+    Returns:
+        set[Sequence]: 新しい列の集合
+    """
+    positions = [j for j, sym in enumerate(sequence) if isinstance(sym, Variable) and sym in nullable]
+    generated_sequences: set[Sequence] = set()
+    for i in range(1 << len(positions)):
+        removed = {position for k, position in enumerate(positions) if i & (1 << k)}
+        new_sequence = Sequence([sym for j, sym in enumerate(sequence) if j not in removed])
+        if len(new_sequence) == 0:
+            continue
+        generated_sequences.add(new_sequence)
+    return generated_sequences
+
+
+def step2_remove_epsilon_in_place(builder: GrammarBuilder) -> None:
+    """epsilon ruleを削除する (builder を直接変更する)
+    手順は step2_remove_epsilon を参照。
+
+    Args:
+        builder: 変換中の文法
+    """
+    remove_null_definite_in_place(builder)
+
+    nullable = find_nullable(builder.production_rules)
+
+    if nullable:
+        for rhs in builder.production_rules.values():
+            affected = [seq for seq in rhs if any(isinstance(sym, Variable) and sym in nullable for sym in seq)]
+            for seq in affected:
+                for new_seq in generate_nullable_expansions(seq, nullable):
+                    rhs.add(new_seq)
+
+    eps = Sequence([])
+    for nullable_variable in nullable:
+        if eps in builder.production_rules[nullable_variable]:
+            builder.production_rules[nullable_variable].remove(eps)
+
+    if builder.start_symbol in nullable:
+        builder.production_rules[builder.start_symbol].add(eps)
+
+
 def step2_remove_epsilon(
     variables: set[Variable], start_symbol: Variable, production_rules: ProductionRules
 ) -> tuple[set[Variable], Variable, ProductionRules]:
@@ -186,20 +268,6 @@ def step2_remove_epsilon(
         - Updated start symbol (same as input)
         - Updated production rules without epsilon productions
     """
-    production_rules, variables = remove_null_definite(production_rules, variables, start_symbol)
-
-    nullable = find_nullable(production_rules)
-    production_rules = production_rules.copy()
-
-    for nullable_variable in nullable:
-        production_rules = replace_nullable(production_rules, nullable_variable)
-
-    eps = Sequence([])
-    for nullable_variable in nullable:
-        if eps in production_rules[nullable_variable]:
-            production_rules[nullable_variable].remove(eps)
-
-    if start_symbol in nullable:
-        production_rules[start_symbol].add(eps)
-
-    return variables, start_symbol, production_rules
+    builder = GrammarBuilder(variables, set(), start_symbol, production_rules)
+    step2_remove_epsilon_in_place(builder)
+    return builder.variables, builder.start_symbol, builder.production_rules
@@ -1,4 +1,58 @@
-from cflpy.core import ProductionRuleRHS, ProductionRules, Sequence, Variable
+from cflpy.core import ProductionRules, Variable
+from cflpy.to_chomsly_normal_form.builder import GrammarBuilder
+
+
+def find_strongly_connected_components(graph: list[list[int]]) -> list[list[int]]:
+    """Tarjan のアルゴリズム (非再帰版) で有向グラフの強連結成分を求める
+
+    Args:
+        graph: 隣接リスト {頂点番号: [後続の頂点番号...]}
+
+    Returns:
+        list[list[int]]: 強連結成分のリスト。各成分から到達できる成分は、その成分より前に現れる (逆トポロジカル順)
+    """
+    index_of = [-1] * len(graph)
+    lowlink = [0] * len(graph)
+    on_stack = [False] * len(graph)
+    stack: list[int] = []
+    components: list[list[int]] = []
+    counter = 0
+
+    for root in range(len(graph)):
+        if index_of[root] != -1:
+            continue
+        index_of[root] = lowlink[root] = counter
+        counter += 1
+        stack.append(root)
+        on_stack[root] = True
+        work = [(root, iter(graph[root]))]
+        while work:
+            node, successors = work[-1]
+            for succ in successors:
+                if index_of[succ] == -1:
+                    index_of[succ] = lowlink[succ] = counter
+                    counter += 1
+                    stack.append(succ)
+                    on_stack[succ] = True
+                    work.append((succ, iter(graph[succ])))
+                    break
+                if on_stack[succ]:
+                    lowlink[node] = min(lowlink[node], index_of[succ])
+            else:
+                work.pop()
+                if work:
+                    parent = work[-1][0]
+                    lowlink[parent] = min(lowlink[parent], lowlink[node])
+                if lowlink[node] == index_of[node]:
+                    component = []
+                    while True:
+                        member = stack.pop()
+                        on_stack[member] = False
+                        component.append(member)
+                        if member == node:
+                            break
+                    components.append(component)
+    return components
 
 
 def find_unit_pairs(production_rules: ProductionRules) -> dict[Variable, set[Variable]]:
@@ -6,36 +60,91 @@ def find_unit_pairs(production_rules: ProductionRules) -> dict[Variable, set[Var
     単位ペアとは、2つの非終端記号のペア(A, B)であり、1つ以上の生成規則を介して A から Bに遷移できるようなものを指す。
     特に、全ての非終端記号 A について (A, A) は単位ペアである。
 
+    単位規則のグラフを強連結成分に縮約し、逆トポロジカル順に到達可能集合をビット集合で計算する。
+
     Args:
         productions (ProductionRules): 生成規則
 
     Returns:
         dict[Variable, set[Variable]]: 単位ペア {非終端: [非終端...]}
     """
-    unit_production_pairs: dict[Variable, set[Variable]] = {}
+    # 単位規則のグラフを構築する
+    nodes: list[Variable] = list(production_rules.keys())
+    node_ids: dict[Variable, int] = {var: i for i, var in enumerate(nodes)}
+    graph: list[list[int]] = [[] for _ in nodes]
     for lhs, rhs in production_rules.items():
-        if lhs not in unit_production_pairs.keys():
-            unit_production_pairs[lhs] = set()
         for seq in rhs:
             if len(seq) == 1 and isinstance(seq[0], Variable):  # 単位規則の場合
-                unit_production_pairs[lhs].add(seq[0])
-
-    # 連鎖する単位規則について、すべての非終端記号を追加
-    changed = True
-    while changed:
-        changed = False
-        for lhs, mid_set in unit_production_pairs.items():
-            to_be_extended: set[Variable] = set()
-            for mid in mid_set:
-                if mid in unit_production_pairs.keys():
-                    to_be_extended.update(unit_production_pairs[mid])
-            original_length = len(unit_production_pairs[lhs])
-            unit_production_pairs[lhs].update(to_be_extended)
-            if len(unit_production_pairs[lhs]) > original_length:
-                changed = True
+                if seq[0] not in node_ids:
+                    node_ids[seq[0]] = len(nodes)
+                    nodes.append(seq[0])
+                    graph.append([])
+                graph[node_ids[lhs]].append(node_ids[seq[0]])
+
+    # 強連結成分ごとに、1回以上の単位規則で到達できる頂点の集合をビット集合で求める
+    components = find_strongly_connected_components(graph)
+    component_of = [0] * len(nodes)
+    for c, component in enumerate(components):
+        for node in component:
+            component_of[node] = c
+    reachable = [0] * len(components)
+    for c, component in enumerate(components):
+        members = 0
+        for node in component:
+            members |= 1 << node
+        bits = 0
+        cyclic = len(component) > 1
+        for node in component:
+            for succ in graph[node]:
+                d = component_of[succ]
+                if d == c:
+                    cyclic = True
+                else:
+                    # 後続の成分は逆トポロジカル順で既に計算済み
+                    bits |= reachable[d] | (1 << succ)
+        if cyclic:
+            bits |= members
+        reachable[c] = bits
+
+    unit_production_pairs: dict[Variable, set[Variable]] = {}
+    for lhs in production_rules.keys():
+        bits = reachable[component_of[node_ids[lhs]]]
+        pairs: set[Variable] = set()
+        while bits:
+            lowest = bits & -bits
+            pairs.add(nodes[lowest.bit_length() - 1])
+            bits ^= lowest
+        unit_production_pairs[lhs] = pairs
     return unit_production_pairs
 
 
+def step3_remove_unit_in_place(builder: GrammarBuilder) -> None:
+    """単位規則を除去する (builder を直接変更する)
+    手順は step3_remove_unit を参照。
+
+    Args:
+        builder: 変換中の文法
+    """
+    production_rules = builder.production_rules
+
+    # 単位規則を見つける
+    unit_production_rules = find_unit_pairs(production_rules)
+
+    # 単位規則を削除する
+    for rhs in production_rules.values():
+        unit_sequences = [seq for seq in rhs if len(seq) == 1 and isinstance(seq[0], Variable)]
+        for seq in unit_sequences:
+            rhs.remove(seq)
+
+    # 単位規則を介した変換規則を追加する
+    # production_rules[mid] に既に他の変数の規則が追加されていても、それらは mid から単位規則で到達できる変数の規則であり、
+    # lhs からも到達できるため結果は変わらない
+    for lhs, mid_set in unit_production_rules.items():
+        for mid in mid_set:
+            if mid != lhs and mid in production_rules.keys():
+                production_rules[lhs].update(production_rules[mid])
+
+
 def step3_remove_unit(production_rules: ProductionRules) -> ProductionRules:
     """単位規則を除去する
     単位規則とは、A -> Bの形を持つ生成規則であり、AとBは非終端記号である。
@@ -53,21 +162,6 @@ def step3_remove_unit(production_rules: ProductionRules) -> ProductionRules:
     Returns:
         dict: 単位規則を除去した生成規則 {非終端: {[右辺の記号...], ...}}
     """
-
-    # 単位規則を見つける
-    unit_production_rules = find_unit_pairs(production_rules)
-
-    # 単位規則を介した変換規則を追加する
-    new_production_rules = production_rules.copy()
-    for lhs, mid_set in unit_production_rules.items():
-        for mid in mid_set:
-            if mid in production_rules.keys():
-                for seq in production_rules[mid]:
-                    new_production_rules[lhs].add(seq)
-
-    # 単位規則を削除する
-    for lhs, rhs in new_production_rules.items():
-        new_production_rules[lhs] = ProductionRuleRHS(
-            {seq for seq in rhs if len(seq) != 1 or not isinstance(seq[0], Variable)}
-        )
-    return new_production_rules
+    builder = GrammarBuilder(set(production_rules.keys()), set(), None, production_rules)
+    step3_remove_unit_in_place(builder)
+    return builder.production_rules
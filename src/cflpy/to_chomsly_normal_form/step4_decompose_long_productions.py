@@ -1,61 +1,103 @@
-from cflpy.core import ProductionRuleRHS, ProductionRules, Sequence, Terminal, Variable
+import dataclasses
 
+from cflpy.core import ProductionRules, Sequence, Symbol, Terminal, Variable
+from cflpy.to_chomsly_normal_form.builder import GrammarBuilder
 
-def step4_decompose_long_productions(
-    production_rules: ProductionRules,
-    variables: set[Variable],
-    terminals: set[Terminal],
-) -> tuple[ProductionRules, set[Variable]]:
-    """長い規則を分解する
-    長い規則とは、右辺が3つ以上の記号からなる規則のことを指す。
+
+@dataclasses.dataclass
+class DecompositionStats:
+    """長い規則の分解の統計
+
+    Attributes:
+        created_variables: 新しく作成した変数の数
+        saved_variables: 接尾辞を共有したことで作成せずに済んだ変数の数
+    """
+
+    created_variables: int = 0
+    saved_variables: int = 0
+
+
+def step4_decompose_long_productions_in_place(builder: GrammarBuilder) -> DecompositionStats:
+    """長い規則を分解する (builder を直接変更する)
+    手順は step4_decompose_long_productions を参照。
 
     Args:
-        productions (dict[str, set[list[str]]]): 生成規則 {非終端: [[右辺の記号...], ...]}
-        variables (set[str]): 非終端記号の集合
-        terminals (set[str]): 終端記号の集合
+        builder: 変換中の文法
 
     Returns:
-        dict[str, list[list[str]]]: 新しい生成規則
-        set[str]: 新しい非終端記号の集合
+        DecompositionStats: 分解の統計
     """
     # 変数の接頭辞: 既存の終端・非終端記号と衝突しないようにする
     # 既存の変数名で new_variable_prefix で始まるものがなくなるまで "X" を追加していく
     new_variable_prefix = "X"
-    while any(var.startswith(new_variable_prefix) for var in variables):
+    while any(var.startswith(new_variable_prefix) for var in builder.variables):
         new_variable_prefix += "X"
-    while any(term.startswith(new_variable_prefix) for term in terminals):
+    while any(term.startswith(new_variable_prefix) for term in builder.terminals):
         new_variable_prefix += "X"
 
-    new_production_rules = ProductionRules()
-    new_variables = variables.copy()
     counter = 1
+    stats = DecompositionStats()
 
-    for lhs, rhs_set in production_rules.items():
-        for rhs in rhs_set:
-            if len(rhs) <= 2:
-                if lhs not in new_production_rules.keys():
-                    new_production_rules[lhs] = ProductionRuleRHS()
-                new_production_rules[lhs].add(rhs)
-                continue
+    # 接尾辞 -> その接尾辞を生成する新しい変数
+    # Symbol の等価性は名前のみで判定されるため、終端記号かどうかもキーに含める
+    suffix_variables: dict[tuple[tuple[bool, Symbol], ...], Variable] = {}
 
-            # 長い規則を分解
-            current_lhs = lhs
-            remaining_rhs = rhs.copy()
+    long_rules = [(lhs, rhs) for lhs, rhs_set in builder.production_rules.items() for rhs in rhs_set if len(rhs) > 2]
+    for lhs, rhs in long_rules:
+        builder.production_rules[lhs].remove(rhs)
 
-            while len(remaining_rhs) > 2:
+        # 長い規則を分解
+        current_lhs = lhs
+        remaining_rhs = rhs
+
+        while len(remaining_rhs) > 2:
+            suffix = Sequence(remaining_rhs[1:])
+            suffix_key = tuple((sym.is_terminal, sym) for sym in suffix)
+            new_var = suffix_variables.get(suffix_key)
+            is_shared = new_var is not None
+            if new_var is None:
                 new_var = Variable(f"{new_variable_prefix}{counter}")
                 counter += 1
-                new_variables.add(new_var)
-                new_rhs_item = Sequence([remaining_rhs[0], new_var])
-                # new_productions.setdefault(current_lhs, []).append(new_rhs)
-                if current_lhs not in new_production_rules.keys():
-                    new_production_rules[current_lhs] = ProductionRuleRHS()
-                new_production_rules[current_lhs].add(new_rhs_item)
-                current_lhs = new_var
-                remaining_rhs = Sequence(remaining_rhs[1:])
-
-            if current_lhs not in new_production_rules.keys():
-                new_production_rules[current_lhs] = ProductionRuleRHS()
-            new_production_rules[current_lhs].add(remaining_rhs)
-
-    return new_production_rules, new_variables
+                builder.variables.add(new_var)
+                suffix_variables[suffix_key] = new_var
+                stats.created_variables += 1
+            builder.add_rule(current_lhs, Sequence([remaining_rhs[0], new_var]))
+            if is_shared:
+                # 接尾辞は分解済みなので、その分解で作られた len(suffix) - 1 個の変数を再利用できる
+                stats.saved_variables += len(suffix) - 1
+                break
+            current_lhs = new_var
+            remaining_rhs = suffix
+        else:
+            builder.add_rule(current_lhs, remaining_rhs)
+
+    return stats
+
+
+def step4_decompose_long_productions(
+    production_rules: ProductionRules,
+    variables: set[Variable],
+    terminals: set[Terminal],
+    return_stats: bool = False,
+) -> tuple[ProductionRules, set[Variable]] | tuple[ProductionRules, set[Variable], DecompositionStats]:
+    """長い規則を分解する
+    長い規則とは、右辺が3つ以上の記号からなる規則のことを指す。
+    同じ接尾辞を持つ規則の間では、接尾辞に対応する新しい変数を共有する。
+    例えば A := a B C, D := b B C は A := a X1, D := b X1, X1 := B C に分解される。
+
+    Args:
+        productions (dict[str, set[list[str]]]): 生成規則 {非終端: [[右辺の記号...], ...]}
+        variables (set[str]): 非終端記号の集合
+        terminals (set[str]): 終端記号の集合
+        return_stats (bool): True の場合、分解の統計 (DecompositionStats) も返す
+
+    Returns:
+        dict[str, list[list[str]]]: 新しい生成規則
+        set[str]: 新しい非終端記号の集合
+        DecompositionStats: 分解の統計 (return_stats が True の場合のみ)
+    """
+    builder = GrammarBuilder(variables, terminals, None, production_rules)
+    stats = step4_decompose_long_productions_in_place(builder)
+    if return_stats:
+        return builder.production_rules, builder.variables, stats
+    return builder.production_rules, builder.variables
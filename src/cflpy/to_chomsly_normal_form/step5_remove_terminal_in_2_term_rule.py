@@ -1,50 +1,83 @@
 from cflpy.core import ProductionRuleRHS, ProductionRules, Sequence, Terminal, Variable
+from cflpy.to_chomsly_normal_form.builder import GrammarBuilder
+
+
+def step5_remove_terminal_in_2_term_rule_in_place(builder: GrammarBuilder) -> None:
+    """終端記号を含む2項規則を除去する (builder を直接変更する)
+    手順は step5_remove_terminal_in_2_term_rule を参照。
+
+    Args:
+        builder: 変換中の文法
+    """
+    # 変数の接頭辞: 既存の終端・非終端記号と衝突しないようにする
+    # 既存の変数名で new_variable_prefix で始まるものがなくなるまで "Y" を追加していく
+    new_variable_prefix = "Y"
+    while any(var.startswith(new_variable_prefix) for var in builder.variables):
+        new_variable_prefix += "Y"
+    while any(term.startswith(new_variable_prefix) for term in builder.terminals):
+        new_variable_prefix += "Y"
+
+    production_rules = builder.production_rules
+    counter = 1
+
+    # 終端記号 -> その終端記号のみを生成する変数
+    # 再利用する変数の選択が実行ごとに変わらないよう、名前順に走査する
+    terminal_proxies: dict[Terminal, Variable] = {}
+    for lhs in sorted(production_rules.keys(), key=lambda var: var.name):
+        rhs = production_rules[lhs]
+        if lhs == builder.start_symbol or len(rhs) != 1:
+            continue
+        (seq,) = rhs
+        if len(seq) == 1 and isinstance(seq[0], Terminal):
+            terminal_proxies.setdefault(seq[0], lhs)
+
+    # 代理の変数を追加しながら走査するため、対象の規則を先に集める
+    targets = [
+        (lhs, seq)
+        for lhs, rhs in production_rules.items()
+        for seq in rhs
+        if len(seq) >= 2 and any(isinstance(sym, Terminal) for sym in seq)
+    ]
+    for lhs, seq in targets:
+        # 終端記号を含む2項規則を除去
+        new_symbols = []
+        for sym in seq:
+            if isinstance(sym, Terminal):
+                proxy = terminal_proxies.get(sym)
+                if proxy is None:
+                    proxy = Variable(f"{new_variable_prefix}{counter}")
+                    counter += 1
+                    builder.variables.add(proxy)
+                    production_rules[proxy] = ProductionRuleRHS({Sequence([sym])})
+                    terminal_proxies[sym] = proxy
+                sym = proxy
+            new_symbols.append(sym)
+        production_rules[lhs].remove(seq)
+        production_rules[lhs].add(Sequence(new_symbols))
 
 
 def step5_remove_terminal_in_2_term_rule(
-    production_rules: ProductionRules, variables: set[Variable], terminals: set[Terminal]
+    production_rules: ProductionRules,
+    variables: set[Variable],
+    terminals: set[Terminal],
+    start_symbol: Variable | None = None,
 ) -> tuple[ProductionRules, set[Variable]]:
     """終端記号を含む2項規則を除去する
     2項規則とは、右辺が2つの記号からなる規則のことを指す。
     A := aBの形を持つ規則を A := Y1B, Y1 := aの形に変換する。
+    代理の変数は終端記号ごとに1つだけ作成し、全ての規則で共有する。
+    また、唯一の規則が V := a である既存の変数 V (開始記号を除く) があれば、新しい変数は作らずに V を再利用する。
 
     Args:
         production_rules(ProductionRules): 変換対象の生成規則
         variables(set[Variable]): 変数の集合
         terminals(set[Terminal]): 終端記号の集合
+        start_symbol(Variable | None): 開始記号。代理の変数として再利用しない
 
     Returns:
         ProductionRules: 新しい生成規則
         set[Variable]: 新しい非終端記号の集合
     """
-    # 変数の接頭辞: 既存の終端・非終端記号と衝突しないようにする
-    # 既存の変数名で new_variable_prefix で始まるものがなくなるまで "Y" を追加していく
-    new_variable_prefix = "Y"
-    while any(var.startswith(new_variable_prefix) for var in variables):
-        new_variable_prefix += "Y"
-    while any(term.startswith(new_variable_prefix) for term in terminals):
-        new_variable_prefix += "Y"
-
-    new_production_rules = ProductionRules()
-    new_variables = variables.copy()
-    counter = 1
-
-    for lhs, rhs in production_rules.items():
-        for seq in rhs:
-            if lhs not in new_production_rules.keys():
-                new_production_rules[lhs] = ProductionRuleRHS()
-            if len(seq) < 2:
-                new_production_rules[lhs].add(seq)
-                continue
-
-            # 終端記号を含む2項規則を除去
-            new_seq = seq.copy()
-            for i, sym in enumerate(seq):
-                if isinstance(sym, Terminal):
-                    new_var = Variable(f"{new_variable_prefix}{counter}")
-                    counter += 1
-                    new_variables.add(new_var)
-                    new_seq[i] = new_var
-                    new_production_rules[new_var] = ProductionRuleRHS({Sequence([sym])})
-            new_production_rules[lhs].add(new_seq)
-    return new_production_rules, new_variables
+    builder = GrammarBuilder(variables, terminals, start_symbol, production_rules)
+    step5_remove_terminal_in_2_term_rule_in_place(builder)
+    return builder.production_rules, builder.variables
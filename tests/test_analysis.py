@@ -0,0 +1,120 @@
+import math
+
+from cflpy.analysis import (
+    find_left_corners,
+    find_max_yield_lengths,
+    find_min_yield_lengths,
+    find_yield_lengths,
+    find_yield_terminals,
+)
+from cflpy.core import ProductionRuleRHS, ProductionRules, Sequence, Terminal, Variable
+
+
+def build_production_rules():
+    # S := A B | S c, A := a A | a, B := b b | C, C := D, D := C (C, D は終端記号列を生成しない)
+    S = Variable("S")
+    A = Variable("A")
+    B = Variable("B")
+    C = Variable("C")
+    D = Variable("D")
+    a = Terminal("a")
+    b = Terminal("b")
+    c = Terminal("c")
+    return ProductionRules(
+        {
+            S: ProductionRuleRHS({Sequence([A, B]), Sequence([S, c])}),
+            A: ProductionRuleRHS({Sequence([a, A]), Sequence([a])}),
+            B: ProductionRuleRHS({Sequence([b, b]), Sequence([C])}),
+            C: ProductionRuleRHS({Sequence([D])}),
+            D: ProductionRuleRHS({Sequence([C])}),
+        }
+    )
+
+
+class TestYieldAnalysis:
+    def test_find_min_yield_lengths(self):
+        # Act
+        min_lengths = find_min_yield_lengths(build_production_rules())
+
+        # Assert
+        assert min_lengths == {
+            Variable("S"): 3,
+            Variable("A"): 1,
+            Variable("B"): 2,
+            Variable("C"): math.inf,
+            Variable("D"): math.inf,
+        }
+
+    def test_find_max_yield_lengths(self):
+        # Arrange
+        E = Variable("E")
+        F = Variable("F")
+        e = Terminal("e")
+        # E := F F, F := E | e | ε: E と F は単位規則で循環するが、F は空列も生成できるため E は長さを増やせる
+        pumpable = ProductionRules(
+            {
+                E: ProductionRuleRHS({Sequence([F, F])}),
+                F: ProductionRuleRHS({Sequence([E]), Sequence([e]), Sequence([])}),
+            }
+        )
+        # E := F, F := E | e e: 単位規則の循環のみなので長さは有限
+        bounded = ProductionRules(
+            {
+                E: ProductionRuleRHS({Sequence([F])}),
+                F: ProductionRuleRHS({Sequence([E]), Sequence([e, e])}),
+            }
+        )
+
+        # Act
+        max_lengths = find_max_yield_lengths(build_production_rules())
+
+        # Assert
+        assert max_lengths == {
+            Variable("S"): math.inf,
+            Variable("A"): math.inf,
+            Variable("B"): 2,
+            Variable("C"): -math.inf,
+            Variable("D"): -math.inf,
+        }
+        assert find_max_yield_lengths(pumpable) == {E: math.inf, F: math.inf}
+        assert find_max_yield_lengths(bounded) == {E: 2, F: 2}
+
+    def test_find_yield_lengths(self):
+        # Arrange
+        E = Variable("E")
+        e = Terminal("e")
+        # E := e | e e E: 奇数長の記号列のみを生成する
+        odd = ProductionRules({E: ProductionRuleRHS({Sequence([e]), Sequence([e, e, E])})})
+
+        # Act
+        lengths = find_yield_lengths(build_production_rules(), 6)
+
+        # Assert
+        assert lengths == {
+            Variable("S"): 0b1111000,
+            Variable("A"): 0b1111110,
+            Variable("B"): 0b100,
+            Variable("C"): 0,
+            Variable("D"): 0,
+        }
+        assert find_yield_lengths(odd, 8) == {E: 0b10101010}
+
+    def test_find_yield_terminals(self):
+        # Act
+        terminals = find_yield_terminals(build_production_rules())
+
+        # Assert
+        assert terminals[Variable("S")] == {Terminal("a"), Terminal("b"), Terminal("c")}
+        assert terminals[Variable("A")] == {Terminal("a")}
+        assert terminals[Variable("B")] == {Terminal("b")}
+        assert terminals[Variable("C")] == frozenset()
+
+    def test_find_left_corners(self):
+        # Act
+        left_corners = find_left_corners(build_production_rules())
+
+        # Assert
+        assert left_corners[Variable("S")] == {Variable("S"), Variable("A")}
+        assert left_corners[Variable("A")] == {Variable("A")}
+        assert left_corners[Variable("B")] == {Variable("B"), Variable("C"), Variable("D")}
+        assert left_corners[Variable("C")] == {Variable("C"), Variable("D")}
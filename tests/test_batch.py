@@ -0,0 +1,40 @@
+import pytest
+
+from cflpy.batch import CheckStats, check_lines
+from cflpy.compiled import CompiledGrammar
+from cflpy.parser import CFGParser
+
+CONTENT = """
+<Expr> := <Term> | <Expr> "+" <Term>
+<Term> := <Factor> | <Term> "*" <Factor>
+<Factor> := "(" <Expr> ")" | "1"
+"""
+
+LINES = ["1 + 1\n", "( 1\n", "\n", "1 + x\r\n", "( 1 ) * 1"]
+
+
+@pytest.fixture
+def compiled():
+    return CompiledGrammar.from_grammar(CFGParser().from_string(CONTENT).to_chomsky_normal_form())
+
+
+class TestCheckLines:
+    @pytest.mark.parametrize("workers, batch_size", [(1, 256), (2, 1), (2, 2)])
+    def test_check_lines(self, compiled, workers, batch_size):
+        # Arrange
+        stats = CheckStats()
+
+        # Act
+        results = list(check_lines(compiled, LINES * 3, workers=workers, batch_size=batch_size, stats=stats))
+
+        # Assert
+        assert [result.input for result in results] == ["1 + 1", "( 1", "", "1 + x", "( 1 ) * 1"] * 3
+        assert [result.member for result in results] == [True, False, False, None, True] * 3
+        assert results[3].error.startswith("Terminal x")
+        assert (stats.inputs, stats.members, stats.errors) == (15, 6, 3)
+        assert stats.seconds > 0
+
+    def test_invalid_batch_size(self, compiled):
+        # Act & Assert
+        with pytest.raises(ValueError, match="batch_size"):
+            list(check_lines(compiled, LINES, batch_size=0))
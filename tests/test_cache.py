@@ -0,0 +1,154 @@
+import pickle
+import struct
+
+import pytest
+
+from cflpy.cache import CACHE_DIR_ENV, CACHE_FORMAT_VERSION, GrammarCache
+from cflpy.compiled import FORMAT_VERSION, CompiledGrammar
+from cflpy.core import ProductionRuleRHS, ProductionRules, Sequence, Terminal, Variable
+from cflpy.grammar import CFGrammar, ChomskyNormalFormGrammar
+from cflpy.parser import CFGParser
+
+CONTENT = """
+<Expr> := <Term> | <Expr> "+" <Term>
+<Term> := <Factor> | <Term> "*" <Factor>
+<Factor> := "(" <Expr> ")" | "1"
+"""
+
+
+class TestFingerprint:
+    def test_fingerprint_is_order_independent(self):
+        # Arrange
+        S = Variable("S")
+        A = Variable("A")
+        a = Terminal("a")
+        rules1 = ProductionRules(
+            {
+                S: ProductionRuleRHS({Sequence([A, a]), Sequence([a])}),
+                A: ProductionRuleRHS({Sequence([a])}),
+            }
+        )
+        rules2 = ProductionRules(
+            {
+                A: ProductionRuleRHS({Sequence([a])}),
+                S: ProductionRuleRHS({Sequence([a]), Sequence([A, a])}),
+            }
+        )
+
+        # Act
+        grammar1 = CFGrammar({S, A}, {a}, S, rules1)
+        grammar2 = CFGrammar({A, S}, {a}, S, rules2)
+
+        # Assert
+        assert hash(rules1) == hash(rules2)
+        assert grammar1.fingerprint() == grammar2.fingerprint()
+        assert CFGrammar({S, A}, {a}, A, rules1).fingerprint() != grammar1.fingerprint()
+
+    def test_fingerprint_distinguishes_terminals_and_variables(self):
+        # Arrange
+        S = Variable("S")
+        rules1 = ProductionRules({S: ProductionRuleRHS({Sequence([Terminal("a")])})})
+        rules2 = ProductionRules({S: ProductionRuleRHS({Sequence([Variable("a")])})})
+
+        # Act & Assert
+        assert rules1.fingerprint() != rules2.fingerprint()
+
+
+class TestGrammarCache:
+    def test_to_chomsky_normal_form_uses_cache(self, tmp_path):
+        # Arrange
+        cache = GrammarCache(tmp_path)
+        grammar = CFGParser().from_string(CONTENT)
+
+        # Act
+        converted = grammar.to_chomsky_normal_form(cache=cache)
+        cached_files = list(tmp_path.glob("*/*.cflc"))
+        loaded = CFGParser().from_string(CONTENT).to_chomsky_normal_form(cache=cache)
+
+        # Assert
+        assert len(cached_files) == 1
+        assert isinstance(loaded, ChomskyNormalFormGrammar)
+        assert loaded.start_symbol == converted.start_symbol
+        assert loaded.variables == converted.variables
+        assert loaded.production_rules == converted.production_rules
+        assert loaded.is_member("( 1 + 1 ) * 1") is True
+
+    def test_cache_from_environment(self, tmp_path, monkeypatch):
+        # Arrange
+        monkeypatch.setenv(CACHE_DIR_ENV, str(tmp_path))
+
+        # Act
+        CFGParser().from_string(CONTENT).to_chomsky_normal_form()
+
+        # Assert
+        assert len(list(tmp_path.glob("*/*.cflc"))) == 1
+
+    def test_cache_is_invalidated_by_version(self, tmp_path):
+        # Arrange
+        cache = GrammarCache(tmp_path)
+        grammar = CFGParser().from_string(CONTENT).to_chomsky_normal_form()
+        key = cache.key(grammar.fingerprint())
+        cache.store(key, grammar.variables, grammar.terminals, grammar.start_symbol, grammar.production_rules)
+        path = cache.path(key)
+        data = bytearray(path.read_bytes())
+        # ヘッダの識別子の直後にあるバイナリ形式のバージョンを書き換える
+        struct.pack_into("<I", data, 4, FORMAT_VERSION + 1)
+        path.write_bytes(bytes(data))
+
+        # Act & Assert
+        assert cache.load(key) is None
+
+    def test_failed_store_removes_temporary_file(self, tmp_path, monkeypatch):
+        # Arrange
+        cache = GrammarCache(tmp_path)
+        grammar = CFGParser().from_string(CONTENT).to_chomsky_normal_form()
+        key = cache.key(grammar.fingerprint())
+
+        def replace(src, dst):
+            raise PermissionError("read-only")
+
+        monkeypatch.setattr("cflpy.cache.os.replace", replace)
+
+        # Act
+        with pytest.warns(UserWarning, match="Failed to write grammar cache"):
+            path = cache.store(
+                key, grammar.variables, grammar.terminals, grammar.start_symbol, grammar.production_rules
+            )
+
+        # Assert
+        assert path is None
+        assert list(tmp_path.rglob("*")) == [cache.path(key).parent]
+
+    def test_cache_stores_rule_indexes(self, tmp_path):
+        # Arrange
+        cache = GrammarCache(tmp_path)
+        grammar = CFGParser().from_string(CONTENT).to_chomsky_normal_form()
+        key = cache.key(grammar.fingerprint())
+        cache.store(key, grammar.variables, grammar.terminals, grammar.start_symbol, grammar.production_rules)
+
+        # Act
+        compiled = cache.load_compiled(key)
+
+        # Assert
+        assert compiled.to_bytes() == CompiledGrammar.from_grammar(grammar).to_bytes()
+        assert compiled.is_member("( 1 + 1 ) * 1") is True
+        compiled.close()
+
+    def test_cache_does_not_unpickle(self, tmp_path):
+        # Arrange
+        cache = GrammarCache(tmp_path)
+        key = cache.key("fingerprint")
+        path = cache.path(key)
+        path.parent.mkdir(parents=True)
+        path.write_bytes(pickle.dumps({"format": CACHE_FORMAT_VERSION}))
+
+        # Act & Assert
+        assert cache.load(key) is None
+
+    def test_cache_options_change_key(self, tmp_path):
+        # Arrange
+        cache = GrammarCache(tmp_path)
+        fingerprint = CFGParser().from_string(CONTENT).fingerprint()
+
+        # Act & Assert
+        assert cache.key(fingerprint, minimize=True) != cache.key(fingerprint, minimize=False)
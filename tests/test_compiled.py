@@ -0,0 +1,186 @@
+import itertools
+import multiprocessing
+import subprocess
+import sys
+
+import pytest
+
+from cflpy.compiled import CompiledGrammar, release_shared_memory
+from cflpy.parser import CFGParser
+
+CONTENT = """
+<Expr> := <Term> | <Expr> "+" <Term>
+<Term> := <Factor> | <Term> "*" <Factor>
+<Factor> := "(" <Expr> ")" | "1"
+"""
+
+
+@pytest.fixture
+def cnf_grammar():
+    return CFGParser().from_string(CONTENT).to_chomsky_normal_form()
+
+
+class TestCompiledGrammar:
+    def test_is_member_matches_cnf_grammar(self, cnf_grammar):
+        # Arrange
+        compiled = CompiledGrammar.from_grammar(cnf_grammar)
+
+        # Act & Assert
+        for length in range(1, 6):
+            for tokens in itertools.product(["1", "+", "*", "(", ")"], repeat=length):
+                string = " ".join(tokens)
+                assert compiled.is_member(string) == cnf_grammar.is_member(string), string
+
+    def test_round_trip(self, cnf_grammar):
+        # Arrange
+        compiled = CompiledGrammar.from_grammar(cnf_grammar)
+
+        # Act
+        restored = compiled.to_grammar()
+
+        # Assert
+        assert restored.start_symbol == cnf_grammar.start_symbol
+        assert restored.production_rules == cnf_grammar.production_rules
+        assert CompiledGrammar.encode(restored) == compiled.to_bytes()
+
+    def test_save_and_load_with_mmap(self, cnf_grammar, tmp_path):
+        # Arrange
+        path = tmp_path / "grammar.cflc"
+        CompiledGrammar.from_grammar(cnf_grammar).save(path)
+
+        # Act
+        loaded = CompiledGrammar.load(path)
+
+        # Assert
+        assert loaded.nbytes == path.stat().st_size
+        assert loaded.is_member("( 1 + 1 ) * 1") is True
+        assert loaded.is_member("( 1 + ) * 1") is False
+        loaded.close()
+
+    def test_invalid_buffer(self):
+        # Act & Assert
+        with pytest.raises(ValueError):
+            CompiledGrammar(b"not a compiled grammar at all....")
+
+
+def tree_leaves(tree):
+    if "children" not in tree:
+        return [tree["symbol"]]
+    return [leaf for child in tree["children"] for leaf in tree_leaves(child)]
+
+
+class TestQueries:
+    def test_parse_tree(self, cnf_grammar):
+        # Arrange
+        compiled = CompiledGrammar.from_grammar(cnf_grammar)
+        string = "( 1 + 1 ) * 1"
+
+        # Act
+        tree = compiled.get_parse_tree(string)
+
+        # Assert
+        assert tree["symbol"] == cnf_grammar.start_symbol.name
+        assert " ".join(tree_leaves(tree)) == string
+        assert compiled.get_parse_tree("( 1 + ) * 1") is None
+
+    def test_next_terminals(self, cnf_grammar):
+        # Arrange
+        compiled = CompiledGrammar.from_grammar(cnf_grammar)
+        alphabet = ["(", ")", "*", "+", "1"]
+        # 長さ7までの言語の要素の接頭辞から、続けられる終端記号を求める
+        expected = {}
+        for length in range(1, 8):
+            for tokens in itertools.product(alphabet, repeat=length):
+                if compiled.is_member(" ".join(tokens)):
+                    for i in range(min(length, 3)):
+                        expected.setdefault(tokens[:i], set()).add(tokens[i])
+
+        # Act & Assert
+        for prefix, tokens in expected.items():
+            assert set(compiled.next_terminals(" ".join(prefix))) == tokens, prefix
+        assert compiled.next_terminals("1 1") == []
+
+
+def check_in_worker(args):
+    name, string = args
+    grammar = CompiledGrammar.attach(name)
+    try:
+        return grammar.is_member(string)
+    finally:
+        grammar.close()
+
+
+class TestSharedMemory:
+    def test_attach_in_same_process(self, cnf_grammar):
+        # Arrange
+        compiled = CompiledGrammar.from_grammar(cnf_grammar)
+        shm = compiled.to_shared_memory()
+
+        try:
+            # Act
+            attached = CompiledGrammar.attach(shm.name)
+
+            # Assert
+            assert attached.to_bytes() == compiled.to_bytes()
+            assert attached.is_member("1 + 1") is True
+            attached.close()
+        finally:
+            release_shared_memory(shm)
+
+    def test_attach_in_worker_processes(self, cnf_grammar):
+        # Arrange
+        compiled = CompiledGrammar.from_grammar(cnf_grammar)
+        shm = compiled.to_shared_memory()
+        strings = ["1 + 1", "( 1 * 1", "( 1 ) * 1", "+"]
+
+        try:
+            # Act
+            with multiprocessing.get_context("spawn").Pool(2) as pool:
+                results = pool.map(check_in_worker, [(shm.name, string) for string in strings])
+
+            # Assert
+            assert results == [True, False, True, False]
+        finally:
+            release_shared_memory(shm)
+
+    def test_attach_in_standalone_process_keeps_segment(self, cnf_grammar):
+        # Arrange
+        compiled = CompiledGrammar.from_grammar(cnf_grammar)
+        shm = compiled.to_shared_memory()
+        code = (
+            "from cflpy.compiled import CompiledGrammar, release_shared_memory\n"
+            f"grammar = CompiledGrammar.attach({shm.name!r})\n"
+            "print(grammar.is_member('1 + 1'))\n"
+            "grammar.close()\n"
+        )
+
+        try:
+            # Act
+            result = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, check=True)
+
+            # Assert
+            assert result.stdout == "True\n"
+            assert "leaked" not in result.stderr
+            attached = CompiledGrammar.attach(shm.name)
+            assert attached.is_member("1 + 1") is True
+            attached.close()
+        finally:
+            release_shared_memory(shm)
+
+    def test_release_after_attach_reports_no_tracker_errors(self):
+        # Arrange
+        code = (
+            "from cflpy.compiled import CompiledGrammar, release_shared_memory\n"
+            "from cflpy.parser import CFGParser\n"
+            'grammar = CFGParser().from_string(\'<S> := "a" <S> | "a"\').to_chomsky_normal_form()\n'
+            "shm = CompiledGrammar.from_grammar(grammar).to_shared_memory()\n"
+            "CompiledGrammar.attach(shm.name).close()\n"
+            "release_shared_memory(shm)\n"
+        )
+
+        # Act
+        result = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, check=True)
+
+        # Assert
+        assert "Traceback" not in result.stderr
+        assert "leaked" not in result.stderr
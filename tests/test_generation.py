@@ -0,0 +1,92 @@
+import pytest
+
+from cflpy.generation import StringGenerator, find_derivation_heights, generate_strings
+from cflpy.parser import CFGParser
+
+CONTENT = """
+<Expr> := <Term> | <Expr> "+" <Term>
+<Term> := <Factor> | <Term> "*" <Factor>
+<Factor> := "(" <Expr> ")" | "1"
+"""
+
+
+@pytest.fixture
+def grammar():
+    return CFGParser().from_string(CONTENT)
+
+
+class TestGenerateStrings:
+    def test_generated_strings_are_members(self, grammar):
+        # Arrange
+        cnf_grammar = grammar.to_chomsky_normal_form()
+
+        # Act
+        strings = list(generate_strings(grammar, 200, seed=0, min_len=3, max_len=11))
+
+        # Assert
+        assert len(strings) == 200
+        assert all(3 <= len(string.split()) <= 11 for string in strings)
+        assert all(cnf_grammar.is_member(string) for string in strings)
+
+    def test_seed_is_reproducible_across_workers(self, grammar):
+        # Act
+        serial = list(generate_strings(grammar, 50, seed=7, batch_size=8, max_len=15))
+        parallel = list(generate_strings(grammar, 50, seed=7, batch_size=8, max_len=15, workers=2))
+
+        # Assert
+        assert serial == parallel
+        assert serial != list(generate_strings(grammar, 50, seed=8, batch_size=8, max_len=15))
+
+    def test_unique_stops_when_language_is_exhausted(self, grammar):
+        # Act
+        strings = list(generate_strings(grammar, 100, seed=0, unique=True, max_len=3, batch_size=16))
+
+        # Assert
+        assert sorted(strings) == sorted(["1", "1 + 1", "1 * 1", "( 1 )"])
+
+    def test_generation_terminates_on_explosive_grammar(self):
+        # Arrange: 自由に規則を選ぶと導出が終わらない可能性が高い文法
+        grammar = CFGParser().from_string('<S> := <S> <S> <S> | <S> | "a" | eps')
+
+        # Act
+        strings = list(generate_strings(grammar, 20, seed=0, max_depth=30))
+
+        # Assert
+        assert len(strings) == 20
+        assert all(set(string.split()) <= {"a"} for string in strings)
+
+    def test_stops_when_a_batch_has_no_string_in_range(self):
+        # Arrange: 長さ3の記号列は生成できるが、max_depth=0 では最短の導出しか選ばれない
+        grammar = CFGParser().from_string('<S> := "a" | "a" <S>')
+
+        # Act
+        strings = generate_strings(
+            grammar, 10, seed=0, batch_size=64, max_stalled_batches=10**6, min_len=3, max_len=3, max_depth=0
+        )
+
+        # Assert
+        assert list(strings) == []
+
+    def test_find_derivation_heights(self, grammar):
+        # Arrange
+        generator = StringGenerator(grammar)
+
+        # Act
+        heights = find_derivation_heights(generator._alternatives)
+
+        # Assert
+        assert {var.name: height for var, height in heights.items()} == {"Factor": 1, "Term": 2, "Expr": 3}
+
+    @pytest.mark.parametrize(
+        "content, options, message",
+        [
+            ('<S> := <S> "a"', {}, "generates no strings"),
+            ('<S> := "a"', {"min_len": 3, "max_len": 2}, "Invalid length range"),
+            (CONTENT, {"min_len": 50, "max_len": 50}, r"no strings of length in \[50, 50\]"),
+            ('<S> := "a" | "a" "a"', {"min_len": 3}, r"no strings of length in \[3, None\]"),
+        ],
+    )
+    def test_invalid(self, content, options, message):
+        # Act & Assert
+        with pytest.raises(ValueError, match=message):
+            StringGenerator(CFGParser().from_string(content), **options)
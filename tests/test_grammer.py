@@ -1,7 +1,10 @@
+import itertools
+import logging
+
 import pytest
 
 from cflpy.core import ProductionRuleRHS, ProductionRules, Sequence, Terminal, Variable
-from cflpy.grammar import CFGrammar, ChomskyNormalFormGrammar
+from cflpy.grammar import BinaryNormalFormGrammar, CFGrammar, ChomskyNormalFormGrammar
 
 
 class TestCFGrammar:
@@ -78,6 +81,143 @@ class TestCFGrammar:
         assert cnf_grammar.start_symbol == S
         assert all(len(rhs) <= 2 for rhs_set in cnf_grammar.production_rules.values() for rhs in rhs_set)
 
+    def test_to_chomsky_normal_form_report(self, capsys):
+        """変換の計測結果のテスト"""
+        # Arrange
+        S = Variable("S")
+        A = Variable("A")
+        a = Terminal("a")
+        b = Terminal("b")
+        production_rules = ProductionRules(
+            {
+                S: ProductionRuleRHS({Sequence([A, b, A]), Sequence([S, S])}),
+                A: ProductionRuleRHS({Sequence([a]), Sequence([])}),
+            }
+        )
+        grammar = CFGrammar({S, A}, {a, b}, S, production_rules)
+        received = []
+
+        # Act
+        cnf_grammar, report = grammar.to_chomsky_normal_form(
+            minimize=True, return_report=True, on_step=received.append, trace_memory=True
+        )
+
+        # Assert
+        assert isinstance(cnf_grammar, ChomskyNormalFormGrammar)
+        assert [step.name for step in report.steps] == [
+            "simplify",
+            "start",
+            "bin",
+            "del",
+            "unit",
+            "term",
+            "simplify",
+            "minimize",
+        ]
+        assert received == report.steps
+        assert report.cache_hit is False
+        assert all(step.seconds >= 0 and step.peak_memory is not None for step in report.steps)
+        assert report.steps[0].rules_before == 4
+        assert report.steps[-1].rules_after == sum(len(rhs) for rhs in cnf_grammar.production_rules.values())
+        assert report.steps[-1].variables_after == len(cnf_grammar.variables)
+        assert capsys.readouterr().out == ""
+
+    def test_to_chomsky_normal_form_report_stats(self):
+        """変換の計測結果に不要な記号の除去と長い規則の分解の統計が含まれることのテスト"""
+        # Arrange
+        S, A, B, C, U, N = (Variable(name) for name in "SABCUN")
+        a, b, c = Terminal("a"), Terminal("b"), Terminal("c")
+        production_rules = ProductionRules(
+            {
+                # A B C と a B C は接尾辞 B C を共有する
+                S: ProductionRuleRHS({Sequence([A, B, C]), Sequence([a, B, C]), Sequence([N])}),
+                A: ProductionRuleRHS({Sequence([a])}),
+                B: ProductionRuleRHS({Sequence([b])}),
+                C: ProductionRuleRHS({Sequence([c])}),
+                U: ProductionRuleRHS({Sequence([a])}),
+                N: ProductionRuleRHS({Sequence([a, N])}),
+            }
+        )
+        grammar = CFGrammar({S, A, B, C, U, N}, {a, b, c}, S, production_rules)
+
+        # Act
+        _, report = grammar.to_chomsky_normal_form(return_report=True)
+
+        # Assert
+        steps = {step.name: step for step in report.steps[:-1]}
+        assert steps["simplify"].stats.non_generating == {N}
+        assert steps["simplify"].stats.unreachable == {U}
+        assert steps["simplify"].stats.removed_rules == 3
+        assert steps["bin"].stats.created_variables == 1
+        assert steps["bin"].stats.saved_variables == 1
+        assert steps["start"].stats is None
+
+    def test_to_chomsky_normal_form_report_logger(self, caplog):
+        """計測結果のロガーだけを DEBUG にした場合も各ステップが出力されることのテスト"""
+        # Arrange
+        caplog.set_level(logging.DEBUG, logger="cflpy.to_chomsly_normal_form.report")
+        grammar = CFGrammar(
+            {Variable("S")},
+            {Terminal("a")},
+            Variable("S"),
+            ProductionRules({Variable("S"): ProductionRuleRHS({Sequence([Terminal("a")])})}),
+        )
+
+        # Act
+        grammar.to_chomsky_normal_form()
+
+        # Assert
+        assert logging.getLogger("cflpy.grammar").getEffectiveLevel() > logging.DEBUG
+        assert [record.message.split(":")[0] for record in caplog.records] == [
+            "simplify",
+            "start",
+            "bin",
+            "del",
+            "unit",
+            "term",
+            "simplify",
+        ]
+
+    def test_simplify(self):
+        """不要な記号の除去テスト"""
+        # Arrange
+        S = Variable("S")
+        A = Variable("A")
+        B = Variable("B")
+        C = Variable("C")
+        D = Variable("D")
+        variables = {S, A, B, C, D}
+        a = Terminal("a")
+        b = Terminal("b")
+        c = Terminal("c")
+        terminals = {a, b, c}
+        production_rules = ProductionRules(
+            {
+                S: ProductionRuleRHS({Sequence([A]), Sequence([B, a])}),
+                A: ProductionRuleRHS({Sequence([a])}),
+                B: ProductionRuleRHS({Sequence([B, b])}),  # 終端記号列を生成できない
+                C: ProductionRuleRHS({Sequence([c])}),  # 到達できない
+            }
+        )
+        grammar = CFGrammar(variables, terminals, S, production_rules)
+
+        # Act
+        simplified, stats = grammar.simplify(return_stats=True)
+
+        # Assert
+        assert simplified.variables == {S, A}
+        assert simplified.terminals == {a}
+        assert simplified.production_rules == ProductionRules(
+            {
+                S: ProductionRuleRHS({Sequence([A])}),
+                A: ProductionRuleRHS({Sequence([a])}),
+            }
+        )
+        assert stats.non_generating == {B, D}
+        assert stats.unreachable == {C}
+        assert stats.unused_terminals == {b, c}
+        assert stats.removed_rules == 3
+
     def test_repr(self):
         """文字列表現のテスト"""
         # Arrange
@@ -177,6 +317,109 @@ class TestChomskyNormalFormGrammar:
         assert grammar.is_member("a") is False
         assert grammar.is_member("b a") is False
 
+    def test_get_cyk_table_prune(self):
+        """CYK の枝刈りのテスト"""
+        # Arrange
+        # S := A B, A := A A | a, B := b
+        S = Variable("S")
+        A = Variable("A")
+        B = Variable("B")
+        a = Terminal("a")
+        b = Terminal("b")
+        production_rules = ProductionRules(
+            {
+                S: ProductionRuleRHS({Sequence([A, B])}),
+                A: ProductionRuleRHS({Sequence([A, A]), Sequence([a])}),
+                B: ProductionRuleRHS({Sequence([b])}),
+            }
+        )
+        grammar = ChomskyNormalFormGrammar({S, A, B}, {a, b}, S, production_rules)
+        sequence = Sequence([a, a, a, b])
+
+        # Act
+        table, stats = grammar.get_cyk_table(sequence, return_stats=True)
+        pruned_table, pruned_stats = grammar.get_cyk_table(sequence, prune=True, return_stats=True)
+
+        # Assert
+        assert pruned_table == table
+        assert stats.pruned_by_length == stats.pruned_by_terminals == 0
+        assert pruned_stats.pruned_by_length > 0
+        assert pruned_stats.pruned_by_terminals > 0
+        assert pruned_stats.checked + pruned_stats.pruned_by_length + pruned_stats.pruned_by_terminals == stats.checked
+        assert grammar.is_member("a a b", prune=True) is True
+        assert grammar.is_member("a b b", prune=True) is False
+
+    def test_get_cyk_table_predict(self):
+        """CYK の予測フィルタのテスト"""
+        # Arrange
+        # S := A B, A := a, B := b | A B
+        S = Variable("S")
+        A = Variable("A")
+        B = Variable("B")
+        a = Terminal("a")
+        b = Terminal("b")
+        production_rules = ProductionRules(
+            {
+                S: ProductionRuleRHS({Sequence([A, B])}),
+                A: ProductionRuleRHS({Sequence([a])}),
+                B: ProductionRuleRHS({Sequence([b]), Sequence([A, B])}),
+            }
+        )
+        grammar = ChomskyNormalFormGrammar({S, A, B}, {a, b}, S, production_rules)
+        sequence = Sequence([a, a, b])
+
+        # Act
+        table, stats = grammar.get_cyk_table(sequence, return_stats=True)
+        predicted_table, predicted_stats = grammar.get_cyk_table(sequence, predict=True, return_stats=True)
+
+        # Assert
+        # 位置 0 では S と A のみが予測されるため、(0, 1) の B は調べない
+        assert predicted_stats.pruned_by_prediction > 0
+        assert predicted_stats.checked < stats.checked
+        assert predicted_table[0][2][S] is table[0][2][S] is True
+        assert predicted_table[1][2][B] is True
+        assert grammar.is_member("a a a b", predict=True) is True
+        assert grammar.is_member("a b b", prune=True, predict=True) is False
+
+    def test_minimize(self):
+        """等価な変数の併合テスト"""
+        # Arrange
+        S = Variable("S")
+        A = Variable("A")
+        B = Variable("B")
+        C = Variable("C")
+        D = Variable("D")
+        variables = {S, A, B, C, D}
+        a = Terminal("a")
+        b = Terminal("b")
+        terminals = {a, b}
+        production_rules = ProductionRules(
+            {
+                S: ProductionRuleRHS({Sequence([A, C]), Sequence([B, D])}),
+                A: ProductionRuleRHS({Sequence([a])}),
+                B: ProductionRuleRHS({Sequence([a])}),
+                C: ProductionRuleRHS({Sequence([A, C]), Sequence([b])}),
+                D: ProductionRuleRHS({Sequence([B, D]), Sequence([b])}),
+            }
+        )
+        grammar = ChomskyNormalFormGrammar(variables, terminals, S, production_rules)
+
+        # Act
+        minimized = grammar.minimize()
+
+        # Assert
+        # A と B、C と D はそれぞれ名前の付け替えを除いて同じ規則を持つ
+        assert minimized.variables == {S, A, C}
+        assert minimized.production_rules == ProductionRules(
+            {
+                S: ProductionRuleRHS({Sequence([A, C])}),
+                A: ProductionRuleRHS({Sequence([a])}),
+                C: ProductionRuleRHS({Sequence([A, C]), Sequence([b])}),
+            }
+        )
+        for string in ["a b", "a a b", "a a a b", "a", "b", "b a"]:
+            assert minimized.is_member(string) == grammar.is_member(string)
+
     def test_get_cyk_table(self):
         """CYKテーブル生成テスト"""
         # Arrange
@@ -246,3 +489,80 @@ class TestChomskyNormalFormGrammar:
         # Assert
         assert history1 == expected_history1
         assert history2 == expected_history2
+
+
+class TestBinaryNormalFormGrammar:
+    def test_validation(self):
+        """2項標準形の検証テスト"""
+        # Arrange
+        S = Variable("S")
+        A = Variable("A")
+        a = Terminal("a")
+
+        # Act & Assert
+        BinaryNormalFormGrammar(
+            {S, A},
+            {a},
+            S,
+            ProductionRules(
+                {S: ProductionRuleRHS({Sequence([A]), Sequence([])}), A: ProductionRuleRHS({Sequence([a])})}
+            ),
+        )
+        with pytest.raises(ValueError):
+            BinaryNormalFormGrammar({S}, {a}, S, ProductionRules({S: ProductionRuleRHS({Sequence([a, S])})}))
+        with pytest.raises(ValueError):
+            BinaryNormalFormGrammar(
+                {S, A},
+                {a},
+                S,
+                ProductionRules({S: ProductionRuleRHS({Sequence([A])}), A: ProductionRuleRHS({Sequence([])})}),
+            )
+
+    def test_is_member_matches_chomsky_normal_form(self):
+        """単位規則を残した変換と CYK の結果がチョムスキー標準形と一致するかのテスト"""
+        # Arrange
+        E = Variable("E")
+        T = Variable("T")
+        F = Variable("F")
+        plus = Terminal("+")
+        times = Terminal("*")
+        lparen = Terminal("(")
+        rparen = Terminal(")")
+        one = Terminal("1")
+        production_rules = ProductionRules(
+            {
+                E: ProductionRuleRHS({Sequence([T]), Sequence([E, plus, T])}),
+                T: ProductionRuleRHS({Sequence([F]), Sequence([T, times, F])}),
+                F: ProductionRuleRHS({Sequence([lparen, E, rparen]), Sequence([one])}),
+            }
+        )
+        grammar = CFGrammar({E, T, F}, {plus, times, lparen, rparen, one}, E, production_rules)
+
+        # Act
+        cnf_grammar = grammar.to_chomsky_normal_form()
+        bnf_grammar = grammar.to_binary_normal_form()
+
+        # Assert
+        assert isinstance(bnf_grammar, BinaryNormalFormGrammar)
+        assert sum(len(rhs) for rhs in bnf_grammar.production_rules.values()) < sum(
+            len(rhs) for rhs in cnf_grammar.production_rules.values()
+        )
+        for length in range(1, 6):
+            for tokens in itertools.product(["1", "+", "*", "(", ")"], repeat=length):
+                string = " ".join(tokens)
+                assert bnf_grammar.is_member(string) == cnf_grammar.is_member(string), string
+
+    def test_is_member_empty(self):
+        """空文字列のメンバーシップ判定テスト"""
+        # Arrange
+        S = Variable("S")
+        a = Terminal("a")
+        production_rules = ProductionRules({S: ProductionRuleRHS({Sequence([a, S]), Sequence([])})})
+        grammar = CFGrammar({S}, {a}, S, production_rules)
+
+        # Act
+        bnf_grammar = grammar.to_binary_normal_form()
+
+        # Assert
+        assert bnf_grammar.is_member("") is True
+        assert bnf_grammar.is_member("a a a") is True
@@ -0,0 +1,57 @@
+import subprocess
+import sys
+
+import pytest
+
+import cflpy
+
+# import にかかる時間 (-X importtime の累積時間) の上限 (マイクロ秒)。依存の遅いモジュールを読み込むと超える程度に設定する
+IMPORT_BUDGET_US = {"cflpy": 100_000, "cflpy.__main__": 250_000}
+
+
+def run_python(code: str, *options: str) -> subprocess.CompletedProcess:
+    return subprocess.run([sys.executable, *options, "-c", code], capture_output=True, text=True, check=True)
+
+
+def cumulative_import_time(module: str) -> int:
+    stderr = run_python(f"import {module}", "-X", "importtime").stderr
+    for line in stderr.splitlines():
+        _, _, cumulative, name = (part.strip() for part in line.replace(":", "|", 1).split("|"))
+        if name == module:
+            return int(cumulative)
+    raise AssertionError(f"{module} not found in -X importtime output")
+
+
+class TestLazyImport:
+    def test_import_does_not_load_submodules(self):
+        # Act
+        loaded = run_python("import sys, cflpy; print(' '.join(sorted(sys.modules)))").stdout.split()
+
+        # Assert
+        assert not {"cflpy.grammar", "cflpy.parser", "cflpy.serialize", "pydantic", "tqdm"} & set(loaded)
+
+    def test_cli_does_not_load_server_dependencies(self):
+        # Act
+        loaded = run_python("import sys, cflpy.__main__; print(' '.join(sorted(sys.modules)))").stdout.split()
+
+        # Assert
+        assert not {"asyncio", "cflpy.server", "cflpy.generation", "pydantic"} & set(loaded)
+
+    def test_lazy_attributes(self):
+        # Arrange
+        from cflpy.parser import CFGParser
+
+        # Act & Assert
+        assert cflpy.CFGParser is CFGParser
+        assert {"CFGrammar", "CFGParser", "CFGParserConfig", "CFGWriter"} <= set(dir(cflpy))
+        with pytest.raises(AttributeError, match="no attribute 'Missing'"):
+            cflpy.Missing
+
+    @pytest.mark.parametrize("module", IMPORT_BUDGET_US)
+    def test_import_time_budget(self, module):
+        # Act
+        # 実行環境による揺れを抑えるため、3回の最小値を使う
+        elapsed = min(cumulative_import_time(module) for _ in range(3))
+
+        # Assert
+        assert elapsed < IMPORT_BUDGET_US[module], f"import {module} took {elapsed} us"
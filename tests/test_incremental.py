@@ -0,0 +1,98 @@
+import itertools
+
+import pytest
+
+from cflpy.core import Sequence, Terminal, Variable
+from cflpy.incremental import IncrementalChomskyNormalForm
+from cflpy.parser import CFGParser
+
+CONTENT = """
+<Expr> := <Term> | <Expr> "+" <Term>
+<Term> := <Factor> | <Term> "*" <Factor>
+<Factor> := "(" <Expr> ")" | "1"
+"""
+
+
+def all_strings(tokens: list[str], max_length: int):
+    for length in range(1, max_length + 1):
+        for string in itertools.product(tokens, repeat=length):
+            yield " ".join(string)
+
+
+class TestIncrementalChomskyNormalForm:
+    def test_matches_full_conversion(self):
+        # Arrange
+        grammar = CFGParser().from_string(CONTENT)
+
+        # Act
+        incremental = IncrementalChomskyNormalForm(grammar)
+        converted = grammar.to_chomsky_normal_form()
+
+        # Assert
+        for string in all_strings(["1", "+", "*", "(", ")"], 5):
+            assert incremental.is_member(string) == converted.is_member(string), string
+
+    def test_add_and_remove_rule(self):
+        # Arrange
+        grammar = CFGParser().from_string(CONTENT)
+        incremental = IncrementalChomskyNormalForm(grammar)
+        expr = Variable("Expr")
+        factor = Variable("Factor")
+        rule = Sequence([Terminal("-"), factor])
+
+        # Act
+        added = incremental.add_rule(factor, rule)
+        is_member_after_add = incremental.is_member("- 1 + 1")
+        removed = incremental.remove_rule(factor, rule)
+
+        # Assert
+        assert is_member_after_add is True
+        assert factor in added and expr in added
+        assert added == removed
+        assert incremental.is_member("1 + 1") is True
+        assert incremental.is_member("- 1") is False
+        with pytest.raises(ValueError):
+            incremental.remove_rule(factor, rule)
+
+    def test_changes_are_local(self):
+        # Arrange
+        grammar = CFGParser().from_string(CONTENT)
+        incremental = IncrementalChomskyNormalForm(grammar)
+        before = {var: set(rhs) for var, rhs in incremental.production_rules.items()}
+
+        # Act
+        changed = incremental.add_rule(Variable("Factor"), Sequence([Terminal("2")]))
+
+        # Assert
+        after = {var: set(rhs) for var, rhs in incremental.production_rules.items()}
+        assert changed == {var for var in after if before.get(var) != after[var]}
+        assert changed < set(after)
+        assert incremental.is_member("2 * 1") is True
+
+    def test_nullable_is_updated(self):
+        # Arrange
+        S = Variable("S")
+        A = Variable("A")
+        grammar = CFGParser().from_string('<S> := <A> "b"\n<A> := "a"')
+        incremental = IncrementalChomskyNormalForm(grammar)
+
+        # Act & Assert
+        assert incremental.is_member("b") is False
+        incremental.add_rule(A, Sequence([]))
+        assert incremental.is_member("b") is True
+        incremental.add_rule(S, Sequence([A, A]))
+        assert incremental.is_member("") is True
+        incremental.remove_rule(A, Sequence([]))
+        assert incremental.is_member("") is False
+        assert incremental.is_member("b") is False
+        assert incremental.is_member("a a") is True
+        assert incremental.to_grammar().is_member("a b") is True
+
+    def test_reserved_names(self):
+        # Arrange
+        grammar = CFGParser().from_string(CONTENT)
+        incremental = IncrementalChomskyNormalForm(grammar)
+
+        # Act & Assert
+        with pytest.raises(ValueError):
+            incremental.add_rule(Variable("Factor"), Sequence([Variable("X1")]))
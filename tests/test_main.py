@@ -0,0 +1,211 @@
+import io
+import json
+
+import pytest
+
+from cflpy.__main__ import main, parse_args, run_check, run_compile, run_generate
+
+CONTENT = """
+<Expr> := <Term> | <Expr> "+" <Term>
+<Term> := <Factor> | <Term> "*" <Factor>
+<Factor> := "(" <Expr> ")" | "1"
+"""
+
+
+@pytest.fixture
+def grammar_file(tmp_path):
+    filepath = tmp_path / "expr.cfl"
+    filepath.write_text(CONTENT)
+    return filepath
+
+
+class TestCompile:
+    def test_compiled_artifact_is_accepted_by_other_commands(self, grammar_file, tmp_path):
+        # Arrange
+        output = tmp_path / "expr.cflc"
+        stderr = io.StringIO()
+
+        # Act
+        run_compile(parse_args(["compile", str(grammar_file), "-o", str(output)]), stderr)
+
+        # Assert
+        assert output.read_bytes().startswith(b"CFLC")
+        assert stderr.getvalue().startswith(f"compiled {grammar_file} to {output}")
+        stdout = io.StringIO()
+        run_check(parse_args(["check", str(output), "-q"]), io.StringIO("( 1 ) * 1\n1 +\n"), stdout, io.StringIO())
+        assert stdout.getvalue() == "true\t( 1 ) * 1\nfalse\t1 +\n"
+
+    def test_compiled_artifact_is_rejected_by_generate(self, grammar_file, tmp_path):
+        # Arrange
+        output = tmp_path / "expr.cflc"
+        run_compile(parse_args(["compile", str(grammar_file), "-o", str(output), "-q"]), io.StringIO())
+        stdout, stderr = io.StringIO(), io.StringIO()
+
+        # Act
+        code = run_generate(parse_args(["generate", str(output), "-n", "5", "-q"]), stdout, stderr)
+
+        # Assert
+        assert code == 1
+        assert stdout.getvalue() == ""
+        assert stderr.getvalue().startswith(f"error: {output} is a compiled grammar in Chomsky normal form")
+
+    def test_default_output_path(self, grammar_file):
+        # Act
+        main(["compile", str(grammar_file), "-q", "--minimize"])
+
+        # Assert
+        assert grammar_file.with_suffix(".cflc").exists()
+        with pytest.raises(ValueError, match="must differ"):
+            main(["compile", str(grammar_file.with_suffix(".cflc")), "-q"])
+
+
+class TestCheck:
+    def test_check_single_string(self, grammar_file, capsys):
+        # Act
+        main(["check", str(grammar_file), "1 + 1"])
+
+        # Assert
+        assert capsys.readouterr().out == "String '1 + 1' is in the language\n"
+
+    def test_check_single_string_unknown_terminal(self, grammar_file, capsys):
+        # Act
+        code = main(["check", str(grammar_file), "1 + x"])
+
+        # Assert
+        captured = capsys.readouterr()
+        assert code == 1
+        assert captured.out == ""
+        assert captured.err.startswith("error: ")
+        assert "x" in captured.err
+
+    def test_check_with_config(self, tmp_path, capsys):
+        # Arrange
+        filepath = tmp_path / "arrow.cfl"
+        filepath.write_text("[S] -> 'a' [S] 'b' / 'a' 'b'\n")
+        config = tmp_path / "config.json"
+        config.write_text(
+            json.dumps(
+                {
+                    "transition_symbol": "->",
+                    "variable_enclosure": ["[", "]"],
+                    "terminal_enclosure": ["'", "'"],
+                    "rhs_separator": "/",
+                }
+            )
+        )
+
+        # Act
+        code = main(["check", str(filepath), "a a b b", "--config", str(config)])
+
+        # Assert
+        assert code == 0
+        assert capsys.readouterr().out == "String 'a a b b' is in the language\n"
+
+    def test_check_with_unknown_config_field(self, grammar_file, tmp_path):
+        # Arrange
+        config = tmp_path / "config.json"
+        config.write_text('{"arrow": "->"}')
+
+        # Act & Assert
+        with pytest.raises(ValueError, match="Unknown config fields"):
+            main(["check", str(grammar_file), "1", "--config", str(config)])
+
+    @pytest.mark.parametrize("workers", ["1", "2"])
+    def test_check_stdin_tsv(self, grammar_file, workers):
+        # Arrange
+        args = parse_args(["check", str(grammar_file), "--workers", workers, "--batch-size", "1"])
+        stdout, stderr = io.StringIO(), io.StringIO()
+
+        # Act
+        run_check(args, io.StringIO("1 + 1\n( 1\n1 + x\n"), stdout, stderr)
+
+        # Assert
+        assert stdout.getvalue() == "true\t1 + 1\nfalse\t( 1\nerror\t1 + x\n"
+        assert stderr.getvalue().startswith("checked 3 inputs (1 in language, 1 errors)")
+
+    @pytest.mark.parametrize("use_mmap", [[], ["--mmap"]])
+    def test_check_input_file_jsonl(self, grammar_file, tmp_path, use_mmap):
+        # Arrange
+        inputs = tmp_path / "inputs.txt"
+        inputs.write_text("( 1 ) * 1\n1 +\n")
+        args = parse_args(["check", str(grammar_file), "--input", str(inputs), "--format", "jsonl", "-q", *use_mmap])
+        stdout, stderr = io.StringIO(), io.StringIO()
+
+        # Act
+        run_check(args, io.StringIO(), stdout, stderr)
+
+        # Assert
+        records = [json.loads(line) for line in stdout.getvalue().splitlines()]
+        assert records == [{"input": "( 1 ) * 1", "member": True}, {"input": "1 +", "member": False}]
+        assert stderr.getvalue() == ""
+
+
+class TestGenerate:
+    def test_generate_stdout(self, grammar_file):
+        # Arrange
+        args = parse_args(["generate", str(grammar_file), "--count", "30", "--seed", "1", "--max-len", "9"])
+        stdout, stderr = io.StringIO(), io.StringIO()
+
+        # Act
+        run_generate(args, stdout, stderr)
+
+        # Assert
+        lines = stdout.getvalue().splitlines()
+        assert len(lines) == 30
+        assert all(len(line.split()) <= 9 for line in lines)
+        assert stderr.getvalue().startswith("generated 30 strings")
+
+    def test_generate_sharded_output(self, grammar_file, tmp_path):
+        # Arrange
+        argv = ["generate", str(grammar_file), "-n", "25", "--seed", "2", "--batch-size", "4", "-q"]
+        stdout = io.StringIO()
+        run_generate(parse_args(argv), stdout, io.StringIO())
+        output = tmp_path / "out.txt"
+
+        # Act
+        run_generate(parse_args([*argv, "-o", str(output), "--shards", "3", "-j", "2"]), io.StringIO(), io.StringIO())
+
+        # Assert
+        shards = [tmp_path / f"out-{i:05d}-of-00003.txt" for i in range(3)]
+        assert [len(shard.read_text().splitlines()) for shard in shards] == [8, 8, 9]
+        assert "".join(shard.read_text() for shard in shards) == stdout.getvalue()
+
+    @pytest.mark.parametrize(
+        "options, message",
+        [
+            (["--shards", "0", "-o", "out.txt"], "error: --shards must be positive, got 0\n"),
+            (["--min-len", "50", "--max-len", "50"], "error: "),
+        ],
+        ids=["no-shards", "unproducible-length"],
+    )
+    def test_generate_invalid_options(self, grammar_file, options, message):
+        # Arrange
+        args = parse_args(["generate", str(grammar_file), "-n", "5", "--seed", "1", *options])
+        stdout, stderr = io.StringIO(), io.StringIO()
+
+        # Act
+        code = run_generate(args, stdout, stderr)
+
+        # Assert
+        assert code == 1
+        assert stdout.getvalue() == ""
+        assert stderr.getvalue().startswith(message)
+        assert "Traceback" not in stderr.getvalue()
+
+    def test_generate_with_config(self, tmp_path):
+        # Arrange
+        filepath = tmp_path / "arrow.cfl"
+        filepath.write_text('<S> -> "a" <S> "b" | "a" "b"\n')
+        config = tmp_path / "config.json"
+        config.write_text('{"transition_symbol": "->"}')
+        args = parse_args(["generate", str(filepath), "-n", "5", "--seed", "1", "--config", str(config), "-q"])
+        stdout = io.StringIO()
+
+        # Act
+        run_generate(args, stdout, io.StringIO())
+
+        # Assert
+        for line in stdout.getvalue().splitlines():
+            tokens = line.split()
+            half = len(tokens) // 2
+            assert tokens == ["a"] * half + ["b"] * half
@@ -1,8 +1,13 @@
+import gzip
+import io
+import os
+
 import pytest
 
+from cflpy.compiled import CompiledGrammar
 from cflpy.core import ProductionRuleRHS, ProductionRules, Sequence, Terminal, Variable
-from cflpy.grammar import CFGrammar
-from cflpy.parser import CFGParser, CFGParserConfig
+from cflpy.grammar import CFGrammar, ChomskyNormalFormGrammar
+from cflpy.parser import CFGParser, CFGParserConfig, ModuleCache, split_file_at_lines
 
 
 class TestLoadFromString:
@@ -80,6 +85,19 @@ class TestLoadFromString:
         assert grammer.variables == expected_variables
         assert grammer.terminals == expected_terminals
 
+    def test_config_validation(self):
+        # Act
+        config = CFGParserConfig(variable_enclosure=["[", "]"])
+
+        # Assert
+        assert config.variable_enclosure == ("[", "]")
+        assert CFGParserConfig().model_dump_json() == CFGParserConfig().model_dump_json()
+        assert config.model_dump()["variable_enclosure"] == ("[", "]")
+        with pytest.raises(ValueError, match="variable_enclosure"):
+            CFGParserConfig(variable_enclosure=("[",))
+        with pytest.raises(ValueError, match="comment_symbol"):
+            CFGParserConfig(comment_symbol=None)
+
     def test_load_from_string_custom_config(self):
         # Arrange
         content = """
@@ -160,3 +178,280 @@ class TestLoadFromString:
         assert grammer.production_rules == expected_production_rules
         assert grammer.variables == expected_variables
         assert grammer.terminals == expected_terminals
+
+    def test_load_from_string_terminals_with_separators(self):
+        # Arrange
+        content = """
+<S> := "a b" <S> | "|" | ":=" | eps
+<T> := <S>"x"<S>
+"""
+        parser = CFGParser()
+
+        # Act
+        grammer = parser.from_string(content=content)
+
+        # Assert
+        S = Variable("S")
+        assert grammer.production_rules[S] == ProductionRuleRHS(
+            {
+                Sequence([Terminal("a b"), S]),
+                Sequence([Terminal("|")]),
+                Sequence([Terminal(":=")]),
+                Sequence([]),
+            }
+        )
+        assert grammer.terminals == {Terminal("a b"), Terminal("|"), Terminal(":="), Terminal("x")}
+        # 同じ名前の記号は1つのオブジェクトを共有する
+        (seq,) = grammer.production_rules[Variable("T")]
+        assert seq[0] is seq[2]
+
+    @pytest.mark.parametrize(
+        "content, message",
+        [
+            ('<S> := "a" eps', "Token: eps"),
+            ('<S> := "a"\n<S> := a', "Line: 2"),
+            ("<S> := <A> := <B>", "Only one transition symbol"),
+            ("<S> <B>", "must contain the transition symbol"),
+            ("<S> := <>", "Empty variable name"),
+            ('<S> := "a', 'Token: "a'),
+        ],
+    )
+    def test_load_from_string_invalid(self, content, message):
+        # Arrange
+        parser = CFGParser()
+
+        # Act & Assert
+        with pytest.raises(ValueError, match=message):
+            parser.from_string(content=content)
+
+
+class TestLoadFromFile:
+    CONTENT = '<S> := "a" <S> "b" | eps\n<T> := <S> "c"\n'
+
+    def expected_grammar(self) -> CFGrammar:
+        return CFGParser().from_string(content=self.CONTENT)
+
+    @pytest.mark.parametrize("use_mmap", [False, True])
+    def test_load_from_file(self, tmp_path, use_mmap):
+        # Arrange
+        filepath = tmp_path / "grammar.cfl"
+        filepath.write_text(self.CONTENT)
+
+        # Act
+        grammer = CFGParser().from_file(filepath, use_mmap=use_mmap)
+
+        # Assert
+        expected = self.expected_grammar()
+        assert grammer.production_rules == expected.production_rules
+        assert grammer.start_symbol == expected.start_symbol
+
+    def test_load_from_gzip_file(self, tmp_path):
+        # Arrange
+        filepath = tmp_path / "grammar.cfl.gz"
+        with gzip.open(filepath, "wt") as f:
+            f.write(self.CONTENT)
+
+        # Act
+        grammer = CFGParser().from_file(filepath)
+
+        # Assert
+        assert grammer.production_rules == self.expected_grammar().production_rules
+
+    def test_load_from_compiled_file(self, tmp_path, monkeypatch):
+        # Arrange
+        filepath = tmp_path / "grammar.cflc"
+        cnf_grammar = self.expected_grammar().to_chomsky_normal_form()
+        CompiledGrammar.from_grammar(cnf_grammar).save(filepath)
+        closed = []
+        close = CompiledGrammar.close
+        monkeypatch.setattr(CompiledGrammar, "close", lambda self: closed.append(self) or close(self))
+
+        # Act
+        grammer = CFGParser().from_file(filepath)
+
+        # Assert
+        assert isinstance(grammer, ChomskyNormalFormGrammar)
+        assert grammer.production_rules == cnf_grammar.production_rules
+        assert grammer.is_member("a a b b")
+        assert len(closed) == 1
+
+    @pytest.mark.parametrize("stream_type", [io.StringIO, lambda content: io.BytesIO(content.encode("utf-8"))])
+    def test_load_from_stream(self, stream_type):
+        # Arrange
+        stream = stream_type(self.CONTENT)
+
+        # Act
+        grammer = CFGParser().from_stream(stream)
+
+        # Assert
+        assert grammer.production_rules == self.expected_grammar().production_rules
+        assert not stream.closed
+
+    @pytest.mark.parametrize("use_mmap", [False, True])
+    def test_load_from_file_invalid_line(self, tmp_path, use_mmap):
+        # Arrange
+        filepath = tmp_path / "grammar.cfl"
+        filepath.write_text('<S> := "a"\n\n<S> := a\n')
+
+        # Act & Assert
+        with pytest.raises(ValueError, match="Line: 3"):
+            CFGParser().from_file(filepath, use_mmap=use_mmap)
+
+    def test_split_file_at_lines(self, tmp_path):
+        # Arrange
+        filepath = tmp_path / "grammar.cfl"
+        filepath.write_text(self.CONTENT * 10)
+        content = filepath.read_bytes()
+
+        # Act
+        ranges = split_file_at_lines(filepath, chunk_size=20)
+
+        # Assert
+        assert ranges[0][0] == 0
+        assert ranges[-1][1] == len(content)
+        for (_, end), (start, _) in zip(ranges, ranges[1:]):
+            assert end == start
+            assert content[end - 1 : end] == b"\n"
+
+    def test_load_from_file_parallel(self, tmp_path):
+        # Arrange
+        content = "# comment\n" + "".join(
+            f'<A{i}> := "a" <A{i + 1}> | "b{i % 7}"\n<A{i % 5}> := "c{i}"\n' for i in range(200)
+        )
+        filepath = tmp_path / "grammar.cfl"
+        filepath.write_text(content)
+        expected = CFGParser().from_string(content=content)
+
+        # Act
+        grammer = CFGParser().from_file(filepath, workers=2, chunk_size=256)
+
+        # Assert
+        assert grammer.start_symbol == expected.start_symbol
+        assert list(grammer.production_rules.keys()) == list(expected.production_rules.keys())
+        assert grammer.production_rules == expected.production_rules
+        assert grammer.variables == expected.variables
+        assert grammer.terminals == expected.terminals
+
+    def test_load_from_file_parallel_shares_symbols_across_chunks(self, tmp_path):
+        # Arrange
+        content = "".join(f'<S> := <a> "a" <S{i}>\n<S{i}> := "b" | <a>\n' for i in range(100)) + '<a> := "a"\n'
+        filepath = tmp_path / "grammar.cfl"
+        filepath.write_text(content)
+        expected = CFGParser().from_string(content=content)
+
+        # Act
+        grammer = CFGParser().from_file(filepath, workers=2, chunk_size=128)
+
+        # Assert
+        assert grammer.production_rules == expected.production_rules
+        assert {type(symbol) for symbol in grammer.variables} == {Variable}
+        assert {type(symbol) for symbol in grammer.terminals} == {Terminal}
+        assert {symbol.name for symbol in grammer.variables} == {symbol.name for symbol in expected.variables}
+        assert {symbol.name for symbol in grammer.terminals} == {"a", "b"}
+        symbols = {id(symbol) for rhs in grammer.production_rules.values() for seq in rhs for symbol in seq}
+        symbols |= {id(lhs) for lhs in grammer.production_rules.keys()}
+        assert symbols <= {id(symbol) for symbol in grammer.variables} | {id(symbol) for symbol in grammer.terminals}
+
+    def test_load_from_file_parallel_invalid_line(self, tmp_path):
+        # Arrange
+        lines = [f'<A{i}> := "a{i}"' for i in range(100)]
+        lines[60] = "<A60> := a"
+        lines[80] = "<A80> <B>"
+        filepath = tmp_path / "grammar.cfl"
+        filepath.write_text("\n".join(lines))
+
+        # Act & Assert
+        with pytest.raises(ValueError, match="Line: 61"):
+            CFGParser().from_file(filepath, workers=2, chunk_size=64)
+
+
+class TestInclude:
+    def write_modules(self, tmp_path):
+        (tmp_path / "lib").mkdir()
+        (tmp_path / "lib" / "digits.cfl").write_text('<Digit> := "0" | "1"\n')
+        (tmp_path / "lib" / "number.cfl").write_text('@include "digits.cfl"\n<Number> := <Digit> | <Digit> <Number>\n')
+        (tmp_path / "lib" / "sign.cfl").write_text('<Number> := "-" <Number>\n')
+        root = tmp_path / "expr.cfl"
+        root.write_text(
+            '@include "lib/number.cfl"\n<Expr> := <Number> | <Expr> "+" <Number>\n@include "lib/sign.cfl"\n'
+            '@include "lib/digits.cfl"\n'
+        )
+        return root
+
+    def test_include(self, tmp_path):
+        # Arrange
+        root = self.write_modules(tmp_path)
+        parser = CFGParser(module_cache=ModuleCache())
+
+        # Act
+        grammer = parser.from_file(root)
+
+        # Assert
+        expected = parser.from_string(
+            content="""
+<Expr> := <Number> | <Expr> "+" <Number>
+<Number> := <Digit> | <Digit> <Number> | "-" <Number>
+<Digit> := "0" | "1"
+"""
+        )
+        assert grammer.start_symbol == Variable("Expr")
+        assert grammer.production_rules == expected.production_rules
+        assert grammer.variables == expected.variables
+        assert grammer.terminals == expected.terminals
+
+    def test_include_reparses_only_changed_modules(self, tmp_path):
+        # Arrange
+        root = self.write_modules(tmp_path)
+        cache = ModuleCache()
+        parser = CFGParser(module_cache=cache)
+        parser.from_file(root)
+        assert (len(cache), cache.misses, cache.hits) == (3, 3, 0)
+
+        # Act & Assert: 変更がなければ解析し直さない
+        parser.from_file(root)
+        assert (cache.misses, cache.hits) == (3, 3)
+
+        # Act & Assert: 変更されたファイルだけを解析し直す
+        digits = tmp_path / "lib" / "digits.cfl"
+        digits.write_text('<Digit> := "0" | "1" | "2"\n')
+        stat = digits.stat()
+        os.utime(digits, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10**9))
+        grammer = parser.from_file(root)
+        assert (cache.misses, cache.hits) == (4, 5)
+        assert Terminal("2") in grammer.terminals
+
+    def test_include_does_not_modify_cached_modules(self, tmp_path):
+        # Arrange
+        root = self.write_modules(tmp_path)
+        parser = CFGParser(module_cache=ModuleCache())
+
+        # Act
+        first = parser.from_file(root)
+        first.production_rules[Variable("Digit")].add(Sequence([Terminal("9")]))
+        second = parser.from_file(root)
+
+        # Assert
+        assert Sequence([Terminal("9")]) not in second.production_rules[Variable("Digit")]
+
+    @pytest.mark.parametrize(
+        "files, error, message",
+        [
+            (
+                {"a.cfl": '@include "b.cfl"\n<A> := "a"', "b.cfl": '@include "a.cfl"\n<B> := "b"'},
+                ValueError,
+                "Circular",
+            ),
+            ({"a.cfl": '<A> := "a"\n@include "missing.cfl"'}, FileNotFoundError, "Line: 2"),
+            ({"a.cfl": '@include "b.cfl"\n<A> := "a"', "b.cfl": "<B> := b"}, ValueError, "b.cfl"),
+            ({"a.cfl": "@include\n<A> := <B>"}, ValueError, "A path is required"),
+        ],
+    )
+    def test_include_invalid(self, tmp_path, files, error, message):
+        # Arrange
+        for name, content in files.items():
+            (tmp_path / name).write_text(content)
+        parser = CFGParser(module_cache=ModuleCache())
+
+        # Act & Assert
+        with pytest.raises(error, match=message):
+            parser.from_file(tmp_path / "a.cfl")
@@ -0,0 +1,158 @@
+import io
+
+import pytest
+
+from cflpy.core import ProductionRuleRHS, ProductionRules, Sequence, Terminal, Variable
+from cflpy.grammar import CFGrammar, ChomskyNormalFormGrammar
+from cflpy.parser import CFGParser, CFGParserConfig
+from cflpy.serialize import CFGWriter, dump_json, dump_msgpack, dumps_json, load_json, load_msgpack, loads_json
+
+CONTENT = """
+<Expr> := <Term> | <Expr> "+" <Term>
+<Term> := <Factor> | <Term> "*" <Factor>
+<Factor> := "(" <Expr> ")" | "x" | "1 | 2" | eps
+"""
+
+
+def reordered(grammar: CFGrammar) -> CFGrammar:
+    # 規則の挿入順を逆にした同じ文法
+    production_rules = ProductionRules(
+        {lhs: ProductionRuleRHS(set(rhs)) for lhs, rhs in reversed(list(grammar.production_rules.items()))}
+    )
+    return CFGrammar(set(grammar.variables), set(grammar.terminals), grammar.start_symbol, production_rules)
+
+
+class TestCFGWriter:
+    def test_round_trip(self):
+        # Arrange
+        grammar = CFGParser().from_string(content=CONTENT)
+        writer = CFGWriter()
+
+        # Act
+        content = writer.to_string(grammar)
+        loaded = CFGParser().from_string(content=content)
+
+        # Assert
+        assert loaded.start_symbol == grammar.start_symbol
+        assert loaded.production_rules == grammar.production_rules
+        assert content.splitlines()[0].startswith("<Expr> := ")
+        # 出力は規則の順序に依存しない
+        assert writer.to_string(reordered(grammar)) == content
+
+    def test_round_trip_custom_config(self, tmp_path):
+        # Arrange
+        config = CFGParserConfig(
+            transition_symbol="->", variable_enclosure=("[", "]"), rhs_separator="/", empty_string_symbol="EMPTY"
+        )
+        grammar = CFGParser().from_string(content=CONTENT)
+        filepath = tmp_path / "grammar.cfl.gz"
+
+        # Act
+        CFGWriter(config).to_file(grammar, filepath)
+        loaded = CFGParser(config).from_file(filepath)
+
+        # Assert
+        assert loaded.production_rules == grammar.production_rules
+
+    @pytest.mark.parametrize("name", ['a"b', "", "a\nb"])
+    def test_invalid_symbol_name(self, name):
+        # Arrange
+        S = Variable("S")
+        grammar = CFGrammar(
+            {S}, {Terminal(name)}, S, ProductionRules({S: ProductionRuleRHS({Sequence([Terminal(name)])})})
+        )
+
+        # Act & Assert
+        with pytest.raises(ValueError, match="cannot be written"):
+            CFGWriter().to_string(grammar)
+
+
+class TestStructured:
+    def test_json_round_trip(self):
+        # Arrange
+        grammar = CFGParser().from_string(content=CONTENT)
+        grammar.terminals.add(Terminal("unused"))
+
+        # Act
+        content = dumps_json(grammar)
+        loaded = loads_json(content)
+
+        # Assert
+        assert type(loaded) is CFGrammar
+        assert loaded.start_symbol == grammar.start_symbol
+        assert loaded.variables == grammar.variables
+        assert loaded.terminals == grammar.terminals
+        assert loaded.production_rules == grammar.production_rules
+        assert dumps_json(reordered(grammar)) == content
+
+    def test_json_round_trip_chomsky_normal_form(self):
+        # Arrange
+        grammar = CFGParser().from_string(content=CONTENT).to_chomsky_normal_form()
+        stream = io.StringIO()
+
+        # Act
+        dump_json(grammar, stream)
+        stream.seek(0)
+        loaded = load_json(stream)
+
+        # Assert
+        assert type(loaded) is ChomskyNormalFormGrammar
+        assert loaded.production_rules == grammar.production_rules
+        assert loaded.is_member("( x + x ) * x")
+
+    def test_msgpack_round_trip(self):
+        # Arrange
+        pytest.importorskip("msgpack")
+        grammar = CFGParser().from_string(content=CONTENT)
+        stream = io.BytesIO()
+
+        # Act
+        dump_msgpack(grammar, stream)
+        stream.seek(0)
+        loaded = load_msgpack(stream)
+
+        # Assert
+        assert loaded.production_rules == grammar.production_rules
+        assert loaded.terminals == grammar.terminals
+
+    @pytest.mark.parametrize("serializer", ["json", "msgpack", "writer"])
+    def test_round_trip_variable_and_terminal_with_same_name(self, serializer):
+        # Arrange: 変数 <a> と終端記号 "a" は同じ名前
+        grammar = CFGParser().from_string(content='<S> := <a> "a" | "b"\n<a> := "b"')
+
+        def typed_rules(grammar):
+            # Symbol は名前のみで比較されるため、記号の種類も含めて比較する
+            return {
+                (lhs.name, tuple((type(sym).__name__, sym.name) for sym in seq.symbols))
+                for lhs, rhs in grammar.production_rules.items()
+                for seq in rhs
+            }
+
+        # Act
+        if serializer == "json":
+            loaded = loads_json(dumps_json(grammar))
+        elif serializer == "msgpack":
+            pytest.importorskip("msgpack")
+            stream = io.BytesIO()
+            dump_msgpack(grammar, stream)
+            stream.seek(0)
+            loaded = load_msgpack(stream)
+        else:
+            loaded = CFGParser().from_string(content=CFGWriter().to_string(grammar))
+
+        # Assert
+        assert typed_rules(loaded) == typed_rules(grammar)
+        assert ("S", (("Variable", "a"), ("Terminal", "a"))) in typed_rules(loaded)
+
+    @pytest.mark.parametrize(
+        "content, message",
+        [
+            ('{"format": "other"}', "unexpected format"),
+            ('{"format": "cflpy-grammar", "version": 0}', "Unsupported"),
+            ("[]", "expected a JSON object"),
+        ],
+    )
+    def test_json_invalid(self, content, message):
+        # Act & Assert
+        with pytest.raises(ValueError, match=message):
+            loads_json(content)
@@ -0,0 +1,198 @@
+import asyncio
+import json
+
+import pytest
+
+from cflpy.compiled import CompiledGrammar
+from cflpy.parser import CFGParser
+from cflpy.server import GrammarServer, LatencyRecorder, answer_query
+
+CONTENT = """
+<Expr> := <Term> | <Expr> "+" <Term>
+<Term> := <Factor> | <Term> "*" <Factor>
+<Factor> := "(" <Expr> ")" | "1"
+"""
+
+
+@pytest.fixture
+def compiled():
+    return CompiledGrammar.from_grammar(CFGParser().from_string(CONTENT).to_chomsky_normal_form())
+
+
+async def request(reader, writer, method, path, payload=None):
+    body = b"" if payload is None else json.dumps(payload).encode("utf-8")
+    writer.write(f"{method} {path} HTTP/1.1\r\nHost: localhost\r\nContent-Length: {len(body)}\r\n\r\n".encode() + body)
+    await writer.drain()
+    return await read_response(reader)
+
+
+async def read_response(reader):
+    status = int((await reader.readline()).split()[1])
+    headers = {}
+    while (line := await reader.readline()) != b"\r\n":
+        name, _, value = line.decode().partition(":")
+        headers[name.lower()] = value.strip()
+    return status, json.loads(await reader.readexactly(int(headers["content-length"])))
+
+
+class TestAnswerQuery:
+    def test_queries(self, compiled):
+        # Act & Assert
+        assert answer_query(compiled, "member", "( 1 + 1 )") == {"member": True}
+        assert answer_query(compiled, "parse", "1 +") == {"tree": None}
+        assert answer_query(compiled, "next", "1 +") == {"tokens": ["(", "1"], "complete": False}
+        assert answer_query(compiled, "member", "1 + x")["error"].startswith("Terminal x")
+
+
+class TestLatencyRecorder:
+    def test_summary(self):
+        # Arrange
+        recorder = LatencyRecorder(window=100)
+
+        # Act
+        for i in range(1, 101):
+            recorder.record("member", i / 1000)
+
+        # Assert
+        assert recorder.summary() == {
+            "member": {"count": 100, "p50_ms": 50.0, "p90_ms": 90.0, "p99_ms": 99.0, "max_ms": 100.0}
+        }
+
+
+class TestGrammarServer:
+    @pytest.mark.parametrize("workers", [1, 2])
+    def test_http_queries(self, compiled, workers):
+        async def scenario():
+            server = GrammarServer(compiled, workers=workers, max_batch_size=4)
+            [address] = await server.start(port=0)
+            host, port = address.removeprefix("http://").rsplit(":", 1)
+            try:
+                reader, writer = await asyncio.open_connection(host, int(port))
+                # 同じ接続で複数のリクエストを送る (keep-alive)
+                responses = [
+                    await request(reader, writer, "GET", "/health"),
+                    await request(reader, writer, "POST", "/member", {"inputs": ["1 + 1", "( 1", "1 + x"] * 3}),
+                    await request(reader, writer, "POST", "/parse", {"input": "1 * 1"}),
+                    await request(reader, writer, "POST", "/next", {"input": "( 1"}),
+                    await request(reader, writer, "POST", "/member", {"string": "1"}),
+                    await request(reader, writer, "GET", "/unknown"),
+                    await request(reader, writer, "GET", "/stats"),
+                ]
+                writer.close()
+                return responses, server.batches
+            finally:
+                await server.close()
+
+        # Act
+        responses, batches = asyncio.run(scenario())
+
+        # Assert
+        health, member, parse, next_tokens, invalid, unknown, stats = responses
+        assert health == (200, {"status": "ok"})
+        assert member[0] == 200
+        assert [result.get("member") for result in member[1]["results"]] == [True, False, None] * 3
+        assert parse[1]["tree"]["children"]
+        assert next_tokens == (200, {"tokens": [")", "*", "+"], "complete": False})
+        assert invalid[0] == 400
+        assert unknown[0] == 404
+        # 9件の問い合わせは最大4件のバッチにまとめられる
+        assert 3 <= batches <= 11
+        assert stats[1]["latency"]["member"]["count"] == 9
+        assert set(stats[1]["latency"]["next"]) == {"count", "p50_ms", "p90_ms", "p99_ms", "max_ms"}
+
+    def test_unix_socket(self, compiled, tmp_path):
+        async def scenario():
+            server = GrammarServer(compiled)
+            path = str(tmp_path / "cflpy.sock")
+            await server.start(host=None, unix_path=path)
+            try:
+                reader, writer = await asyncio.open_unix_connection(path)
+                response = await request(reader, writer, "POST", "/member", {"input": "( 1 ) * 1"})
+                writer.close()
+                return response
+            finally:
+                await server.close()
+
+        # Act
+        response = asyncio.run(scenario())
+
+        # Assert
+        assert response == (200, {"member": True})
+        assert not (tmp_path / "cflpy.sock").exists()
+
+    @pytest.mark.parametrize(
+        "raw, status, message",
+        [
+            (b"GARBAGE\r\n\r\n", 400, "Malformed request line"),
+            (b"POST /member\r\n\r\n", 400, "Malformed request line"),
+            (b"POST /member HTTP/1.1\r\nContent-Length: abc\r\n\r\n", 400, "Invalid Content-Length"),
+            (b"POST /member HTTP/1.1\r\nContent-Length: -1\r\n\r\n", 400, "Invalid Content-Length"),
+            (b"POST /member HTTP/1.1\r\nContent-Length: 99999999999\r\n\r\n", 413, "exceeds"),
+            (b"POST /member HTTP/1.1\r\nX-Long: " + b"a" * 70 * 1024 + b"\r\n\r\n", 431, "too long"),
+            (b"POST /" + b"a" * 70 * 1024 + b" HTTP/1.1\r\n\r\n", 400, "too long"),
+            (b"POST /member HTTP/1.1\r\nContent-Length: \xc2\xb2\r\n\r\n", 400, "Invalid Content-Length"),
+        ],
+        ids=[
+            "garbage",
+            "no-version",
+            "length-abc",
+            "length-negative",
+            "too-large",
+            "long-header",
+            "long-request-line",
+            "length-non-ascii",
+        ],
+    )
+    def test_invalid_requests(self, compiled, raw, status, message):
+        async def scenario():
+            server = GrammarServer(compiled)
+            address = (await server.start())[0]
+            host, port = address.removeprefix("http://").rsplit(":", 1)
+            try:
+                reader, writer = await asyncio.open_connection(host, int(port))
+                writer.write(raw)
+                await writer.drain()
+                response = await read_response(reader)
+                # 応答の後に接続が閉じられる
+                closed = await reader.read() == b""
+                writer.close()
+                return response, closed
+            finally:
+                await server.close()
+
+        # Act
+        (response_status, payload), closed = asyncio.run(scenario())
+
+        # Assert
+        assert response_status == status
+        assert message in payload["error"]
+        assert closed
+
+    def test_non_utf8_body(self, compiled):
+        async def scenario():
+            server = GrammarServer(compiled)
+            [address] = await server.start(port=0)
+            host, port = address.removeprefix("http://").rsplit(":", 1)
+            try:
+                reader, writer = await asyncio.open_connection(host, int(port))
+                body = b'{"input": "\xff\xfe"}'
+                writer.write(f"POST /member HTTP/1.1\r\nContent-Length: {len(body)}\r\n\r\n".encode() + body)
+                await writer.drain()
+                responses = [await read_response(reader), await request(reader, writer, "GET", "/health")]
+                writer.close()
+                return responses
+            finally:
+                await server.close()
+
+        # Act
+        (status, payload), health = asyncio.run(scenario())
+
+        # Assert: 400 を返し、接続は維持される
+        assert status == 400
+        assert payload["error"].startswith("Invalid JSON")
+        assert health == (200, {"status": "ok"})
+
+    def test_invalid_options(self, compiled):
+        # Act & Assert
+        with pytest.raises(ValueError, match="max_batch_size"):
+            GrammarServer(compiled, max_batch_size=0)
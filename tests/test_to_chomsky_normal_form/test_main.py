@@ -0,0 +1,92 @@
+import pytest
+
+from cflpy.core import ProductionRuleRHS, ProductionRules, Sequence, Terminal, Variable
+from cflpy.grammar import ChomskyNormalFormGrammar
+from cflpy.to_chomsly_normal_form import to_chomsky_normal_form
+
+
+def build_many_nullable_grammar(n: int):
+    S = Variable("S")
+    nullable_variables = [Variable(f"A{i}") for i in range(n)]
+    a = Terminal("a")
+    b = Terminal("b")
+    production_rules = ProductionRules({S: ProductionRuleRHS({Sequence(nullable_variables + [a])})})
+    for A in nullable_variables:
+        production_rules[A] = ProductionRuleRHS({Sequence([b]), Sequence([])})
+    return {S, *nullable_variables}, {a, b}, S, production_rules
+
+
+class TestToChomskyNormalForm:
+    @pytest.mark.parametrize("binarize_first", [True, False])
+    def test_language_is_preserved(self, binarize_first):
+        # Arrange
+        variables, terminals, start_symbol, production_rules = build_many_nullable_grammar(4)
+
+        # Act
+        grammar = ChomskyNormalFormGrammar(
+            *to_chomsky_normal_form(
+                variables, terminals, start_symbol, production_rules, binarize_first=binarize_first
+            )
+        )
+
+        # Assert
+        for k in range(5):
+            assert grammar.is_member(" ".join(["b"] * k + ["a"])) is True
+        assert grammar.is_member("b b b b b a") is False
+        assert grammar.is_member("a b") is False
+
+    def test_binarize_first_grows_polynomially(self):
+        # Arrange
+        variables, terminals, start_symbol, production_rules = build_many_nullable_grammar(12)
+
+        # Act
+        _, _, _, classic_rules = to_chomsky_normal_form(
+            variables, terminals, start_symbol, production_rules, binarize_first=False
+        )
+        _, _, _, binarized_rules = to_chomsky_normal_form(
+            variables, terminals, start_symbol, production_rules, binarize_first=True
+        )
+
+        # Assert
+        classic_size = sum(len(rhs) for rhs in classic_rules.values())
+        binarized_size = sum(len(rhs) for rhs in binarized_rules.values())
+        assert classic_size > 1000
+        assert binarized_size < 500
+
+    @pytest.mark.parametrize("binarize_first", [True, False])
+    def test_input_is_not_modified(self, binarize_first):
+        # Arrange
+        S = Variable("S")
+        A = Variable("A")
+        B = Variable("B")
+        a = Terminal("a")
+        b = Terminal("b")
+        production_rules = ProductionRules(
+            {
+                S: ProductionRuleRHS({Sequence([A, B, a]), Sequence([B])}),
+                A: ProductionRuleRHS({Sequence([a]), Sequence([])}),
+                B: ProductionRuleRHS({Sequence([A]), Sequence([b, A])}),
+            }
+        )
+        snapshot = {lhs: set(rhs) for lhs, rhs in production_rules.items()}
+
+        # Act
+        to_chomsky_normal_form({S, A, B}, {a, b}, S, production_rules, binarize_first=binarize_first)
+
+        # Assert
+        assert {lhs: set(rhs) for lhs, rhs in production_rules.items()} == snapshot
+        assert production_rules.frozen is False
+
+    def test_result_is_frozen(self):
+        # Arrange
+        variables, terminals, start_symbol, production_rules = build_many_nullable_grammar(2)
+
+        # Act
+        _, _, _, converted_rules = to_chomsky_normal_form(variables, terminals, start_symbol, production_rules)
+
+        # Assert
+        assert converted_rules.frozen is True
+        with pytest.raises(TypeError):
+            converted_rules[start_symbol].add(Sequence([Terminal("a")]))
+        with pytest.raises(TypeError):
+            converted_rules[Variable("Z")] = ProductionRuleRHS()
@@ -30,6 +30,22 @@ class TestFindUnitProductions:
                     Variable("B"): set(),
                 },
             ),
+            (
+                ProductionRules(
+                    {
+                        Variable("S"): ProductionRuleRHS({Sequence([Variable("A")])}),
+                        Variable("A"): ProductionRuleRHS({Sequence([Variable("B")]), Sequence([Terminal("a")])}),
+                        Variable("B"): ProductionRuleRHS({Sequence([Variable("A")]), Sequence([Variable("C")])}),
+                        Variable("C"): ProductionRuleRHS({Sequence([Variable("C")]), Sequence([Terminal("c")])}),
+                    }
+                ),
+                {
+                    Variable("S"): {Variable("A"), Variable("B"), Variable("C")},
+                    Variable("A"): {Variable("A"), Variable("B"), Variable("C")},
+                    Variable("B"): {Variable("A"), Variable("B"), Variable("C")},
+                    Variable("C"): {Variable("C")},
+                },
+            ),
         ],
     )
     def test_find_unit_pairs(self, production_rules, expected_unit_production_pairs):
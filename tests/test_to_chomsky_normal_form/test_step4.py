@@ -47,3 +47,36 @@ class TestStep4DecomposeLongProductions:
         # Assert
         assert new_production_rules == expected_production_rules
         assert new_variables == expected_variables
+
+    def test_step4_decompose_long_productions_shares_suffix(self):
+        # Arrange
+        S = Variable("S")
+        A = Variable("A")
+        B = Variable("B")
+        C = Variable("C")
+        D = Variable("D")
+        a = Terminal("a")
+        b = Terminal("b")
+        production_rules = ProductionRules(
+            {
+                S: ProductionRuleRHS({Sequence([A, B, C, D])}),
+                A: ProductionRuleRHS({Sequence([a, B, C, D]), Sequence([b, C, D])}),
+                B: ProductionRuleRHS({Sequence([b])}),
+                C: ProductionRuleRHS({Sequence([a])}),
+                D: ProductionRuleRHS({Sequence([b])}),
+            }
+        )
+        variables = {S, A, B, C, D}
+        terminals = {a, b}
+
+        # Act
+        new_production_rules, new_variables, stats = step4_decompose_long_productions(
+            production_rules, variables, terminals, return_stats=True
+        )
+
+        # Assert
+        # 接尾辞 "B C D" と "C D" に対応する変数のみが作成される
+        assert new_variables - variables == {Variable("X1"), Variable("X2")}
+        assert stats.created_variables == 2
+        assert stats.saved_variables == 3
+        assert all(len(seq) <= 2 for rhs in new_production_rules.values() for seq in rhs)
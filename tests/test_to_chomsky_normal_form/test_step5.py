@@ -11,8 +11,6 @@ def test_step5_remove_terminal_in_2_term_rule():
     b = Terminal("b")
 
     Y1 = Variable("Y1")
-    Y2 = Variable("Y2")
-    Y3 = Variable("Y3")
 
     production_rules = ProductionRules(
         {
@@ -24,7 +22,8 @@ def test_step5_remove_terminal_in_2_term_rule():
     variables = {S, A, B}
     terminals = {a, b}
 
-    expected_variables = {S, A, B, Y1, Y2, Y3}
+    # b は唯一の規則が B := b である B を再利用し、a には1つの代理変数のみを作成する
+    expected_variables = {S, A, B, Y1}
 
     # Act
     new_production_rules, new_variables = step5_remove_terminal_in_2_term_rule(production_rules, variables, terminals)
@@ -37,5 +36,7 @@ def test_step5_remove_terminal_in_2_term_rule():
                 assert isinstance(seq[0], Terminal)
             elif len(seq) == 2:
                 assert isinstance(seq[0], Variable)
-                assert isinstance(seq[1], Variable) or isinstance(seq[1], Terminal)
+                assert isinstance(seq[1], Variable)
     assert new_variables == expected_variables
+    assert new_production_rules[S] == ProductionRuleRHS({Sequence([A, B]), Sequence([Y1, B])})
+    assert new_production_rules[Y1] == ProductionRuleRHS({Sequence([a])})